@@ -0,0 +1,488 @@
+import copy
+from typing import List, Dict
+
+import numpy as np
+
+from models import Fitness, OperationProgress
+from simulator import ShiftSimulator
+
+# Khóa sắp xếp gói trong một số nguyên: (hạng, vị trí trong danh sách, chỉ số).
+# Khóa là duy nhất trong mỗi hàng nên np.sort cho đúng thứ tự của sort ổn định trong bản tuần tự.
+_RANK_SHIFT = 40
+_POSITION_SHIFT = 20
+_INDEX_MASK = (1 << _POSITION_SHIFT) - 1
+_LAST_RANK = (1 << (_RANK_SHIFT - _POSITION_SHIFT)) - 1
+
+
+def apply_kpi_increment_batch(achieved0, achieved1, target0, target1, increment_kpi0, increment_kpi1, hours: float = 5.5):
+    """
+    Phiên bản mảng của simulator.apply_kpi_increment: mỗi phần tử là một công đoạn của một giải pháp.
+    Thứ tự phép tính giữ nguyên để kết quả dấu phẩy động trùng khớp với bản tuần tự.
+    :return: Tuple (achieved0 mới, achieved1 mới, mảng bool đã đạt cả hai KPI)
+    """
+    need_adjustment_kpi0 = (achieved0 + increment_kpi0 > target0) & (increment_kpi0 > 0)
+    need_adjustment_kpi1 = (achieved1 + increment_kpi1 > target1) & (increment_kpi1 > 0)
+    adjust = need_adjustment_kpi0 | need_adjustment_kpi1
+
+    if adjust.any():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            max_x_kpi0 = np.where(
+                need_adjustment_kpi0, hours * (achieved0 + increment_kpi0 - target0) / increment_kpi0, np.inf
+            )
+            max_x_kpi1 = np.where(
+                need_adjustment_kpi1, hours * (achieved1 + increment_kpi1 - target1) / increment_kpi1, np.inf
+            )
+            x = np.where(adjust, np.trunc(np.minimum(max_x_kpi0, max_x_kpi1)), 0.0)
+        increment_kpi0 = np.where(need_adjustment_kpi0, increment_kpi0 * (1 - x / hours), increment_kpi0)
+        increment_kpi1 = np.where(need_adjustment_kpi1, increment_kpi1 * (1 - x / hours), increment_kpi1)
+
+    achieved0 = achieved0 + increment_kpi0
+    achieved1 = achieved1 + increment_kpi1
+    return achieved0, achieved1, (achieved0 >= target0) & (achieved1 >= target1)
+
+
+class BatchSimulator:
+    def __init__(self, simulator: ShiftSimulator, min_batch_size: int = 256):
+        """
+        Mô phỏng đồng thời nhiều phân bổ (một quần thể ứng viên) theo từng ca.
+        Trạng thái của các giải pháp được xếp thành mảng NumPy theo trục quần thể; lọc nhân viên sẵn sàng,
+        sắp theo năng suất, ghép cặp nhân viên-máy, cộng KPI và chi phí được tính cho cả lô bằng phép toán mảng.
+        Chỉ các sự kiện hiếm (công đoạn hoàn thành, cập nhật hàng đợi, phân bổ lại) được xử lý riêng
+        cho từng giải pháp. Kết quả giống hệt ShiftSimulator.run cho từng phân bổ.
+        :param simulator: Bộ mô phỏng tuần tự của cùng bài toán (dùng chung lịch ca và thứ tự ưu tiên)
+        :param min_batch_size: Lô nhỏ hơn được mô phỏng tuần tự bằng simulator, vì chi phí cố định
+            của mỗi bước mảng chỉ được bù lại khi lô đủ lớn: đo trên input3_2/input9/input18, mô phỏng đồng thời
+            chậm hơn 2-12 lần với lô 3-30 giải pháp (cỡ lô của Harmony Search) và chỉ hòa vốn ở khoảng 256
+        """
+        self.simulator = simulator
+        self.min_batch_size = min_batch_size
+        inst = simulator.instance
+        self.instance = inst
+        self.num_slots = simulator.num_slots
+        self.available_by_slot = np.array(simulator.available_by_slot, dtype=bool)
+        self.next_available_slot = np.array(simulator.next_available_slot, dtype=np.int64)
+
+        self.w_prod = np.array(inst.worker_productivity, dtype=np.float64)
+        self.w_quality = np.array(inst.worker_quality, dtype=np.float64)
+        self.w_salary = np.array(inst.worker_salary, dtype=np.float64)
+        self.m_prod = np.array(inst.asset_productivity, dtype=np.float64)
+        self.m_cost = np.array(inst.asset_cost, dtype=np.float64)
+        self.target0 = np.array(inst.op_target0, dtype=np.float64)
+        self.target1 = np.array(inst.op_target1, dtype=np.float64)
+
+        # Hạng theo năng suất giảm dần (cùng năng suất thì cùng hạng), dùng làm phần đầu của khóa sắp xếp
+        self.worker_rank = np.unique(-self.w_prod, return_inverse=True)[1].astype(np.int64).ravel() << _RANK_SHIFT
+        self.machine_rank = np.unique(-self.m_prod, return_inverse=True)[1].astype(np.int64).ravel() << _RANK_SHIFT
+
+    @staticmethod
+    def _pack(lists: List[List[List[int]]]) -> tuple:
+        """
+        Xếp danh sách chỉ số (theo giải pháp, theo công đoạn) thành mảng hai chiều:
+        hàng b * số công đoạn + j chứa danh sách của công đoạn j trong giải pháp b, đệm bằng 0.
+        :return: Tuple (mảng chỉ số, mảng độ dài theo hàng)
+        """
+        per_row = [items for per_op in lists for items in per_op]
+        values = np.zeros((len(per_row), max(map(len, per_row), default=1) or 1), dtype=np.int64)
+        lengths = np.zeros(len(per_row), dtype=np.int64)
+        for row, items in enumerate(per_row):
+            if items:
+                values[row, :len(items)] = items
+                lengths[row] = len(items)
+        return values, lengths
+
+    @staticmethod
+    def _append(values: np.ndarray, lengths: np.ndarray, row: int, item: int) -> np.ndarray:
+        """Thêm item vào cuối danh sách ở hàng row, mở rộng mảng khi cần."""
+        position = lengths[row]
+        if position == values.shape[1]:
+            values = np.concatenate([values, np.zeros_like(values)], axis=1)
+        values[row, position] = item
+        lengths[row] = position + 1
+        return values
+
+    @staticmethod
+    def _has_duplicates(values: np.ndarray, mask: np.ndarray) -> bool:
+        """Có hàng nào chứa cùng một chỉ số hai lần trong các vị trí được chọn bởi mask hay không."""
+        tagged = np.sort(np.where(mask, values, -1 - np.arange(values.shape[1])), axis=1)
+        return bool((tagged[:, 1:] == tagged[:, :-1]).any())
+
+    def _next_event_slot(self, ready: List[int], base: int, workers, worker_counts, machine_counts, slot: int) -> int:
+        """
+        Ca sớm nhất (>= slot) mà một công đoạn sẵn sàng có nhân viên đi làm và có máy
+        (xem ShiftSimulator._next_event_slot).
+        :param base: Hàng đầu tiên của giải pháp trong các mảng phân bổ (b * số công đoạn)
+        """
+        if not ready:
+            return self.num_slots
+        rows = base + np.array(ready)
+        rows = rows[(machine_counts[rows] > 0) & (worker_counts[rows] > 0)]
+        if rows.size == 0:
+            return self.num_slots
+        lengths = worker_counts[rows]
+        worker_ids = workers[rows, :int(lengths.max())]
+        next_available = np.where(
+            np.arange(worker_ids.shape[1]) < lengths[:, None],
+            self.next_available_slot[slot][worker_ids],
+            self.num_slots,
+        )
+        return int(next_available.min())
+
+    def _reallocate(self, ready_queue, base: int, workers, worker_counts, machines, machine_counts,
+                    pool_workers: Dict, pool_machines: Dict) -> tuple:
+        """
+        Phân bổ lại tài nguyên trong kho chung của một giải pháp, giống ShiftSimulator._reallocate.
+        Kho được nhóm theo vị trí/loại máy nên tài nguyên chưa có công đoạn nhận không phải duyệt lại;
+        mỗi công đoạn nhận chỉ một vị trí (loại máy) nên thứ tự thêm vào từng danh sách không đổi.
+        :return: Tuple (mảng nhân viên, mảng máy) vì mảng có thể được mở rộng
+        """
+        inst = self.instance
+
+        for position, pooled in pool_workers.items():
+            targets = ready_queue.position_targets(position) if pooled else None
+            if targets is not None:
+                for w in sorted(pooled):
+                    target = targets[1] if inst.worker_quality[w] > 0.8 else targets[0]
+                    workers = self._append(workers, worker_counts, base + target, w)
+                pooled.clear()
+
+        for machine_type, pooled in pool_machines.items():
+            targets = ready_queue.machine_type_targets(machine_type) if pooled else None
+            if targets is not None:
+                for m in sorted(pooled):
+                    target = targets[1] if inst.asset_productivity[m] > 0.8 else targets[0]
+                    machines = self._append(machines, machine_counts, base + target, m)
+                pooled.clear()
+        return workers, machines
+
+    def run(
+        self,
+        allocations: List[List[tuple]],
+        progresses: List[OperationProgress] = None,
+        cutoff: tuple = None,
+    ) -> List[Fitness]:
+        """
+        Mô phỏng một lô phân bổ, các giải pháp tiến cùng nhau từng ca.
+        :param allocations: Danh sách phân bổ (xem ProblemInstance.encode_solution)
+        :param progresses: Nơi ghi KPI đạt được và trạng thái hoàn thành cho từng phân bổ; None nếu chỉ cần fitness
+        :param cutoff: Fitness ngưỡng dùng chung cho cả lô (xem ShiftSimulator.run)
+        :return: Danh sách Fitness theo thứ tự của allocations
+        """
+        inst = self.instance
+        simulator = self.simulator
+        num_solutions = len(allocations)
+        if num_solutions < max(self.min_batch_size, 1):
+            if progresses is None:
+                progresses = [None] * num_solutions
+            return [
+                simulator.run(allocation, progress, cutoff=cutoff)
+                for allocation, progress in zip(allocations, progresses)
+            ]
+        n_ops = inst.num_operations
+        num_workers = inst.num_workers
+        num_assets = inst.num_assets
+        spd = inst.shifts_per_day
+        hours = inst.hours_per_shift
+        w_prod = self.w_prod
+        w_quality = self.w_quality
+        w_salary = self.w_salary
+        m_prod = self.m_prod
+        m_cost = self.m_cost
+        worker_rank = self.worker_rank
+        machine_rank = self.machine_rank
+        target0 = self.target0
+        target1 = self.target1
+        op_order = inst.op_order
+        deadline_day = inst.order_deadline_day
+        order_operation_count = inst.order_operation_count
+        worker_position = inst.worker_position
+        asset_type = inst.asset_type
+        num_slots = self.num_slots
+
+        # Trạng thái theo công đoạn được làm phẳng: hàng b * n_ops + j
+        workers, worker_counts = self._pack([[ws for ws, _ in allocation] for allocation in allocations])
+        machines, machine_counts = self._pack([[ms for _, ms in allocation] for allocation in allocations])
+        achieved0 = np.zeros(num_solutions * n_ops)
+        achieved1 = np.zeros(num_solutions * n_ops)
+        visited = np.zeros(num_solutions * n_ops, dtype=bool)
+        first_slot = np.full(num_solutions * n_ops, -1, dtype=np.int64)
+        total_cost = np.zeros(num_solutions)
+        # Nhân viên/máy đã dùng theo giải pháp: phần tử b * số nhân viên (máy) + chỉ số
+        workers_in_last_shift = np.zeros(num_solutions * num_workers, dtype=bool)
+        workers_in_current_shift = np.zeros_like(workers_in_last_shift)
+        machines_in_current_shift = np.zeros(num_solutions * num_assets, dtype=bool)
+
+        # Trạng thái ít thay đổi được giữ riêng cho từng giải pháp
+        ready_queues = []
+        for _ in range(num_solutions):
+            ready_queue = copy.copy(simulator.ready_queue)
+            ready_queue.reset()
+            ready_queues.append(ready_queue)
+        completed = [bytearray(n_ops) for _ in range(num_solutions)]
+        completed_by_order = [[0] * inst.num_orders for _ in range(num_solutions)]
+        num_completed = [0] * num_solutions
+        total_shift = [0] * num_solutions
+        completed_orders_on_time = [0] * num_solutions
+        max_possible_completed_orders = [inst.num_orders] * num_solutions
+        pool_workers = [{} for _ in range(num_solutions)]
+        pool_machines = [{} for _ in range(num_solutions)]
+        aborted = [False] * num_solutions
+        end_slot = [num_slots] * num_solutions
+        running = list(range(num_solutions))
+
+        if cutoff is not None:
+            cutoff_completed_orders, cutoff_shifts = cutoff[0], cutoff[1]
+
+        # ready_matrix[b, r]: công đoạn sẵn sàng thứ r của giải pháp b (-1 nếu không có)
+        ready_matrix = np.full((num_solutions, 1), -1, dtype=np.int64)
+        changed = set(running)
+        ready_day = -1
+        # Ca tiếp theo cần xét của từng giải pháp: sau một ca trống, giải pháp nhảy thẳng tới ca có sự kiện
+        # như ShiftSimulator.run; lô chỉ xử lý các ca mà ít nhất một giải pháp cần xét.
+        wake_slot = np.zeros(num_solutions, dtype=np.int64)
+        while running:
+            slot = int(wake_slot[running].min())
+            day, shift = divmod(slot, spd)
+            if day != ready_day:
+                for b in running:
+                    ready_queues[b].advance_to(day)
+                ready_day = day
+                changed.update(running)
+            for b in changed:
+                ready = ready_queues[b].operations()
+                if len(ready) > ready_matrix.shape[1]:
+                    ready_matrix = np.hstack([
+                        ready_matrix, np.full((num_solutions, len(ready) - ready_matrix.shape[1]), -1, dtype=np.int64)
+                    ])
+                ready_matrix[b] = -1
+                ready_matrix[b, :len(ready)] = ready
+            changed.clear()
+
+            available = self.available_by_slot[slot]
+            awake = wake_slot == slot
+            participating = np.flatnonzero(awake).tolist()
+            workers_in_current_shift[:] = False
+            machines_in_current_shift[:] = False
+            completed_in_shift = {b: [] for b in participating}
+
+            for r in range(ready_matrix.shape[1]):
+                column = ready_matrix[:, r]
+                solutions = np.flatnonzero((column >= 0) & awake)
+                if solutions.size == 0:
+                    continue
+                ops = column[solutions]
+                op_rows = solutions * n_ops + ops
+                pair_index = np.arange(solutions.size)
+
+                # Nhân viên sẵn sàng, sắp giảm dần theo năng suất (cùng năng suất giữ thứ tự trong danh sách)
+                worker_len = worker_counts[op_rows]
+                width = max(int(worker_len.max()), 1)
+                worker_ids = workers[op_rows, :width]
+                worker_slots = (solutions * num_workers)[:, None] + worker_ids
+                positions = np.arange(width)
+                is_available = (
+                    (positions < worker_len[:, None])
+                    & available[worker_ids]
+                    & ~(workers_in_last_shift[worker_slots] | workers_in_current_shift[worker_slots])
+                )
+                available_workers = np.sort(
+                    np.where(is_available, worker_rank[worker_ids], _LAST_RANK << _RANK_SHIFT)
+                    | (positions << _POSITION_SHIFT) | worker_ids,
+                    axis=1,
+                ) & _INDEX_MASK
+                num_available = is_available.sum(axis=1)
+
+                # Danh sách máy được sắp tại chỗ như bản tuần tự
+                machine_len = machine_counts[op_rows]
+                machine_width = max(int(machine_len.max()), 1)
+                machine_ids = machines[op_rows, :machine_width]
+                positions = np.arange(machine_width)
+                machine_valid = positions < machine_len[:, None]
+                available_machines = np.sort(
+                    np.where(machine_valid, machine_rank[machine_ids], _LAST_RANK << _RANK_SHIFT)
+                    | (positions << _POSITION_SHIFT) | machine_ids,
+                    axis=1,
+                ) & _INDEX_MASK
+                machines[op_rows, :machine_width] = available_machines
+
+                # Chỉ dùng số cặp cần thiết để đạt phần KPI còn lại
+                min_length = np.minimum(num_available, machine_len)
+                last = np.maximum(min_length - 1, 0)
+                worker_sum = np.cumsum(w_prod[available_workers], axis=1)[pair_index, last]
+                machine_sum = np.cumsum(m_prod[available_machines], axis=1)[pair_index, last]
+                divisor = np.maximum(min_length, 1)
+                avg_pair_output = hours * ((worker_sum / divisor) * (machine_sum / divisor))
+                estimate = (min_length > 0) & (avg_pair_output > 0)
+                needed = np.ceil((target0[ops] - achieved0[op_rows]) / np.where(estimate, avg_pair_output, 1.0))
+                estimated_workers_needed = np.where(
+                    estimate, np.minimum(min_length, np.maximum(1, needed)), 1
+                ).astype(np.int64)
+
+                is_free = machine_valid & ~machines_in_current_shift[
+                    (solutions * num_assets)[:, None] + available_machines
+                ]
+                available_machines_filtered = np.sort(
+                    (~is_free).astype(np.int64) << _RANK_SHIFT | (positions << _POSITION_SHIFT) | available_machines,
+                    axis=1,
+                ) & _INDEX_MASK
+                min_length_filtered = np.minimum(num_available, is_free.sum(axis=1))
+                estimated_workers_needed = np.minimum(estimated_workers_needed, min_length_filtered)
+
+                # Ghép cặp thứ i gồm nhân viên thứ i và máy còn trống thứ i. Cặp chỉ bị bỏ qua khi danh sách
+                # có phần tử lặp (do phân bổ lại), khi đó xét tuần tự từng cặp như bản gốc.
+                num_pairs = int(estimated_workers_needed.max())
+                pair_workers = available_workers[:, :num_pairs]
+                pair_machines = available_machines_filtered[:, :num_pairs]
+                pair_worker_slots = (solutions * num_workers)[:, None] + pair_workers
+                pair_machine_slots = (solutions * num_assets)[:, None] + pair_machines
+                use = np.arange(num_pairs) < estimated_workers_needed[:, None]
+                if num_pairs > 1 and (
+                    self._has_duplicates(pair_workers, use) or self._has_duplicates(pair_machines, use)
+                ):
+                    for i in range(num_pairs):
+                        use[:, i] &= ~(
+                            workers_in_current_shift[pair_worker_slots[:, i]]
+                            | machines_in_current_shift[pair_machine_slots[:, i]]
+                        )
+                        workers_in_current_shift[pair_worker_slots[use[:, i], i]] = True
+                        machines_in_current_shift[pair_machine_slots[use[:, i], i]] = True
+                workers_in_current_shift[pair_worker_slots[use]] = True
+                machines_in_current_shift[pair_machine_slots[use]] = True
+
+                # Cộng dồn theo đúng thứ tự cặp (cumsum tuần tự, bắt đầu từ giá trị hiện có)
+                # để khớp từng bit với bản tuần tự
+                worker_productivity = w_prod[pair_workers]
+                machine_productivity = m_prod[pair_machines]
+                terms = np.zeros((3, solutions.size, num_pairs + 1))
+                terms[2, :, 0] = total_cost[solutions]
+                terms[0, :, 1:] = np.where(use, hours * (worker_productivity * machine_productivity), 0.0)
+                terms[1, :, 1:] = np.where(
+                    use, hours * worker_productivity * machine_productivity * w_quality[pair_workers], 0.0
+                )
+                terms[2, :, 1:] = np.where(use, hours * (w_salary[pair_workers] + m_cost[pair_machines]), 0.0)
+                total_output_kpi0, total_output_kpi1, total_cost[solutions] = np.cumsum(terms, axis=2)[:, :, -1]
+
+                first_visit = op_rows[~visited[op_rows]]
+                first_slot[first_visit] = slot
+                visited[op_rows] = True
+                new_achieved0, new_achieved1, is_completed = apply_kpi_increment_batch(
+                    achieved0[op_rows], achieved1[op_rows], target0[ops], target1[ops],
+                    total_output_kpi0, total_output_kpi1, hours,
+                )
+                achieved0[op_rows] = new_achieved0
+                achieved1[op_rows] = new_achieved1
+
+                for position in np.flatnonzero(is_completed).tolist():
+                    b = int(solutions[position])
+                    j = int(ops[position])
+                    completed_in_shift[b].append(j)
+                    order = op_order[j]
+                    if order >= 0:
+                        completed_by_order[b][order] += 1
+                    if order >= 0 and completed_by_order[b][order] == order_operation_count[order]:
+                        if day <= deadline_day[order]:
+                            completed_orders_on_time[b] += 1
+                        elif cutoff is not None:
+                            # Nhánh cận: lệnh hoàn thành trễ hạn (trừ khi đây là công đoạn cuối cùng)
+                            max_possible_completed_orders[b] -= 1
+                            if (
+                                max_possible_completed_orders[b] < cutoff_completed_orders
+                                and num_completed[b] + len(completed_in_shift[b]) < n_ops
+                            ):
+                                aborted[b] = True
+                                awake[b] = False
+
+            workers_in_last_shift, workers_in_current_shift = workers_in_current_shift, workers_in_last_shift
+            idle = ~workers_in_last_shift.reshape(num_solutions, num_workers).any(axis=1)
+            finished = set()
+            for b in participating:
+                if aborted[b]:
+                    end_slot[b] = slot
+                    finished.add(b)
+                    continue
+                done = completed_in_shift[b]
+                for j in done:
+                    completed[b][j] = 1
+                num_completed[b] += len(done)
+                total_shift[b] += 1
+
+                # Mọi công đoạn đã xong: kết quả đầy đủ, không dừng sớm theo cutoff
+                if num_completed[b] == n_ops:
+                    end_slot[b] = slot
+                    finished.add(b)
+                    continue
+
+                if cutoff is not None and (
+                    max_possible_completed_orders[b] < cutoff_completed_orders
+                    or (max_possible_completed_orders[b] <= cutoff_completed_orders
+                        and total_shift[b] > cutoff_shifts)
+                ):
+                    aborted[b] = True
+                    end_slot[b] = slot
+                    finished.add(b)
+                    continue
+
+                base = b * n_ops
+                if done:
+                    ready_queues[b].complete(done)
+                    changed.add(b)
+
+                    # Trả tài nguyên của công đoạn đã xong về kho chung rồi phân bổ lại.
+                    # Kho và tập công đoạn sẵn sàng chỉ đổi khi có công đoạn hoàn thành nên chỉ phân bổ lại lúc đó.
+                    for j in done:
+                        for w in workers[base + j, :worker_counts[base + j]].tolist():
+                            pool_workers[b].setdefault(worker_position[w], set()).add(w)
+                        for m in machines[base + j, :machine_counts[base + j]].tolist():
+                            pool_machines[b].setdefault(asset_type[m], set()).add(m)
+                        worker_counts[base + j] = 0
+                        machine_counts[base + j] = 0
+                    workers, machines = self._reallocate(
+                        ready_queues[b], base, workers, worker_counts, machines, machine_counts,
+                        pool_workers[b], pool_machines[b],
+                    )
+
+                next_slot = slot + 1
+                if not done and idle[b]:
+                    # Ca trống: trạng thái không đổi cho tới khi có công đoạn làm việc trở lại
+                    next_slot = self._next_event_slot(
+                        ready_queues[b].operations(), base, workers, worker_counts, machine_counts, slot + 1
+                    )
+                    skipped = next_slot - slot - 1
+                    if (
+                        cutoff is not None
+                        and max_possible_completed_orders[b] <= cutoff_completed_orders
+                        and total_shift[b] + skipped > cutoff_shifts
+                    ):
+                        total_shift[b] = cutoff_shifts + 1
+                        aborted[b] = True
+                        end_slot[b] = slot
+                        finished.add(b)
+                        continue
+                    total_shift[b] += skipped
+                if next_slot >= num_slots:
+                    finished.add(b)
+                    continue
+                wake_slot[b] = next_slot
+            if finished:
+                running = [b for b in running if b not in finished]
+                wake_slot[list(finished)] = num_slots
+                ready_matrix[list(finished)] = -1
+                changed -= finished
+
+        fitnesses = []
+        for b in range(num_solutions):
+            if progresses is not None:
+                rows = slice(b * n_ops, (b + 1) * n_ops)
+                progress = progresses[b]
+                progress.parent = None
+                progress.reset(False)
+                progress.achieved_kpi0 = achieved0[rows].tolist()
+                progress.achieved_kpi1 = achieved1[rows].tolist()
+                progress.started = bytearray(visited[rows].tobytes())
+                progress.completed = completed[b]
+                progress.first_slot = first_slot[rows].tolist()
+                progress.allocation = allocations[b]
+                progress.end_slot = end_slot[b]
+            fitnesses.append(Fitness(
+                completed_orders_on_time[b], total_shift[b], float(total_cost[b]), aborted[b]
+            ))
+        return fitnesses
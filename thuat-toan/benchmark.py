@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Đo tốc độ đánh giá giải pháp của các biến thể Harmony Search
+và so sánh các bộ đánh giá (evaluators) trên cùng một tập giải pháp.
+Cách dùng: python benchmark.py [module] [input_file] [số giải pháp] [bộ đánh giá]
+Ví dụ:     python benchmark.py harmony_search input18.json 100 vectorized
+"""
+
+import contextlib
+import importlib
+import io
+import random
+import sys
+import time
+
+from encoder import (
+    load_json,
+    parse_workers,
+    parse_operations,
+    parse_production_orders,
+    parse_assets,
+    build_problem_instance,
+)
+from evaluators import available_evaluators, create_evaluator
+from random_streams import spawn_seeds
+
+
+def load_harmony_search(
+    module_name: str, input_path: str, schedule_path: str, evaluator: str = None, seed=None, **kwargs
+):
+    """
+    Khởi tạo HarmonySearch của module `module_name` với dữ liệu đầu vào.
+    :param evaluator: Tên bộ đánh giá (None: mặc định của module)
+    :param seed: Hạt giống của lần chạy (None: trạng thái chung của module random)
+    :param kwargs: Tham số khác của HarmonySearch (max_iterations, n_jobs, ...)
+    """
+    input_data = load_json(input_path)
+    schedule_data = load_json(schedule_path)
+
+    workers, availability = parse_workers(input_data, schedule_data, as_array=True)
+    operations = parse_operations(input_data)
+    production_orders = parse_production_orders(input_data, operations)
+    assets = parse_assets(input_data)
+    instance = build_problem_instance(
+        workers, assets, operations, production_orders, schedule_data, availability
+    )
+
+    module = importlib.import_module(module_name)
+    options = {} if evaluator is None else {"evaluator": evaluator}
+    return module.HarmonySearch(
+        workers=workers,
+        machines=assets,
+        operations=operations,
+        production_orders=production_orders,
+        instance=instance,
+        seed=seed,
+        **options,
+        **kwargs,
+    )
+
+
+def run_batch(module_name: str, input_path: str, schedule_path: str, seed, num_runs: int, **kwargs) -> list:
+    """
+    Chạy optimize() num_runs lần độc lập: lần chạy thứ i dùng luồng con thứ i của seed (spawn_seeds),
+    nên kết quả của từng lần chạy không phụ thuộc thứ tự, tiến trình chạy hay n_jobs.
+    :param kwargs: Tham số khác của HarmonySearch (max_iterations, n_jobs, ...)
+    :return: Fitness tốt nhất của từng lần chạy
+    """
+    results = []
+    for run_seed in spawn_seeds(seed, num_runs):
+        hs = load_harmony_search(module_name, input_path, schedule_path, seed=run_seed, **kwargs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, best_fitness, _ = hs.optimize()
+        hs.parallel_evaluator.shutdown()
+        results.append(best_fitness)
+    return results
+
+
+def benchmark_candidates(hs, num_candidates: int) -> float:
+    """
+    Đo số giải pháp mới được tạo và đánh giá mỗi giây (improvise_new_solution + evaluate_solution),
+    đúng như vòng lặp chính của optimize().
+    :return: Số giải pháp mỗi giây
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not hs.harmony_memory:
+            hs.initialize_harmony_memory()
+
+        start_time = time.perf_counter()
+        for _ in range(num_candidates):
+            solution, progress = hs.improvise_new_solution()
+            hs.evaluate_solution(solution, progress)
+        elapsed = time.perf_counter() - start_time
+
+    return num_candidates / elapsed
+
+
+def compare_evaluators(hs, num_solutions: int, evaluator_names=None) -> dict:
+    """
+    Đánh giá cùng một lô giải pháp ngẫu nhiên bằng từng bộ đánh giá (Evaluator.evaluate_batch).
+    Fitness chỉ so sánh được giữa các bộ đánh giá cùng mô hình lập lịch
+    ("reference" và "vectorized" phải cho kết quả giống hệt nhau).
+    :param hs: HarmonySearch đã khởi tạo (cung cấp bài toán và bộ sinh giải pháp)
+    :param evaluator_names: Tên các bộ đánh giá cần so sánh (mặc định: tất cả)
+    :return: Tên bộ đánh giá -> (số giải pháp mỗi giây, danh sách Fitness)
+    """
+    allocations = [
+        hs.instance.encode_solution(hs.generate_random_solution()[0]) for _ in range(num_solutions)
+    ]
+    results = {}
+    for name in evaluator_names or available_evaluators():
+        evaluator = create_evaluator(name, hs.instance)
+        start_time = time.perf_counter()
+        fitnesses = evaluator.evaluate_batch(allocations)
+        elapsed = time.perf_counter() - start_time
+        results[name] = (num_solutions / elapsed, fitnesses)
+    return results
+
+
+if __name__ == "__main__":
+    module_name = sys.argv[1] if len(sys.argv) > 1 else "harmony_search"
+    input_filename = sys.argv[2] if len(sys.argv) > 2 else "input18.json"
+    num_candidates = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    evaluator_name = sys.argv[4] if len(sys.argv) > 4 else None
+
+    random.seed(0)
+    hs = load_harmony_search(
+        module_name,
+        f"./data-2/{input_filename}",
+        "./data-2/monthly_schedule_t45.json",
+        evaluator_name,
+    )
+    rate = benchmark_candidates(hs, num_candidates)
+    print(f"{module_name} trên {input_filename}: {rate:.1f} giải pháp/giây ({num_candidates} giải pháp)")
+
+    for name, (rate, fitnesses) in compare_evaluators(hs, num_candidates).items():
+        best = max(fitnesses, key=lambda f: (f[0], -f[1], -f[2]))
+        print(f"  {name:<10}: {rate:.1f} giải pháp/giây, tốt nhất {best}")
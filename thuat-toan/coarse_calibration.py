@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Báo cáo hiệu chỉnh mô hình thô (CoarseModel): mức độ khớp giữa ước lượng thô và đánh giá chính xác
+(ShiftSimulator) trên cùng một tập giải pháp mới của Harmony Search, cho từng file đầu vào trong data-2.
+Cách dùng: python coarse_calibration.py [số giải pháp] [input_file ...]
+Ví dụ:     python coarse_calibration.py 60 input9.json input18.json
+"""
+
+import contextlib
+import glob
+import io
+import itertools
+import os
+import random
+import sys
+import time
+
+from benchmark import load_harmony_search
+from coarse_model import CoarseModel
+
+
+def calibrate(hs, num_candidates: int, margins=(0, 1, 2)) -> dict:
+    """
+    So sánh ước lượng thô với đánh giá chính xác trên các giải pháp mới (improvise_new_solution)
+    sinh từ Harmony Memory vừa khởi tạo.
+    :param hs: HarmonySearch (biến thể dùng ShiftSimulator) đã khởi tạo
+    :param num_candidates: Số giải pháp mới được so sánh
+    :param margins: Các giá trị coarse_margin cần thử cho screen_candidates
+    :return: Dict gồm thời gian mỗi lần đánh giá (ms), tỷ lệ cặp giải pháp được xếp hạng giống nhau
+        (pair_agreement), tỷ lệ cặp có cùng thứ tự theo số lệnh đúng hạn (on_time_agreement),
+        và với mỗi margin: số giải pháp bị loại và số giải pháp bị loại nhầm (thực ra tốt hơn
+        giải pháp tệ nhất trong Harmony Memory)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not hs.harmony_memory:
+            hs.initialize_harmony_memory()
+        solutions = [hs.improvise_new_solution()[0] for _ in range(num_candidates)]
+    model = CoarseModel(hs.instance)
+    allocations = [hs.instance.encode_solution(solution) for solution in solutions]
+
+    start_time = time.perf_counter()
+    estimates = [model.estimate(allocation) for allocation in allocations]
+    coarse_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    fitnesses = [hs.evaluator.evaluate(allocation) for allocation in allocations]
+    exact_time = time.perf_counter() - start_time
+
+    better = hs.is_better_fitness
+    agreed = compared = 0
+    on_time_agreed = on_time_compared = 0
+    for i, k in itertools.combinations(range(num_candidates), 2):
+        if better(fitnesses[i], fitnesses[k]) != better(fitnesses[k], fitnesses[i]):
+            compared += 1
+            agreed += better(estimates[i], estimates[k]) == better(fitnesses[i], fitnesses[k])
+        if fitnesses[i][0] != fitnesses[k][0]:
+            on_time_compared += 1
+            on_time_agreed += (estimates[i][0] > estimates[k][0]) == (fitnesses[i][0] > fitnesses[k][0])
+
+    # Quy tắc sàng lọc của screen_candidates, so với giải pháp tệ nhất trong Harmony Memory
+    worst_solution, worst_fitness, _ = hs.harmony_memory[hs.find_worst_solution_index()]
+    reference = model.estimate(hs.instance.encode_solution(worst_solution))
+    useful = [better(fitness, worst_fitness) for fitness in fitnesses]
+    screening = {}
+    for margin in margins:
+        rejected = [estimate[0] < reference[0] - margin for estimate in estimates]
+        screening[margin] = (sum(rejected), sum(1 for r, u in zip(rejected, useful) if r and u))
+
+    return {
+        "coarse_ms": 1000 * coarse_time / num_candidates,
+        "exact_ms": 1000 * exact_time / num_candidates,
+        "pair_agreement": agreed / compared if compared else None,
+        "on_time_agreement": on_time_agreed / on_time_compared if on_time_compared else None,
+        "useful": sum(useful),
+        "screening": screening,
+    }
+
+
+def _percent(value) -> str:
+    return "  -  " if value is None else f"{value:5.1%}"
+
+
+if __name__ == "__main__":
+    num_candidates = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    input_files = sys.argv[2:] or sorted(
+        os.path.basename(path) for path in glob.glob("./data-2/input*.json")
+    )
+
+    print(f"Hiệu chỉnh mô hình thô trên {num_candidates} giải pháp mới mỗi file "
+          f"(loại/nhầm: số giải pháp bị loại / bị loại nhầm với coarse_margin = 0, 1, 2)")
+    print(f"{'file':<24}{'thô ms':>8}{'chính xác ms':>14}{'khớp cặp':>10}{'khớp đúng hạn':>15}"
+          f"{'có ích':>8}  loại/nhầm")
+    for input_filename in input_files:
+        random.seed(0)
+        try:
+            hs = load_harmony_search(
+                "harmony_search",
+                f"./data-2/{input_filename}",
+                "./data-2/monthly_schedule_t45.json",
+            )
+        except ValueError as error:  # File đầu vào không đọc được (ví dụ JSON rỗng)
+            print(f"{input_filename:<24}bỏ qua: {error}")
+            continue
+        report = calibrate(hs, num_candidates)
+        screening = "  ".join(f"{rejected}/{wrong}" for rejected, wrong in report["screening"].values())
+        print(f"{input_filename:<24}{report['coarse_ms']:8.2f}{report['exact_ms']:14.2f}"
+              f"{_percent(report['pair_agreement']):>10}{_percent(report['on_time_agreement']):>15}"
+              f"{report['useful']:>8}  {screening}")
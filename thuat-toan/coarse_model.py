@@ -0,0 +1,219 @@
+import math
+from typing import List
+
+from models import Fitness, OperationProgress, ProblemInstance
+from simulator import ReadyQueue
+
+
+class CoarseModel:
+    def __init__(self, instance: ProblemInstance, max_days: int = 59):
+        """
+        Mô hình thô (độ chính xác thấp) của ShiftSimulator để sàng lọc nhanh các giải pháp ứng viên.
+        Năng lực được gộp theo ngày thay vì mô phỏng từng ca: mỗi ngày, các công đoạn sẵn sàng
+        (theo độ ưu tiên của ReadyQueue) lần lượt dùng số ca còn trống trong ngày của các nhân viên
+        được phân bổ, mỗi ca-cặp nhân viên - máy cho sản lượng trung bình của các cặp mạnh nhất.
+        Nguồn lực của công đoạn đã xong được phân bổ lại (đơn giản hơn ShiftSimulator).
+        Ước lượng ngày hoàn thành, số ca và chi phí.
+        :param instance: Bài toán đã biên dịch
+        :param max_days: Số ngày tối đa được ước lượng (ngày 0..max_days, như ShiftSimulator)
+        """
+        self.instance = instance
+        self.num_days = max_days + 1
+        spd = instance.shifts_per_day
+        days = min(instance.num_days, self.num_days)
+
+        # Số ca tối đa mỗi nhân viên làm được trong ngày: các ca đi làm, không làm 2 ca liên tiếp
+        self.day_capacity = []
+        for w in range(instance.num_workers):
+            capacity = [0] * self.num_days
+            for d in range(days):
+                last = -2
+                for s in range(spd):
+                    if instance.availability[w, d, s] and s > last + 1:
+                        capacity[d] += 1
+                        last = s
+            self.day_capacity.append(capacity)
+
+        # Thứ tự xét công đoạn sẵn sàng: độ ưu tiên của ReadyQueue tại ngày đầu tiên
+        ready_queue = ReadyQueue(instance)
+        self.priority = [ready_queue.priority(j, 0) for j in range(instance.num_operations)]
+        self.initial_indegree = ready_queue.initial_indegree
+        self.initial_ready = sorted(ready_queue.initial_ready, key=self.priority.__getitem__)
+        self.realloc_rank = ready_queue.realloc_rank
+
+    def _pair_shifts_needed(self, j: int, workers: List[int], machines: List[int]) -> tuple:
+        """
+        Số ca-cặp cần để công đoạn j đạt cả hai KPI với nguồn lực được phân bổ.
+        :return: (số ca-cặp cần, nhân viên theo năng suất giảm dần, số cặp ghép được mỗi ca,
+            chi phí trung bình của một ca-cặp); số ca-cặp cần là math.inf nếu không thể đạt KPI
+        """
+        inst = self.instance
+        hours = inst.hours_per_shift
+        workers = sorted(workers, key=inst.worker_productivity_rank.__getitem__)
+        machines = sorted(machines, key=inst.asset_productivity_rank.__getitem__)
+        pairs = min(len(workers), len(machines))
+        target0 = inst.op_target0[j]
+        target1 = inst.op_target1[j]
+        if target0 <= 0 and target1 <= 0:
+            return 0, workers, pairs, 0.0
+        if pairs == 0:
+            return math.inf, workers, pairs, 0.0
+
+        # Trung bình trên các cặp mạnh nhất (ShiftSimulator ghép theo năng suất giảm dần)
+        top_workers, top_machines = workers[:pairs], machines[:pairs]
+        output0 = hours * sum(inst.worker_productivity[w] for w in top_workers) * sum(
+            inst.asset_productivity[m] for m in top_machines
+        ) / (pairs * pairs)
+        output1 = output0 * sum(inst.worker_quality[w] for w in top_workers) / pairs
+        pair_cost = hours * (
+            sum(inst.worker_salary[w] for w in top_workers) + sum(inst.asset_cost[m] for m in top_machines)
+        ) / pairs
+        need = max(
+            target0 / output0 if output0 > 0 else math.inf,
+            target1 / output1 if output1 > 0 else (math.inf if target1 > 0 else 0),
+        )
+        return need, workers, pairs, pair_cost
+
+    def _reallocate(self, pooled, required, key, resources_of, ready, finish_day, needed):
+        """
+        Giao nguồn lực trong kho chung của một vị trí (loại máy) `key` cho công đoạn sẵn sàng chưa xong
+        có thứ hạng phân bổ lại (ReadyQueue.realloc_rank) nhỏ nhất cần vị trí (loại máy) đó;
+        nếu chưa có công đoạn nhận, nguồn lực ở lại kho.
+        :param pooled: Nguồn lực trong kho của `key` (được làm rỗng khi đã giao)
+        :param required: Vị trí (loại máy) yêu cầu của từng công đoạn
+        """
+        if not pooled:
+            return
+        target = min(
+            (j for j in ready if required[j] == key and finish_day[j] is None),
+            key=self.realloc_rank.__getitem__, default=None,
+        )
+        if target is not None:
+            resources_of[target] = list(resources_of[target]) + pooled
+            pooled.clear()
+            needed.pop(target, None)
+
+    def estimate(self, allocation: List[tuple], progress: OperationProgress = None) -> Fitness:
+        """
+        Ước lượng fitness của một phân bổ.
+        :param allocation: Phân bổ (xem ProblemInstance.encode_solution)
+        :param progress: Nơi ghi KPI ước lượng và trạng thái hoàn thành; None nếu chỉ cần fitness
+        :return: Fitness ước lượng (số lệnh hoàn thành đúng hạn, tổng số ca, tổng chi phí)
+        """
+        inst = self.instance
+        n_ops = inst.num_operations
+        num_days = self.num_days
+        spd = inst.shifts_per_day
+        succ_ptr, succ_idx = inst.succ_ptr, inst.succ_idx
+        w_position = inst.worker_position
+        m_type = inst.asset_type
+        op_position = inst.op_position
+        op_machine_type = inst.op_machine_type
+        day_capacity = self.day_capacity
+        priority = self.priority.__getitem__
+        if progress is not None:
+            progress.reset()
+
+        indegree = list(self.initial_indegree)
+        ready = list(self.initial_ready)
+        workers_of = [resources[0] for resources in allocation]
+        machines_of = [resources[1] for resources in allocation]
+        pool_workers = [[] for _ in inst.positions]       # Vị trí -> nhân viên chờ công đoạn nhận
+        pool_machines = [[] for _ in inst.machine_types]  # Loại máy -> máy chờ công đoạn nhận
+        capacity = {}  # Nhân viên -> số ca còn trống theo ngày (chỉ sao chép khi được dùng)
+        needed = {}  # Công đoạn sẵn sàng -> kết quả của _pair_shifts_needed (tính lại khi nhận thêm nguồn lực)
+        share = [0.0] * n_ops  # Phần KPI đã đạt (1: hoàn thành)
+        finish_day = [None] * n_ops  # None: không hoàn thành trong giới hạn
+        ready_slot = [0] * n_ops  # Ca sớm nhất công đoạn được bắt đầu (sau ca hoàn thành của tiền nhiệm)
+        end_slot = 0  # Ca cuối cùng có công đoạn hoàn thành
+        num_completed = 0
+        total_cost = 0.0
+
+        for day in range(num_days):
+            if not ready:
+                break
+            day_end = (day + 1) * spd  # Ca đầu tiên của ngày hôm sau
+            done = []
+            i = 0
+            # Công đoạn kế nhiệm sẵn sàng trong ngày được nối vào cuối và làm ngay từ ca sau ca hoàn thành
+            while i < len(ready):
+                j = ready[i]
+                i += 1
+                start = max(ready_slot[j], day * spd)
+                if finish_day[j] is not None or start >= day_end:
+                    continue
+                if j not in needed:
+                    needed[j] = self._pair_shifts_needed(j, workers_of[j], machines_of[j])
+                need, workers, pairs, pair_cost = needed[j]
+                used = 0
+                if need > 0:
+                    if need == math.inf:
+                        continue
+                    shifts = day_end - start
+                    left = min(math.ceil((1.0 - share[j]) * need - 1e-9), pairs * shifts)
+                    max_take = (shifts + 1) // 2  # Không làm 2 ca liên tiếp
+                    for w in workers:
+                        if w not in capacity:
+                            capacity[w] = list(day_capacity[w])
+                        take = min(capacity[w][day], max_take, left - used)
+                        if take > 0:
+                            capacity[w][day] -= take
+                            used += take
+                            if used == left:
+                                break
+                    share[j] += used / need
+                    total_cost += used * pair_cost
+                    if share[j] < 1.0 - 1e-9:
+                        continue
+                finish_day[j] = day
+                finish_slot = start + (math.ceil(used / pairs) - 1 if used else 0)
+                end_slot = max(end_slot, finish_slot)
+                done.append(j)
+                # Như ShiftSimulator: nguồn lực của công đoạn vừa xong về kho chung rồi được giao
+                # cho công đoạn sẵn sàng đứng đầu (theo hạn chót) cùng vị trí/loại máy.
+                # Kho chỉ thay đổi ở các vị trí (loại máy) này và của công đoạn vừa sẵn sàng.
+                positions = {w_position[w] for w in workers_of[j]}
+                machine_types = {m_type[m] for m in machines_of[j]}
+                for w in workers_of[j]:
+                    pool_workers[w_position[w]].append(w)
+                for m in machines_of[j]:
+                    pool_machines[m_type[m]].append(m)
+                for k in range(succ_ptr[j], succ_ptr[j + 1]):
+                    succ = succ_idx[k]
+                    indegree[succ] -= 1
+                    ready_slot[succ] = max(ready_slot[succ], finish_slot + 1)
+                    if indegree[succ] == 0:
+                        ready.append(succ)
+                        positions.add(op_position[succ])
+                        machine_types.add(op_machine_type[succ])
+                for key in positions:
+                    self._reallocate(pool_workers[key], op_position, key, workers_of, ready, finish_day, needed)
+                for key in machine_types:
+                    self._reallocate(pool_machines[key], op_machine_type, key, machines_of, ready, finish_day, needed)
+            if done:
+                num_completed += len(done)
+                ready = sorted((j for j in ready if finish_day[j] is None), key=priority)
+
+        if progress is not None:
+            for j in needed:
+                progress.started[j] = 1
+                progress.completed[j] = finish_day[j] is not None
+                progress.achieved_kpi0[j] = inst.op_target0[j] * min(share[j], 1.0)
+                progress.achieved_kpi1[j] = inst.op_target1[j] * min(share[j], 1.0)
+
+        # Lệnh đúng hạn: đủ số công đoạn hoàn thành và công đoạn cuối xong trước hạn chót
+        completed_by_order = [0] * inst.num_orders
+        last_day = [0] * inst.num_orders
+        for j in range(n_ops):
+            order = inst.op_order[j]
+            if order >= 0 and finish_day[j] is not None:
+                completed_by_order[order] += 1
+                last_day[order] = max(last_day[order], finish_day[j])
+        completed_orders_on_time = sum(
+            1 for k in range(inst.num_orders)
+            if completed_by_order[k] == inst.order_operation_count[k]
+            and last_day[k] <= inst.order_deadline_day[k]
+        )
+        # Như ShiftSimulator, số ca tính tới khi mọi công đoạn hoàn thành (hoặc hết giới hạn)
+        total_shift = end_slot + 1 if num_completed == n_ops else num_days * spd
+        return Fitness(completed_orders_on_time, total_shift, total_cost)
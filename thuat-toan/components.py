@@ -0,0 +1,66 @@
+from typing import List
+
+
+class ResourceComponents:
+    def __init__(self, instance: "ProblemInstance"):
+        """
+        Tách các công đoạn thành các thành phần liên thông độc lập về tài nguyên, tính một lần cho mỗi bài toán.
+        Hai công đoạn thuộc cùng thành phần nếu cần cùng vị trí nhân viên, cùng loại máy, thuộc cùng
+        lệnh sản xuất hoặc có quan hệ tiền nhiệm (hợp nhất bằng union-find). Nhân viên chỉ được phân bổ
+        lại trong cùng vị trí và máy trong cùng loại, nên các thành phần được mô phỏng độc lập với nhau.
+        - component_of[j]: chỉ số thành phần của công đoạn j
+        - operations[c]: các công đoạn của thành phần c (theo thứ tự của instance)
+        - positions[c], machine_types[c]: mã vị trí và loại máy mà thành phần c cần
+        Các thành phần được đánh số theo công đoạn nhỏ nhất của chúng.
+        :param instance: Bài toán đã biên dịch
+        """
+        n_ops = instance.num_operations
+        parent = list(range(n_ops))
+
+        def find(j: int) -> int:
+            while parent[j] != j:
+                parent[j] = parent[parent[j]]
+                j = parent[j]
+            return j
+
+        def union(a: int, b: int):
+            a, b = find(a), find(b)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+        # Công đoạn đầu tiên gặp của mỗi vị trí / loại máy / lệnh sản xuất
+        first_by_position = {}
+        first_by_machine_type = {}
+        first_by_order = {}
+        for j in range(n_ops):
+            union(first_by_position.setdefault(instance.op_position[j], j), j)
+            union(first_by_machine_type.setdefault(instance.op_machine_type[j], j), j)
+            if instance.op_order[j] >= 0:
+                union(first_by_order.setdefault(instance.op_order[j], j), j)
+            for p in instance.pred_idx[instance.pred_ptr[j]:instance.pred_ptr[j + 1]]:
+                union(p, j)
+
+        index_of_root = {}
+        self.component_of = []
+        self.operations = []
+        for j in range(n_ops):
+            root = find(j)
+            if root not in index_of_root:
+                index_of_root[root] = len(self.operations)
+                self.operations.append([])
+            self.component_of.append(index_of_root[root])
+            self.operations[index_of_root[root]].append(j)
+
+        self.positions = [sorted({instance.op_position[j] for j in ops}) for ops in self.operations]
+        self.machine_types = [sorted({instance.op_machine_type[j] for j in ops}) for ops in self.operations]
+
+    @property
+    def num_components(self) -> int:
+        return len(self.operations)
+
+    def sizes(self) -> List[int]:
+        """Số công đoạn của từng thành phần."""
+        return [len(ops) for ops in self.operations]
+
+    def __repr__(self):
+        return f"ResourceComponents(components={self.num_components}, sizes={self.sizes()})"
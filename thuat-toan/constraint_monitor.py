@@ -0,0 +1,100 @@
+from typing import List, Dict
+
+from models import ProblemInstance
+
+# Các loại vi phạm được kiểm tra
+VIOLATION_TYPES = (
+    "worker_double_booked",   # Nhân viên được phân công hai lần trong cùng một ca
+    "machine_double_booked",  # Máy được phân công hai lần trong cùng một ca
+    "consecutive_shift",      # Nhân viên làm hai ca liên tiếp
+    "worker_unavailable",     # Nhân viên không đi làm ca đó theo lịch
+    "wrong_position",         # Nhân viên không đúng vị trí công đoạn yêu cầu
+    "wrong_machine_type",     # Máy không đúng loại công đoạn yêu cầu
+    "precedence",             # Công đoạn làm trước khi mọi tiền nhiệm hoàn thành
+)
+
+
+class ConstraintMonitor:
+    def __init__(self, instance: ProblemInstance, max_days: int = 59):
+        """
+        Bộ kiểm tra ràng buộc trực tuyến cho bộ mô phỏng (chế độ gỡ lỗi): mỗi lần phân công một cặp
+        nhân viên - máy được kiểm tra trong O(1) ngay khi ghi, thay vì duyệt lại lịch chi tiết sau mỗi lần đánh giá.
+        Các lần phân công phải được ghi theo thứ tự ca không giảm (như ShiftSimulator.run).
+        :param instance: Bài toán đã biên dịch
+        :param max_days: Số ngày tối đa của bộ mô phỏng (để gắn nhãn ngày trong báo cáo)
+        """
+        self.instance = instance
+        self.day_labels = instance.calendar.labels(max_days + 1)
+        self.violations = []  # (loại, công đoạn, ca tuyệt đối, nhân viên, máy)
+        self.reset()
+
+    def reset(self):
+        """Đưa trạng thái về ban đầu cho một lần mô phỏng mới."""
+        inst = self.instance
+        self.worker_last_slot = [-2] * inst.num_workers  # Ca gần nhất nhân viên được phân công
+        self.machine_last_slot = [-1] * inst.num_assets  # Ca gần nhất máy được phân công
+        # Số tiền nhiệm chưa hoàn thành (kể cả tiền nhiệm không tồn tại) và ca sớm nhất được làm
+        self.remaining_preds = [
+            inst.pred_ptr[j + 1] - inst.pred_ptr[j] + inst.op_missing_preds[j]
+            for j in range(inst.num_operations)
+        ]
+        self.ready_slot = [0] * inst.num_operations
+        self.violations = []
+
+    def book(self, j: int, slot: int, w: int, m: int):
+        """
+        Kiểm tra một lần phân công nhân viên w và máy m cho công đoạn j ở ca tuyệt đối `slot`.
+        """
+        inst = self.instance
+        last = self.worker_last_slot[w]
+        if last == slot:
+            self.violations.append(("worker_double_booked", j, slot, w, m))
+        elif last == slot - 1:
+            self.violations.append(("consecutive_shift", j, slot, w, m))
+        self.worker_last_slot[w] = slot
+        if self.machine_last_slot[m] == slot:
+            self.violations.append(("machine_double_booked", j, slot, w, m))
+        self.machine_last_slot[m] = slot
+
+        day, shift = divmod(slot, inst.shifts_per_day)
+        if day >= inst.num_days or not inst.availability[w, day, shift]:
+            self.violations.append(("worker_unavailable", j, slot, w, m))
+        if inst.worker_position[w] != inst.op_position[j]:
+            self.violations.append(("wrong_position", j, slot, w, m))
+        if inst.asset_type[m] != inst.op_machine_type[j]:
+            self.violations.append(("wrong_machine_type", j, slot, w, m))
+        if self.remaining_preds[j] > 0 or slot < self.ready_slot[j]:
+            self.violations.append(("precedence", j, slot, w, m))
+
+    def complete(self, j: int, slot: int):
+        """Ghi nhận công đoạn j hoàn thành ở cuối ca `slot` (kế nhiệm chỉ được làm từ ca sau)."""
+        inst = self.instance
+        for k in range(inst.succ_ptr[j], inst.succ_ptr[j + 1]):
+            succ = inst.succ_idx[k]
+            self.remaining_preds[succ] -= 1
+            self.ready_slot[succ] = max(self.ready_slot[succ], slot + 1)
+
+    def report(self) -> Dict:
+        """
+        Báo cáo vi phạm của lần mô phỏng gần nhất.
+        :return: Dict gồm tổng số vi phạm (total), số vi phạm theo loại (by_type) và danh sách chi tiết
+            (violations: loại, mã công đoạn, ngày, ca tính từ 1, mã nhân viên, mã máy)
+        """
+        inst = self.instance
+        by_type = dict.fromkeys(VIOLATION_TYPES, 0)
+        details: List[Dict] = []
+        for kind, j, slot, w, m in self.violations:
+            by_type[kind] += 1
+            day, shift = divmod(slot, inst.shifts_per_day)
+            details.append({
+                "type": kind,
+                "operation_id": inst.operation_ids[j],
+                "day": self.day_labels[day],
+                "shift": shift + 1,
+                "worker_id": inst.worker_ids[w],
+                "asset_id": inst.asset_ids[m],
+            })
+        return {"total": len(details), "by_type": by_type, "violations": details}
+
+    def __repr__(self):
+        return f"ConstraintMonitor(violations={len(self.violations)})"
@@ -0,0 +1,128 @@
+import math
+
+
+class CriticalPath:
+    def __init__(self, instance: "ProblemInstance"):
+        """
+        Phân tích đường găng của đồ thị công đoạn, tính một lần cho mỗi bài toán.
+        Mọi đại lượng tính theo ca tuyệt đối (slot = ngày * số ca + ca) và là cận dưới:
+        mỗi công đoạn dùng toàn bộ nhân viên đúng vị trí và máy đúng loại trong mọi ca.
+        - dependent_count[j]: số công đoạn kế nhiệm trực tiếp của j
+        - depth[j]: số công đoạn trên chuỗi tiền nhiệm dài nhất kết thúc trước j
+        - min_shifts[j]: số ca tối thiểu để j đạt KPI với cặp nhân viên - máy tốt nhất (math.inf nếu không thể)
+        - tail_shifts[j]: tổng min_shifts trên chuỗi dài nhất bắt đầu từ j (khối lượng còn lại phía sau)
+        - earliest_start[j], latest_start[j]: ca bắt đầu sớm nhất và muộn nhất để lệnh vẫn kịp hạn chót
+          (latest_start là None nếu công đoạn không thuộc lệnh nào)
+        - slack[j]: latest_start - earliest_start (None nếu không có hạn chót)
+        - urgency_rank[j]: thứ hạng độ gấp của j (0 là gấp nhất): slack tăng dần (không có hạn chót xếp sau),
+          rồi tail_shifts giảm dần; các quy tắc ưu tiên dùng để phân định công đoạn cùng độ ưu tiên
+        - order_operations[k], order_critical_shifts[k], order_slack[k]: công đoạn, độ dài đường găng
+          và độ trễ cho phép nhỏ nhất của lệnh sản xuất k
+        Công đoạn không bao giờ sẵn sàng (tiền nhiệm không tồn tại hoặc nằm trong chu trình phụ thuộc)
+        có earliest_start và tail_shifts bằng math.inf, latest_start và slack bằng None.
+        :param instance: Bài toán đã biên dịch
+        """
+        n_ops = instance.num_operations
+        spd = instance.shifts_per_day
+        pred_ptr, pred_idx = instance.pred_ptr, instance.pred_idx
+        succ_ptr, succ_idx = instance.succ_ptr, instance.succ_idx
+
+        self.dependent_count = [succ_ptr[j + 1] - succ_ptr[j] for j in range(n_ops)]
+
+        # Sản lượng tốt nhất trong một ca: ghép nhân viên mạnh nhất với máy mạnh nhất (cùng thứ hạng)
+        best_output = {}
+        self.min_shifts = []
+        for j in range(n_ops):
+            key = (instance.op_position[j], instance.op_machine_type[j])
+            if key not in best_output:
+                best_output[key] = self._best_output_per_shift(instance, *key)
+            best0, best1 = best_output[key]
+            self.min_shifts.append(max(
+                self._shifts_needed(instance.op_target0[j], best0),
+                self._shifts_needed(instance.op_target1[j], best1) if instance.op_kpi_count[j] > 1 else 0,
+            ))
+
+        # Thứ tự topo (Kahn). Như ReadyQueue, tiền nhiệm không tồn tại được tính vào bậc vào nên
+        # công đoạn đó (và các công đoạn phía sau) không bao giờ được đưa vào, giống công đoạn trong chu trình
+        indegree = [pred_ptr[j + 1] - pred_ptr[j] + instance.op_missing_preds[j] for j in range(n_ops)]
+        self.topological_order = [j for j in range(n_ops) if indegree[j] == 0]
+        for j in self.topological_order:
+            for s in succ_idx[succ_ptr[j]:succ_ptr[j + 1]]:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    self.topological_order.append(s)
+
+        # Lượt xuôi: công đoạn kế nhiệm bắt đầu ở ca ngay sau ca cuối của mọi tiền nhiệm
+        self.depth = [0] * n_ops
+        self.earliest_start = [math.inf] * n_ops
+        for j in self.topological_order:
+            preds = pred_idx[pred_ptr[j]:pred_ptr[j + 1]]
+            self.earliest_start[j] = max((self.earliest_start[p] + self.min_shifts[p] for p in preds), default=0)
+            self.depth[j] = max((self.depth[p] + 1 for p in preds), default=0)
+
+        # Lượt ngược: khối lượng còn lại phía sau và ca bắt đầu muộn nhất theo hạn chót của lệnh
+        self.tail_shifts = [math.inf] * n_ops
+        self.latest_start = [None] * n_ops
+        self.slack = [None] * n_ops
+        for j in reversed(self.topological_order):
+            succs = succ_idx[succ_ptr[j]:succ_ptr[j + 1]]
+            self.tail_shifts[j] = self.min_shifts[j] + max((self.tail_shifts[s] for s in succs), default=0)
+            order = instance.op_order[j]
+            if order >= 0:
+                deadline_end = (instance.order_deadline_day[order] + 1) * spd  # Ca đầu tiên sau hạn chót
+                self.latest_start[j] = deadline_end - self.tail_shifts[j]
+                self.slack[j] = self.latest_start[j] - self.earliest_start[j]
+
+        # Công đoạn ít độ trễ cho phép và còn nhiều việc phía sau được chọn tài nguyên trước
+        by_urgency = sorted(
+            range(n_ops),
+            key=lambda j: (math.inf if self.slack[j] is None else self.slack[j], -self.tail_shifts[j]),
+        )
+        self.urgency_rank = [0] * n_ops
+        for rank, j in enumerate(by_urgency):
+            self.urgency_rank[j] = rank
+
+        # Tổng hợp theo lệnh sản xuất
+        self.order_operations = [[] for _ in range(instance.num_orders)]
+        for j in range(n_ops):
+            if instance.op_order[j] >= 0:
+                self.order_operations[instance.op_order[j]].append(j)
+        self.order_critical_shifts = [
+            max((self.earliest_start[j] + self.tail_shifts[j] for j in ops), default=0)
+            for ops in self.order_operations
+        ]
+        # Công đoạn không bao giờ sẵn sàng (slack là None) không tham gia độ trễ cho phép của lệnh
+        self.order_slack = [
+            min((self.slack[j] for j in ops if self.slack[j] is not None), default=None)
+            for ops in self.order_operations
+        ]
+
+    @staticmethod
+    def _best_output_per_shift(instance: "ProblemInstance", position: int, machine_type: int) -> tuple:
+        """
+        Sản lượng và chất lượng lớn nhất đạt được trong một ca khi mọi nhân viên đúng vị trí
+        và mọi máy đúng loại cùng làm việc (ghép theo thứ hạng, mạnh nhất với mạnh nhất).
+        """
+        hours = instance.hours_per_shift
+        workers = instance.workers_by_position[position]
+        assets = instance.assets_by_type[machine_type]
+        machine_output = sorted((instance.asset_productivity[a] for a in assets), reverse=True)
+        worker_output = sorted((instance.worker_productivity[w] for w in workers), reverse=True)
+        worker_quality = sorted(
+            (instance.worker_productivity[w] * instance.worker_quality[w] for w in workers), reverse=True
+        )
+        best0 = hours * sum(w * m for w, m in zip(worker_output, machine_output))
+        best1 = hours * sum(w * m for w, m in zip(worker_quality, machine_output))
+        return best0, best1
+
+    @staticmethod
+    def _shifts_needed(target: float, output_per_shift: float) -> float:
+        if target <= 0:
+            return 0
+        if output_per_shift <= 0:
+            return math.inf
+        return math.ceil(target / output_per_shift)
+
+    def __repr__(self):
+        critical = sum(1 for s in self.slack if s is not None and s <= 0)
+        return f"CriticalPath(operations={len(self.slack)}, critical={critical})"
@@ -1,6 +1,15 @@
 import json
 from typing import List, Dict
-from models import Worker, Operation, ProductionOrder, Asset
+import numpy as np
+from models import (
+    Worker,
+    Operation,
+    ProductionOrder,
+    Asset,
+    ProblemInstance,
+    WorkerAvailability,
+)
+from shift_calendar import date_range, parse_date
 
 
 def load_json(file_path: str) -> dict:
@@ -9,8 +18,16 @@ def load_json(file_path: str) -> dict:
         return json.load(file)
 
 
-def parse_workers(input_data: dict, schedule_data: list) -> List[Worker]:
-    """Parse danh sách nhân viên từ input.json và monthly_schedule.json."""
+def parse_workers(input_data: dict, schedule_data: list, as_array: bool = False):
+    """
+    Parse danh sách nhân viên từ input.json và monthly_schedule.json.
+    :param as_array: Nếu True, lịch làm việc được lưu trong một mảng NumPy bool
+        (nhân viên × ngày × ca) và mỗi Worker.schedule là khung nhìn lên mảng đó.
+    :return: Danh sách nhân viên, hoặc tuple (danh sách nhân viên, WorkerAvailability) nếu as_array=True.
+    """
+    if as_array:
+        return _parse_workers_as_array(input_data, schedule_data)
+
     # Tạo dictionary để lưu lịch làm việc của từng nhân viên
     worker_schedules = {}
 
@@ -41,6 +58,51 @@ def parse_workers(input_data: dict, schedule_data: list) -> List[Worker]:
     return workers
 
 
+def _parse_workers_as_array(input_data: dict, schedule_data: list):
+    """Parse nhân viên và lịch làm việc dạng mảng (xem parse_workers)."""
+    worker_ids = [worker_data["id"] for worker_data in input_data["workers"]]
+    worker_index = {worker_id: i for i, worker_id in enumerate(worker_ids)}
+    dates = [day["date"] for day in schedule_data]
+    shifts_per_day = max(
+        [day.get("shift_count", 0) for day in schedule_data]
+        + [len(shifts) for day in schedule_data for shifts in day["schedule"].values()]
+        + [1]
+    )
+
+    matrix = np.zeros((len(worker_ids), len(dates), shifts_per_day), dtype=bool)
+    has_schedule = np.zeros(len(worker_ids), dtype=bool)
+    for d, day in enumerate(schedule_data):
+        for worker_id, shifts in day["schedule"].items():
+            i = worker_index.get(worker_id)
+            if i is None:
+                continue
+            matrix[i, d, : len(shifts)] = np.asarray(shifts) == 1
+            has_schedule[i] = True
+
+    availability = WorkerAvailability(
+        worker_ids=worker_ids,
+        positions=[worker_data["position"] for worker_data in input_data["workers"]],
+        dates=dates,
+        matrix=matrix,
+    )
+
+    workers = []
+    for i, worker_data in enumerate(input_data["workers"]):
+        worker = Worker(
+            id=worker_data["id"],
+            name=worker_data["name"],
+            position=worker_data["position"],
+            productivity_kpi=worker_data["productivityKPI"],
+            quality_kpi=worker_data["qualityKPI"],
+            salary_per_hour=worker_data["salaryPerHour"],
+            # Nhân viên không có trong file lịch giữ lịch rỗng như trước
+            schedule=availability.view(i) if has_schedule[i] else {},
+        )
+        workers.append(worker)
+
+    return workers, availability
+
+
 def parse_operations(input_data: dict) -> List[Operation]:
     """Parse danh sách công đoạn từ input.json."""
     operations = []
@@ -126,3 +188,61 @@ def parse_assets(input_data: dict) -> List[Asset]:
         )
         assets.append(asset)
     return assets
+
+
+def build_problem_instance(
+    workers: List[Worker],
+    assets: List[Asset],
+    operations: List[Operation],
+    production_orders: List[ProductionOrder],
+    schedule_data: list = None,
+    availability: WorkerAvailability = None,
+) -> ProblemInstance:
+    """
+    Biên dịch các đối tượng đã parse thành ProblemInstance (chỉ số nguyên).
+    Ngày 0 là ngày đầu tiên của lịch làm việc (như greedy/harmony search trước đây), lịch kéo dài
+    liên tục tới ngày cuối cùng của lịch làm việc (hoặc hạn chót muộn nhất nếu muộn hơn).
+    Chỉ khi không có lịch làm việc nào mới lấy ngày bắt đầu sớm nhất của các lệnh sản xuất.
+    :param schedule_data: Dữ liệu monthly_schedule.json (nếu không có sẽ suy ra từ lịch của nhân viên).
+    :param availability: Lịch làm việc dạng mảng từ parse_workers(..., as_array=True).
+    """
+    schedule_dates = set()
+    if schedule_data:
+        schedule_dates.update(day["date"] for day in schedule_data)
+    elif availability is not None:
+        schedule_dates.update(availability.dates)
+    else:
+        for worker in workers:
+            schedule_dates.update(worker.schedule.keys())
+    known_dates = schedule_dates | {order.end_date for order in production_orders}
+
+    if schedule_dates:
+        start = min(schedule_dates, key=parse_date)
+    else:
+        start = min((order.start_date for order in production_orders if order.start_date), key=parse_date)
+    dates = date_range(start, max(known_dates | {start}, key=parse_date))
+
+    shifts_per_day = schedule_data[0]["shift_count"] if schedule_data else 4
+    hours_per_shift = schedule_data[0]["work_duration_per_shift"] if schedule_data else 5.5
+
+    return ProblemInstance(
+        workers=workers,
+        assets=assets,
+        operations=operations,
+        production_orders=production_orders,
+        dates=dates,
+        shifts_per_day=shifts_per_day,
+        hours_per_shift=hours_per_shift,
+        availability=availability,
+    )
+
+
+def compile_problem_instance(input_data: dict, schedule_data: list) -> ProblemInstance:
+    """Parse input.json + monthly_schedule.json và biên dịch thành ProblemInstance."""
+    workers, availability = parse_workers(input_data, schedule_data, as_array=True)
+    operations = parse_operations(input_data)
+    production_orders = parse_production_orders(input_data, operations)
+    assets = parse_assets(input_data)
+    return build_problem_instance(
+        workers, assets, operations, production_orders, schedule_data, availability
+    )
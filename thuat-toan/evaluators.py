@@ -0,0 +1,369 @@
+import copy
+from typing import List, Dict, Callable
+
+from batch_simulator import BatchSimulator
+from coarse_model import CoarseModel
+from constraint_monitor import VIOLATION_TYPES
+from fitness_cache import FitnessCache
+from greedy_scheduler import GreedyScheduler
+from models import Fitness, OperationProgress, ProblemInstance
+from simulator import ShiftSimulator
+
+# Tên -> lớp Evaluator đã đăng ký (xem register_evaluator)
+EVALUATORS: Dict[str, type] = {}
+
+
+def register_evaluator(name: str) -> Callable:
+    """
+    Đăng ký một lớp Evaluator dưới tên `name` để các biến thể Harmony Search chọn theo tên.
+    Dùng làm decorator: @register_evaluator("reference").
+    """
+    def decorator(cls):
+        if name in EVALUATORS:
+            raise ValueError(f"Bộ đánh giá '{name}' đã được đăng ký")
+        cls.name = name
+        EVALUATORS[name] = cls
+        return cls
+    return decorator
+
+
+def available_evaluators() -> List[str]:
+    """Tên các bộ đánh giá đã đăng ký."""
+    return sorted(EVALUATORS)
+
+
+def create_evaluator(evaluator, instance: ProblemInstance) -> "Evaluator":
+    """
+    Tạo bộ đánh giá cho một bài toán.
+    :param evaluator: Tên đã đăng ký (xem available_evaluators) hoặc một Evaluator đã tạo sẵn
+        (phải được tạo cho cùng ProblemInstance)
+    :param instance: Bài toán đã biên dịch
+    """
+    if isinstance(evaluator, Evaluator):
+        if evaluator.instance is not instance:
+            raise ValueError("Bộ đánh giá được tạo cho một ProblemInstance khác")
+        return evaluator
+    if evaluator not in EVALUATORS:
+        raise ValueError(
+            f"Không có bộ đánh giá '{evaluator}' (có: {', '.join(available_evaluators())})"
+        )
+    return EVALUATORS[evaluator](instance)
+
+
+class Evaluator:
+    """
+    Giao diện chung của các bộ đánh giá phân bổ mà mọi biến thể Harmony Search dùng.
+    Bộ đánh giá chỉ lập lịch phân bổ đã mã hóa (ProblemInstance.encode_solution); bộ nhớ đệm fitness
+    và đếm số lần dừng sớm do Harmony Search đảm nhận. Bộ đánh giá phải pickle được
+    (ParallelEvaluator gửi evaluate_batch sang tiến trình con).
+    """
+    name = None
+    supports_checkpoints = False  # evaluate(..., checkpoint=True) lưu điểm lưu để chạy lại từ giữa chừng
+    reports_violations = False  # evaluate ghi báo cáo vi phạm ràng buộc vào progress.violations
+
+    def __init__(self, instance: ProblemInstance):
+        self.instance = instance
+
+    def evaluate(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        """
+        Lập lịch một phân bổ.
+        :param allocation: Phân bổ (xem ProblemInstance.encode_solution)
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành; None nếu chỉ cần fitness
+        :param record: Ghi thêm lịch chi tiết vào progress.schedule
+        :param cutoff: Fitness ngưỡng để dừng sớm (Fitness.aborted)
+        :param checkpoint: Lưu điểm lưu vào progress; bị bỏ qua nếu không supports_checkpoints
+        """
+        raise NotImplementedError
+
+    def evaluate_batch(
+        self,
+        allocations: List[List[tuple]],
+        progresses: List[OperationProgress] = None,
+        cutoff: tuple = None,
+    ) -> List[Fitness]:
+        """
+        Lập lịch một lô phân bổ (hàm đánh giá của ParallelEvaluator); mặc định lần lượt từng phân bổ.
+        :param allocations: Danh sách phân bổ
+        :param progresses: Nơi ghi KPI đạt được cho từng phân bổ; None nếu chỉ cần fitness
+        :param cutoff: Fitness ngưỡng dùng chung cho cả lô
+        :return: Danh sách Fitness theo thứ tự của allocations
+        """
+        if progresses is None:
+            progresses = [None] * len(allocations)
+        return [
+            self.evaluate(allocation, progress, cutoff=cutoff)
+            for allocation, progress in zip(allocations, progresses)
+        ]
+
+    def export_operations(self, progress: OperationProgress) -> List:
+        """
+        Tạo bản sao các công đoạn mang KPI đạt được và lịch chi tiết từ progress
+        (kết quả của evaluate(..., record=True)).
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name})"
+
+
+@register_evaluator("reference")
+class ReferenceEvaluator(Evaluator):
+    """Mô phỏng theo ca bằng ShiftSimulator, lần lượt từng phân bổ (kết quả chuẩn để đối chiếu)."""
+    supports_checkpoints = True
+
+    def __init__(self, instance: ProblemInstance):
+        super().__init__(instance)
+        self.simulator = ShiftSimulator(instance)
+
+    def evaluate(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        return self.simulator.run(allocation, progress, record, cutoff=cutoff, checkpoint=checkpoint)
+
+    def export_operations(self, progress: OperationProgress) -> List:
+        return self.simulator.export_operations(progress)
+
+
+@register_evaluator("checked")
+class CheckedEvaluator(ReferenceEvaluator):
+    """
+    Chế độ gỡ lỗi của ReferenceEvaluator: ShiftSimulator kiểm tra từng lần phân công bằng ConstraintMonitor
+    (trùng nhân viên/máy trong một ca, làm hai ca liên tiếp, ngoài lịch làm việc, sai vị trí/loại máy,
+    vi phạm tiền nhiệm). Báo cáo của mỗi lần đánh giá nằm trong progress.violations, số vi phạm cộng dồn
+    theo loại nằm trong violation_counts (của tiến trình gọi evaluate). Luôn mô phỏng lại từ đầu.
+    """
+    supports_checkpoints = False
+    reports_violations = True
+
+    def __init__(self, instance: ProblemInstance):
+        Evaluator.__init__(self, instance)
+        self.simulator = ShiftSimulator(instance, check_constraints=True)
+        self.violation_counts = dict.fromkeys(VIOLATION_TYPES, 0)
+        self.evaluations = 0
+        self.evaluations_with_violations = 0
+
+    def evaluate(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        if progress is None:
+            progress = OperationProgress(self.instance.num_operations)
+        fitness = self.simulator.run(allocation, progress, record, cutoff=cutoff)
+        report = progress.violations
+        self.evaluations += 1
+        if report["total"]:
+            self.evaluations_with_violations += 1
+            for kind, count in report["by_type"].items():
+                self.violation_counts[kind] += count
+        return fitness
+
+
+@register_evaluator("vectorized")
+class VectorizedEvaluator(ReferenceEvaluator):
+    """
+    Như ReferenceEvaluator, nhưng một lô phân bổ được mô phỏng đồng thời bằng BatchSimulator
+    (kết quả giống hệt). Chỉ nhanh hơn với lô từ khoảng 256 phân bổ (BatchSimulator.min_batch_size),
+    lớn hơn nhiều so với lô của Harmony Search, nên không phải bộ đánh giá mặc định.
+    """
+
+    def __init__(self, instance: ProblemInstance):
+        super().__init__(instance)
+        self.batch_simulator = BatchSimulator(self.simulator)
+
+    def evaluate_batch(
+        self,
+        allocations: List[List[tuple]],
+        progresses: List[OperationProgress] = None,
+        cutoff: tuple = None,
+    ) -> List[Fitness]:
+        return self.batch_simulator.run(allocations, progresses, cutoff)
+
+
+@register_evaluator("decomposed")
+class DecomposedEvaluator(ReferenceEvaluator):
+    """
+    Như ReferenceEvaluator, nhưng mỗi thành phần độc lập về tài nguyên (ProblemInstance.components) được
+    mô phỏng riêng trên bài toán con của nó, với bộ nhớ đệm fitness riêng theo phân bổ của thành phần:
+    giải pháp chỉ thay đổi một thành phần chỉ phải mô phỏng lại thành phần đó. Fitness được ghép lại:
+    tổng số lệnh đúng hạn, số ca lớn nhất và tổng chi phí (giống hệt mô phỏng cả bài toán).
+    Không dừng sớm theo cutoff (fitness luôn đầy đủ để lưu được vào bộ nhớ đệm của thành phần).
+    Khi chỉ có một thành phần, cần lịch chi tiết/điểm lưu, hoặc phân bổ giao tài nguyên sai vị trí/loại máy,
+    cả bài toán được mô phỏng như ReferenceEvaluator.
+    """
+
+    def __init__(self, instance: ProblemInstance, cache_size: int = 4096):
+        super().__init__(instance)
+        self.parts = []  # (công đoạn, chỉ số nhân viên cục bộ, chỉ số máy cục bộ, bộ mô phỏng, bộ nhớ đệm)
+        components = instance.components
+        if components.num_components <= 1:
+            return
+        for c, operations in enumerate(components.operations):
+            positions = set(components.positions[c])
+            machine_types = set(components.machine_types[c])
+            worker_rows = [w for w in range(instance.num_workers) if instance.worker_position[w] in positions]
+            asset_rows = [m for m in range(instance.num_assets) if instance.asset_type[m] in machine_types]
+            orders = sorted({instance.op_order[j] for j in operations if instance.op_order[j] >= 0})
+            part = ProblemInstance(
+                workers=[instance.workers[w] for w in worker_rows],
+                assets=[instance.assets[m] for m in asset_rows],
+                operations=[instance.operations[j] for j in operations],
+                production_orders=[instance.production_orders[k] for k in orders],
+                dates=instance.dates,
+                shifts_per_day=instance.shifts_per_day,
+                hours_per_shift=instance.hours_per_shift,
+            )
+            # Lịch làm việc lấy thẳng từ bài toán gốc (giống hệt, không phải đọc lại từng dict)
+            part.availability[:] = instance.availability[worker_rows]
+            part.position_availability = [part.availability[rows] for rows in part.position_workers]
+            self.parts.append((
+                operations,
+                {w: i for i, w in enumerate(worker_rows)},
+                {m: i for i, m in enumerate(asset_rows)},
+                ShiftSimulator(part),
+                FitnessCache(cache_size),
+            ))
+
+    def _split(self, allocation: List[tuple]):
+        """
+        Phân bổ của từng thành phần theo chỉ số cục bộ (giữ thứ tự tăng dần nên cũng là khóa bộ nhớ đệm).
+        :return: Danh sách phân bổ, hoặc None nếu có tài nguyên nằm ngoài thành phần của công đoạn
+        """
+        split = []
+        for operations, worker_local, asset_local, _, _ in self.parts:
+            local = []
+            for j in operations:
+                workers, machines = allocation[j]
+                if any(w not in worker_local for w in workers) or any(m not in asset_local for m in machines):
+                    return None
+                local.append((
+                    tuple(worker_local[w] for w in workers),
+                    tuple(asset_local[m] for m in machines),
+                ))
+            split.append(tuple(local))
+        return split
+
+    def evaluate(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        split = None if record or checkpoint or not self.parts else self._split(allocation)
+        if split is None:
+            return super().evaluate(allocation, progress, record, cutoff, checkpoint)
+
+        if progress is not None:
+            progress.parent = None
+            progress.reset()
+        completed_orders_on_time = 0
+        total_shift = 0
+        total_cost = 0
+        end_slot = 0
+        for (operations, _, _, simulator, cache), local in zip(self.parts, split):
+            part_progress = OperationProgress(len(operations))
+            fitness = cache.get(local, part_progress)
+            if fitness is None:
+                fitness = simulator.run(list(local), part_progress)
+                cache.put(local, fitness, part_progress)
+            completed_orders_on_time += fitness[0]
+            total_shift = max(total_shift, fitness[1])
+            total_cost += fitness[2]
+            end_slot = max(end_slot, part_progress.end_slot)
+            if progress is not None:
+                for i, j in enumerate(operations):
+                    progress.achieved_kpi0[j] = part_progress.achieved_kpi0[i]
+                    progress.achieved_kpi1[j] = part_progress.achieved_kpi1[i]
+                    progress.started[j] = part_progress.started[i]
+                    progress.completed[j] = part_progress.completed[i]
+                    progress.first_slot[j] = part_progress.first_slot[i]
+        if progress is not None:
+            progress.allocation = allocation
+            progress.end_slot = end_slot
+        return Fitness(completed_orders_on_time, total_shift, total_cost)
+
+    def cache_stats(self) -> List[Dict]:
+        """Thống kê bộ nhớ đệm của từng thành phần."""
+        return [cache.stats() for _, _, _, _, cache in self.parts]
+
+
+@register_evaluator("optimized")
+class OptimizedEvaluator(Evaluator):
+    """
+    Lập lịch greedy từng công đoạn bằng GreedyScheduler (bộ lập lịch của hs_cai_tien).
+    Đây là mô hình lập lịch khác ShiftSimulator: fitness chỉ so sánh được giữa các phân bổ
+    cùng được đánh giá bằng bộ này.
+    """
+
+    def __init__(self, instance: ProblemInstance):
+        super().__init__(instance)
+        self.scheduler = GreedyScheduler(instance)
+
+    def evaluate(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        if progress is not None:
+            progress.parent = None  # Không có điểm lưu: luôn lập lịch lại từ đầu
+        return self.scheduler.run(allocation, progress, record, cutoff=cutoff)
+
+    def export_operations(self, progress: OperationProgress) -> List:
+        return self.scheduler.export_operations(progress)
+
+
+@register_evaluator("coarse")
+class CoarseEvaluator(Evaluator):
+    """
+    Ước lượng độ chính xác thấp bằng CoarseModel (năng lực gộp theo ngày), nhanh hơn ShiftSimulator
+    nhiều lần; dùng để sàng lọc ứng viên chứ không thay cho đánh giá chính xác.
+    Không có lịch chi tiết và không dừng sớm theo cutoff.
+    """
+
+    def __init__(self, instance: ProblemInstance):
+        super().__init__(instance)
+        self.model = CoarseModel(instance)
+
+    def evaluate(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        if progress is not None:
+            progress.parent = None
+        return self.model.estimate(allocation, progress)
+
+    def export_operations(self, progress: OperationProgress) -> List:
+        operations = []
+        for j, op in enumerate(self.instance.operations):
+            operation = copy.copy(op)
+            operation.achieved_kpis = (
+                [progress.achieved_kpi0[j], progress.achieved_kpi1[j]]
+                if progress.started[j] else list(op.achieved_kpis)
+            )
+            operation.detailed_schedule = list(op.detailed_schedule)
+            operations.append(operation)
+        return operations
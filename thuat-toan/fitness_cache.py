@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import List, Dict
+
+from models import OperationProgress
+
+
+class FitnessCache:
+    def __init__(self, max_size: int = 4096):
+        """
+        Bộ nhớ đệm fitness của các phân bổ đã đánh giá, giới hạn kích thước và loại bỏ
+        phần tử ít được dùng gần đây nhất (LRU).
+        Khóa là dạng chuẩn của phân bổ: với mỗi công đoạn (theo thứ tự của ProblemInstance),
+        tập chỉ số nhân viên và tập chỉ số máy đã sắp xếp, nên không phụ thuộc thứ tự trong danh sách.
+
+        :param max_size: Số phân bổ tối đa được lưu; 0 thì tắt bộ nhớ đệm (get luôn trả về None,
+            put không lưu gì và không tính lần tra)
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(allocation: List[tuple]) -> tuple:
+        """
+        Khóa chuẩn của một phân bổ (xem ProblemInstance.encode_solution).
+        :param allocation: Danh sách (chỉ số nhân viên, chỉ số máy) theo thứ tự công đoạn
+        :return: Tuple có thể băm, giống nhau cho mọi cách sắp xếp nhân viên/máy trong từng công đoạn
+        """
+        return tuple((tuple(sorted(workers)), tuple(sorted(machines))) for workers, machines in allocation)
+
+    def get(self, key: tuple, progress: OperationProgress = None) -> tuple:
+        """
+        Tra fitness đã lưu.
+        :param key: Khóa từ make_key
+        :param progress: Nếu có, được ghi lại KPI đạt được và trạng thái hoàn thành đã lưu
+        :return: Fitness, hoặc None nếu chưa có
+        """
+        if not self.enabled:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        fitness, cached_progress = entry
+        if progress is not None:
+            progress.copy_from(cached_progress)
+        return fitness
+
+    def put(self, key: tuple, fitness: tuple, progress: OperationProgress):
+        """
+        Lưu fitness (chỉ dùng cho kết quả mô phỏng đầy đủ, không bị cắt nhánh).
+        :param key: Khóa từ make_key
+        :param fitness: Fitness của phân bổ
+        :param progress: Trạng thái đánh giá tương ứng (được sao chép)
+        """
+        if not self.enabled:
+            return
+        self.entries[key] = (fitness, progress.copy())
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict:
+        """Thống kê sử dụng bộ nhớ đệm."""
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self):
+        return (
+            f"FitnessCache(size={len(self.entries)}, max_size={self.max_size}, "
+            f"hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.1%})"
+        )
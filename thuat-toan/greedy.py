@@ -9,6 +9,11 @@ import time
 import os
 import sys
 
+import numpy as np
+
+from encoder import compile_problem_instance
+from shift_calendar import ReservationCalendar
+
 def load_data_files():
     """
     Tìm và đọc file input và schedule từ thư mục hiện tại
@@ -42,195 +47,174 @@ def load_data_files():
 # BƯỚC 1: ĐỌC DỮ LIỆU
 data, schedules = load_data_files()
 
-# Khai báo các biến dữ liệu
-production_orders = data['productionOrders']  # Danh sách lệnh sản xuất
-operations = data['operations']               # Danh sách công đoạn
-assets = data['assets']                       # Danh sách thiết bị/máy móc
-workers = data['workers']                     # Danh sách nhân viên
+# Biên dịch dữ liệu sang dạng chỉ số nguyên (xem encoder.compile_problem_instance)
+instance = compile_problem_instance(data, schedules)
 
-# Tạo dict tiện tra cứu nhanh
-assets_dict = {a['id']: a for a in assets}
-workers_dict = {w['id']: w for w in workers}
-operations_dict = {op['id']: op for op in operations}
+# Khai báo các biến dữ liệu
+production_orders = instance.production_orders  # Danh sách lệnh sản xuất
+operations = instance.operations                # Danh sách công đoạn
+assets = instance.assets                        # Danh sách thiết bị/máy móc
+workers = instance.workers                      # Danh sách nhân viên
+
+# Nhân viên theo vị trí và lịch tương ứng, sắp sẵn một lần: mạnh nhất (năng suất * chất lượng) trước,
+# cùng độ mạnh thì giữ thứ tự xuất hiện trong file lịch làm việc. Lọc theo ca giữ nguyên thứ tự này
+# nên không cần sắp lại mỗi ca. Giữ mọi nhân viên của vị trí: người không có trong lịch của một ngày
+# thì availability của ngày đó đã là False, như cách lọc theo từng ngày trước đây.
+schedule_rank = {wid: r for r, wid in enumerate(schedules[0]['schedule'])}
+position_workers = []
+position_availability = []
+for ws in instance.workers_by_position:
+    rows = np.array(sorted(
+        ws,
+        key=lambda w: (
+            -instance.worker_productivity[w] * instance.worker_quality[w],
+            schedule_rank.get(instance.worker_ids[w], len(schedule_rank)),
+        ),
+    ), dtype=np.intp)
+    position_workers.append(rows)
+    position_availability.append(instance.availability[rows])
+# Máy theo loại, sắp sẵn theo thứ hạng năng suất (mạnh nhất trước)
+ranked_assets_by_type = [
+    sorted(assets_of_type, key=instance.asset_productivity_rank.__getitem__)
+    for assets_of_type in instance.assets_by_type
+]
 
 print(f"Đã tải dữ liệu: {len(production_orders)} lệnh sản xuất, {len(operations)} công đoạn, {len(assets)} thiết bị, {len(workers)} nhân viên")
 
 # BƯỚC 2: HÀM TIỆN ÍCH
 
-def is_consecutive(assignments, date_idx, shift_idx):
+def calc_kpi(w, a, hours):
     """
-    Kiểm tra nhân viên đã bị phân lịch vào ca liên tiếp chưa (không cho phép 2 ca liên tiếp).
+    Tính toán năng suất (ns) và chất lượng (cl) dựa vào chỉ số nhân viên, máy, số giờ làm việc.
     """
-    if shift_idx > 0 and (date_idx, shift_idx-1) in assignments:
-        return True
-    if shift_idx < 3 and (date_idx, shift_idx+1) in assignments:
-        return True
-    if shift_idx == 0 and (date_idx-1, 3) in assignments:
-        return True
-    if shift_idx == 3 and (date_idx+1, 0) in assignments:
-        return True
-    return False
-
-def calc_kpi(worker, asset, hours):
-    """
-    Tính toán năng suất (ns) và chất lượng (cl) dựa vào worker, máy, số giờ làm việc.
-    """
-    ns = worker['productivityKPI'] * asset['productivity'] * hours
-    cl = ns * worker['qualityKPI']
+    ns = instance.worker_productivity[w] * instance.asset_productivity[a] * hours
+    cl = ns * instance.worker_quality[w]
     return ns, cl
 
-def calc_cost(worker, asset, hours):
+def calc_cost(w, a, hours):
     """
     Tính chi phí cho một ca làm việc: (lương nhân viên/giờ + chi phí máy/giờ) * số giờ.
     """
-    return (worker.get('salaryPerHour', 0) + asset.get('costPerHour', 0)) * hours
+    return (instance.worker_salary[w] + instance.asset_cost[a]) * hours
 
 # BƯỚC 3: LẬP LỊCH GREEDY (chọn tốt nhất, break ngay khi đủ KPI)
 
 print("\n=== BẮT ĐẦU LẬP LỊCH GREEDY ===")
 
-worker_assignments = {}   # Lưu lại ca đã phân cho từng nhân viên
-machine_assignments = {}  # Lưu lại ca đã phân cho từng máy
+worker_calendar = ReservationCalendar(instance.num_workers)  # Ca (tuyệt đối) đã phân cho từng nhân viên
+machine_calendar = ReservationCalendar(instance.num_assets)   # Ca (tuyệt đối) đã phân cho từng máy
 operation_progress = {}   # Lưu tiến độ từng công đoạn: kpi, lịch sử, trạng thái, chi phí
-op_status = {}            # op_id -> True/False: đã hoàn thành chưa
-op_end_time = {}          # op_id -> (date_idx, shift_idx): ca hoàn thành cuối cùng
+op_status = [False] * instance.num_operations     # đã hoàn thành chưa
+op_end_slot = [0] * instance.num_operations  # ca tuyệt đối (ngày * số ca + ca) hoàn thành cuối cùng
+
+shifts_per_day = instance.shifts_per_day
+hours = instance.hours_per_shift
+num_slots = instance.num_days * shifts_per_day
 
 start_time = time.time()  # Đo thời gian thực thi thuật toán
 
-pending_ops = operations.copy()  # Danh sách công đoạn chưa lập lịch xong
+pending_ops = list(range(instance.num_operations))  # Công đoạn chưa lập lịch xong
 
 while pending_ops:
     next_pending = []
-    for op in pending_ops:
-        op_id = op['id']
-        prev_ops = op.get('prevOperation', [])
+    for j in pending_ops:
+        op = operations[j]
+        preds = instance.predecessors(j)
         # Nếu còn công đoạn tiên quyết chưa xong thì bỏ qua lần này
-        if prev_ops and not all(op_status.get(pid, False) for pid in prev_ops):
-            next_pending.append(op)
+        if instance.op_missing_preds[j] or not all(op_status[p] for p in preds):
+            next_pending.append(j)
             continue
 
         # Xác định thời điểm bắt đầu sớm nhất
-        if prev_ops:
-            prev_end_times = [op_end_time[pid] for pid in prev_ops]
-            latest_end = max(prev_end_times)
-            prev_date, prev_shift = latest_end
-            max_shift_idx = schedules[0]['shift_count'] - 1
-            if prev_shift < max_shift_idx:
-                earliest_start = (prev_date, prev_shift + 1)
-            else:
-                earliest_start = (prev_date + 1, 0)
+        if preds:
+            earliest_start = max(op_end_slot[p] for p in preds) + 1
         else:
-            earliest_start = (0, 0)  # Nếu là công đoạn đầu thì bắt đầu từ ngày đầu
+            earliest_start = 0  # Nếu là công đoạn đầu thì bắt đầu từ ca đầu tiên
 
         # Chuẩn bị các biến tích lũy
-        kpi_targets = {k['id']: k['value'] for k in op['kpis']}  # Giá trị mục tiêu KPI
-        kpi_accum = {k['id']: 0 for k in op['kpis']}             # Giá trị đạt được thực tế
+        kpi_targets = {k['id']: k['value'] for k in op.assigned_kpis}  # Giá trị mục tiêu KPI
+        kpi_accum = {k['id']: 0 for k in op.assigned_kpis}             # Giá trị đạt được thực tế
+        position = instance.op_position[j]
+        candidate_machines = ranked_assets_by_type[instance.op_machine_type[j]]
         op_history = []  # Lịch sử các lần phân bổ cho công đoạn này
         op_cost = 0
         done = False
-        last_used = (0, 0)
+        last_used = 0
 
-        # ====== Lập lịch greedy từng ngày, từng ca ======
-        break_outer = False  # Dùng để break cả 2 vòng lặp khi đã đạt KPI
-        for date_idx, sch in enumerate(schedules):
-            if break_outer:
+        # ====== Lập lịch greedy từng ca, bắt đầu thẳng từ ca sớm nhất có thể ======
+        for slot in range(earliest_start, num_slots):
+            date_idx, shift_idx = divmod(slot, shifts_per_day)
+
+            # ==== Check KPI trước khi phân bổ: Nếu đủ rồi thì dừng luôn ====
+            if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
+                done = True
                 break
-            for shift_idx in range(sch['shift_count']):
-                if (date_idx, shift_idx) < earliest_start:
-                    continue
 
-                # ==== Check KPI trước khi phân bổ: Nếu đủ rồi thì dừng luôn ====
+            # ==== Lấy nhân viên hợp lệ cho ca này ====
+            # Lọc nhân viên cùng vị trí có lịch làm ca này trong một phép toán mảng,
+            # rồi bỏ người đã làm ca này hoặc ca liền kề (không cho phép 2 ca liên tiếp)
+            on_shift = position_workers[position][position_availability[position][:, date_idx, shift_idx]]
+            valid_workers = worker_calendar.unblocked(on_shift.tolist(), slot)
+            # valid_workers giữ thứ tự của position_workers: nhân viên mạnh nhất trước
+
+            # ==== Lấy máy hợp lệ cho ca này ====
+            valid_machines = machine_calendar.free(candidate_machines, slot)
+            # valid_machines giữ thứ tự của ranked_assets_by_type: máy mạnh nhất trước
+
+            # ==== Ghép từng cặp nhân viên - máy ====
+            num_pairs = min(len(valid_workers), len(valid_machines))
+            used_workers = set()
+            used_machines = set()
+            for i in range(num_pairs):
+                # === Kiểm tra lại KPI, nếu đủ thì dừng ngay vòng nhỏ nhất ===
                 if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
-                    done = True
-                    break_outer = True
                     break
 
-                # ==== Lấy nhân viên hợp lệ cho ca này ====
-                valid_workers = []
-                for wid, slots in sch['schedule'].items():
-                    if slots[shift_idx] == 1:
-                        w = workers_dict.get(wid)
-                        if not w or w['position'] != op['requiredPosition']:
-                            continue
-                        assignments = worker_assignments.get(wid, set())
-                        if is_consecutive(assignments, date_idx, shift_idx):
-                            continue
-                        if (date_idx, shift_idx) in assignments:
-                            continue
-                        valid_workers.append((wid, w))
-                # Ưu tiên nhân viên mạnh nhất
-                valid_workers.sort(key=lambda x: x[1]['productivityKPI'] * x[1]['qualityKPI'], reverse=True)
-
-                # ==== Lấy máy hợp lệ cho ca này ====
-                valid_machines = []
-                for aid, a in assets_dict.items():
-                    if a['machineType'] != op['requiredMachineType']:
-                        continue
-                    assignments = machine_assignments.get(aid, set())
-                    if (date_idx, shift_idx) in assignments:
-                        continue
-                    valid_machines.append((aid, a))
-                # Ưu tiên máy mạnh nhất
-                valid_machines.sort(key=lambda x: x[1]['productivity'], reverse=True)
-
-                # ==== Ghép từng cặp nhân viên - máy ====
-                num_pairs = min(len(valid_workers), len(valid_machines))
-                used_workers = set()
-                used_machines = set()
-                for i in range(num_pairs):
-                    # === Kiểm tra lại KPI, nếu đủ thì dừng ngay vòng nhỏ nhất ===
-                    if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
-                        done = True
-                        break_outer = True
-                        break
-
-                    wid, w = valid_workers[i]
-                    aid, a = valid_machines[i]
-                    if wid in used_workers or aid in used_machines:
-                        continue
-                    hours = sch['work_duration_per_shift']
-                    ns, cl = calc_kpi(w, a, hours)
-                    cost = calc_cost(w, a, hours)
-
-                    # Chỉ cộng KPI nếu chỉ tiêu đó chưa đạt (tránh cộng quá lố)
-                    for k_idx, kpi in enumerate(op['kpis']):
-                        if k_idx == 0:
-                            kpi_accum[kpi['id']] += ns
-                        else:
-                            kpi_accum[kpi['id']] += cl
-
-                    # Ghi lịch sử và cập nhật chi phí
-                    op_history.append({
-                        'date': sch['date'], 'shift': shift_idx+1,
-                        'worker_id': wid, 'worker_name': w['name'],
-                        'machine_id': aid, 'machine_name': a['name'],
-                        'ns': ns, 'cl': cl,
-                        'cost': cost
-                    })
-                    op_cost += cost
-                    # Đánh dấu đã phân công ca này
-                    worker_assignments.setdefault(wid, set()).add((date_idx, shift_idx))
-                    machine_assignments.setdefault(aid, set()).add((date_idx, shift_idx))
-                    used_workers.add(wid)
-                    used_machines.add(aid)
-                    last_used = (date_idx, shift_idx)
-                # Sau mỗi ca cũng kiểm tra lại KPI (đủ là dừng luôn)
-                if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
-                    done = True
-                    break_outer = True
-                    break
+                w = valid_workers[i]
+                a = valid_machines[i]
+                if w in used_workers or a in used_machines:
+                    continue
+                ns, cl = calc_kpi(w, a, hours)
+                cost = calc_cost(w, a, hours)
+
+                # Chỉ cộng KPI nếu chỉ tiêu đó chưa đạt (tránh cộng quá lố)
+                for k_idx, kpi in enumerate(op.assigned_kpis):
+                    if k_idx == 0:
+                        kpi_accum[kpi['id']] += ns
+                    else:
+                        kpi_accum[kpi['id']] += cl
+
+                # Ghi lịch sử và cập nhật chi phí
+                op_history.append({
+                    'date': instance.dates[date_idx], 'shift': shift_idx+1,
+                    'worker_id': instance.worker_ids[w], 'worker_name': workers[w].name,
+                    'machine_id': instance.asset_ids[a], 'machine_name': assets[a].name,
+                    'ns': ns, 'cl': cl,
+                    'cost': cost
+                })
+                op_cost += cost
+                # Đánh dấu đã phân công ca này
+                worker_calendar.book(w, slot)
+                machine_calendar.book(a, slot)
+                used_workers.add(w)
+                used_machines.add(a)
+                last_used = slot
+            # Sau mỗi ca cũng kiểm tra lại KPI (đủ là dừng luôn)
+            if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
+                done = True
+                break
 
         # Lưu kết quả cho công đoạn
-        operation_progress[op_id] = {
+        operation_progress[op.operation_id] = {
             'kpi': kpi_accum, 'done': done, 'history': op_history, 'cost': op_cost
         }
-        op_status[op_id] = done
-        op_end_time[op_id] = last_used
+        op_status[j] = done
+        op_end_slot[j] = last_used
 
     # Nếu không lập lịch được thêm công đoạn nào, báo lỗi phụ thuộc hoặc thiếu nguồn lực
     if len(next_pending) == len(pending_ops):
         print("\n⚠️ Có công đoạn không thể lập lịch do phụ thuộc lẫn nhau hoặc không đủ nguồn lực!")
-        print("Các công đoạn còn pending:", [op['id'] for op in next_pending])
+        print("Các công đoạn còn pending:", [operations[j].operation_id for j in next_pending])
         break
     pending_ops = next_pending
 
@@ -245,10 +229,9 @@ print("="*60)
 num_done = 0
 total_cost = 0
 all_working_slots = set()  # (ngày, ca)
-opid_to_orderid = {op['id']: op['productionOrderId'] for op in operations}
 orderid_to_ops = {}
 for op in operations:
-    orderid_to_ops.setdefault(op['productionOrderId'], []).append(op['id'])
+    orderid_to_ops.setdefault(op.production_order_id, []).append(op.operation_id)
 
 for op_id, result in operation_progress.items():
     status = 'HOÀN THÀNH' if result['done'] else 'CHƯA HOÀN THÀNH'
@@ -269,7 +252,7 @@ for op_id, result in operation_progress.items():
 # Đếm số lệnh sản xuất hoàn thành
 order_done = 0
 for order in production_orders:
-    order_id = order['id']
+    order_id = order.order_id
     ops = orderid_to_ops.get(order_id, [])
     if all(operation_progress.get(opid, {}).get('done', False) for opid in ops):
         order_done += 1
@@ -292,7 +275,7 @@ def save_results():
     operations_result = []
     
     for op_id, result in operation_progress.items():
-        op_info = operations_dict[op_id]
+        op_info = operations[instance.operation_index[op_id]]
         
         # Tạo detailed_schedule từ history
         detailed_schedule = []
@@ -306,15 +289,15 @@ def save_results():
         
         # Tạo operation record theo định dạng yêu cầu
         operation_record = {
-            "commandId": op_info['productionOrderId'],
+            "commandId": op_info.production_order_id,
             "id": op_id,
-            "name": op_info['name'],
+            "name": op_info.name,
             "detailed_schedule": detailed_schedule
         }
         
         # Thêm achieved_kpi và assigned_kpi theo số lượng KPI
         kpi_list = sorted(result['kpi'].keys())  # Sắp xếp để đảm bảo thứ tự
-        target_kpis = {k['id']: k['value'] for k in op_info['kpis']}
+        target_kpis = {k['id']: k['value'] for k in op_info.assigned_kpis}
         
         for i, kpi_id in enumerate(kpi_list):
             operation_record[f"achieved_kpi_{i}"] = result['kpi'][kpi_id]
@@ -0,0 +1,319 @@
+import copy
+from typing import List
+
+from models import Fitness, OperationProgress, ProblemInstance
+from schedule_log import ScheduleLog
+from shift_calendar import ReservationCalendar
+
+
+class GreedyScheduler:
+    def __init__(self, instance: ProblemInstance, max_days: int = 59):
+        """
+        Bộ lập lịch greedy theo từng công đoạn của hs_cai_tien (kỹ thuật từ thuật toán Greedy):
+        mỗi công đoạn sẵn sàng được lập lịch trọn vẹn, ca này sang ca khác, trước khi sang công đoạn tiếp theo.
+        Mô hình này khác ShiftSimulator (không xét lịch đi làm, không phân bổ lại nguồn lực),
+        nên fitness của hai bộ lập lịch không so sánh trực tiếp được với nhau.
+        :param instance: Bài toán đã biên dịch
+        :param max_days: Số ngày tối đa được lập lịch (ngày 0..max_days-1)
+        """
+        self.instance = instance
+        self.max_days = max_days
+        # Chỉ tiêu lớn nhất trong các KPI chất lượng (KPI thứ 2 trở đi) của từng công đoạn
+        self.op_kpi_target_rest = [
+            max(kpi["value"] for kpi in op.assigned_kpis[1:]) if len(op.assigned_kpis) > 1 else 0
+            for op in instance.operations
+        ]
+        # Nhãn ngày cho lịch chi tiết
+        self.day_labels = instance.calendar.labels(max_days)
+
+    def run(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+    ) -> Fitness:
+        """
+        Lập lịch greedy cho một phân bổ đã mã hóa (không dùng bộ nhớ đệm).
+        Áp dụng các kỹ thuật từ thuật toán Greedy để tăng tốc độ.
+        Làm việc trên chỉ số nguyên của ProblemInstance thay vì tra cứu đối tượng/chuỗi.
+        :param allocation: Phân bổ (xem ProblemInstance.encode_solution)
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành; None nếu chỉ cần fitness.
+        :param record: Ghi thêm lịch chi tiết vào progress.schedule (ScheduleLog kèm sản lượng từng cặp).
+        :param cutoff: Fitness ngưỡng. Dừng sớm khi số lệnh còn có thể hoàn thành nhỏ hơn cutoff[0],
+            hoặc không lớn hơn cutoff[0] trong khi số ca đã dùng vượt cutoff[1].
+        """
+        inst = self.instance
+        if progress is None:
+            progress = OperationProgress(inst.num_operations)
+        else:
+            progress.reset(record)
+            if record:
+                progress.schedule = ScheduleLog(inst.num_operations, with_outputs=True)
+        schedule = progress.schedule
+        hours = inst.hours_per_shift
+        w_position = inst.worker_position
+        w_productivity = inst.worker_productivity
+        w_quality = inst.worker_quality
+        w_salary = inst.worker_salary
+        m_type = inst.asset_type
+        m_productivity = inst.asset_productivity
+        m_cost = inst.asset_cost
+        kpi_count = inst.op_kpi_count
+        target0 = inst.op_target0
+        target_rest = self.op_kpi_target_rest
+        worker_rank = inst.worker_strength_rank.__getitem__
+        asset_rank = inst.asset_productivity_rank.__getitem__
+
+        total_cost = 0
+        completed_orders_on_time = 0
+        completed_operations_by_order = [0] * inst.num_orders
+        working_slots = set()  # Các ca tuyệt đối có ít nhất một nhân viên làm việc
+
+        # Ngưỡng cắt: lệnh có công đoạn không hoàn thành được thì không thể xong đúng hạn
+        max_possible_completed_orders = inst.num_orders
+        order_failed = [False] * inst.num_orders
+        aborted = False
+
+        # Cấu trúc dữ liệu tối ưu từ Greedy; mọi ca là ca tuyệt đối slot = ngày * spd + ca
+        worker_calendar = ReservationCalendar(inst.num_workers)   # Ca đã phân cho từng nhân viên
+        machine_calendar = ReservationCalendar(inst.num_assets)   # Ca đã phân cho từng máy
+        # Bitset các ca đã đặt; vòng lặp theo ca làm phép toán bit trực tiếp trên đó
+        # (như ReservationCalendar.unblocked/free/book) để tránh một lời gọi hàm cho mỗi ca
+        worker_booked = worker_calendar.booked
+        machine_booked = machine_calendar.booked
+        op_status = [False] * inst.num_operations      # đã hoàn thành chưa
+        op_end_slot = [0] * inst.num_operations        # ca hoàn thành cuối cùng
+
+        max_days = self.max_days
+        spd = inst.shifts_per_day
+        max_slots = max_days * spd
+
+        def kpi_reached(accum0, accum_rest, j):
+            # KPI đầu tiên tích lũy sản lượng, các KPI còn lại tích lũy chất lượng
+            if kpi_count[j] == 0:
+                return True
+            if accum0 < target0[j]:
+                return False
+            return kpi_count[j] == 1 or accum_rest >= target_rest[j]
+
+        # Danh sách công đoạn chưa lập lịch xong
+        pending_ops = list(range(inst.num_operations))
+        num_operations = inst.num_operations
+        scheduled = 0  # Số công đoạn đã được lập lịch (hoàn thành hoặc không)
+
+        while pending_ops:
+            next_pending = []
+
+            for j in pending_ops:
+                preds = inst.pred_idx[inst.pred_ptr[j]:inst.pred_ptr[j + 1]]
+
+                # Kiểm tra công đoạn tiên quyết
+                if inst.op_missing_preds[j] or not all(op_status[p] for p in preds):
+                    next_pending.append(j)
+                    continue
+
+                # Xác định thời điểm bắt đầu sớm nhất
+                if preds:
+                    start_slot = max(op_end_slot[p] for p in preds) + 1
+                else:
+                    start_slot = 0
+
+                # Chuẩn bị các biến tích lũy
+                position = inst.op_position[j]
+                machine_type = inst.op_machine_type[j]
+                op_workers, op_machines = allocation[j]
+                accum0 = 0
+                accum_rest = 0
+                op_cost = 0
+                done = False
+                last_used = 0
+
+                # Chỉ nhân viên đúng vị trí và máy đúng loại mới có thể được phân công,
+                # sắp một lần theo thứ hạng (mạnh nhất trước) thay vì sắp lại mỗi ca
+                eligible_workers = sorted(
+                    (w for w in op_workers if w_position[w] == position), key=worker_rank
+                )
+                eligible_machines = sorted(
+                    (m for m in op_machines if m_type[m] == machine_type), key=asset_rank
+                )
+
+                # Không có cặp nhân viên - máy hợp lệ: không ca nào thay đổi được KPI,
+                # chỉ còn kiểm tra KPI ở ca bắt đầu (nếu ca đó còn trong giới hạn)
+                if start_slot < max_slots and (not eligible_workers or not eligible_machines):
+                    done = kpi_reached(accum0, accum_rest, j)
+                    start_slot = max_slots
+
+                # Lập lịch greedy với early stopping, bắt đầu thẳng từ ca sớm nhất có thể
+                slot = start_slot
+                while slot < max_slots:
+                    # EARLY STOPPING: Kiểm tra KPI trước khi phân bổ
+                    if kpi_reached(accum0, accum_rest, j):
+                        done = True
+                        break
+
+                    slot_bit = 1 << slot
+                    blocked_mask = 0b111 << slot >> 1  # Ca trước, ca này và ca sau
+
+                    # Lấy nhân viên hợp lệ cho ca này (chưa làm ca này và không làm 2 ca liên tiếp)
+                    valid_workers = []
+                    for w in eligible_workers:
+                        if not worker_booked[w] & blocked_mask:
+                            valid_workers.append(w)
+
+                    # valid_workers giữ thứ tự của eligible_workers: nhân viên mạnh nhất trước
+
+                    # Lấy máy hợp lệ cho ca này
+                    valid_machines = []
+                    for m in eligible_machines:
+                        if not machine_booked[m] & slot_bit:
+                            valid_machines.append(m)
+
+                    # valid_machines giữ thứ tự của eligible_machines: máy mạnh nhất trước
+
+                    # Không ghép được cặp nào: KPI không đổi cho tới ca sớm nhất vừa có nhân viên
+                    # vừa có máy rảnh, nên nhảy thẳng tới ca đó
+                    if not valid_workers or not valid_machines:
+                        slot = max(
+                            worker_calendar.earliest_unblocked(eligible_workers, slot + 1),
+                            machine_calendar.earliest_free(eligible_machines, slot + 1),
+                        )
+                        continue
+
+                    # Ghép cặp nhân viên - máy
+                    num_pairs = min(len(valid_workers), len(valid_machines))
+                    used_workers = set()
+                    used_machines = set()
+
+                    for i in range(num_pairs):
+                        # EARLY STOPPING: Kiểm tra lại KPI (ca này dừng, vòng ca dừng ở kiểm tra bên dưới)
+                        if kpi_reached(accum0, accum_rest, j):
+                            break
+
+                        w = valid_workers[i]
+                        m = valid_machines[i]
+
+                        if w in used_workers or m in used_machines:
+                            continue
+
+                        ns = w_productivity[w] * m_productivity[m] * hours
+                        cl = ns * w_quality[w]
+
+                        # Cập nhật KPI
+                        accum0 += ns
+                        accum_rest += cl
+                        op_cost += (w_salary[w] + m_cost[m]) * hours
+
+                        # Ghi nhận lịch trình chi tiết (ngày và ca chỉ được tách ra khi ghi)
+                        if schedule is not None:
+                            date_idx, shift_idx = divmod(slot, spd)
+                            schedule.append(j, date_idx, shift_idx, w, m, ns, cl)
+
+                        # Đánh dấu đã phân công
+                        worker_booked[w] |= slot_bit
+                        working_slots.add(slot)
+                        machine_booked[m] |= slot_bit
+                        used_workers.add(w)
+                        used_machines.add(m)
+                        last_used = slot
+
+                    # EARLY STOPPING: Kiểm tra sau mỗi ca
+                    if kpi_reached(accum0, accum_rest, j):
+                        done = True
+                        break
+                    slot += 1
+
+                # Lưu kết quả cho công đoạn
+                op_status[j] = done
+                op_end_slot[j] = last_used
+
+                # Ghi KPI đạt được của công đoạn
+                progress.started[j] = 1
+                progress.completed[j] = done
+                progress.achieved_kpi0[j] = accum0
+                progress.achieved_kpi1[j] = accum_rest
+
+                order = inst.op_order[j]
+                if done:
+                    total_cost += op_cost
+
+                    # Kiểm tra nếu lệnh sản xuất đã hoàn thành
+                    # (ngày so sánh vẫn là ngày bắt đầu, giống phiên bản trước)
+                    if order >= 0:
+                        completed_operations_by_order[order] += 1
+                    if order >= 0 and completed_operations_by_order[order] == inst.order_operation_count[order]:
+                        if inst.order_deadline_day[order] >= 0:
+                            completed_orders_on_time += 1
+                elif order >= 0 and not order_failed[order]:
+                    order_failed[order] = True
+                    max_possible_completed_orders -= 1
+
+                scheduled += 1
+                # Công đoạn cuối cùng đã được lập lịch: kết quả đầy đủ, không dừng sớm theo cutoff
+                if cutoff is not None and scheduled < num_operations and (
+                    max_possible_completed_orders < cutoff[0]
+                    or (max_possible_completed_orders <= cutoff[0] and len(working_slots) > cutoff[1])
+                ):
+                    aborted = True
+                    break
+
+            if aborted:
+                break
+
+            # Kiểm tra bế tắc
+            if len(next_pending) == len(pending_ops):
+                break
+            pending_ops = next_pending
+
+        # Tổng số ca sử dụng
+        total_shift = len(working_slots)
+
+        return Fitness(completed_orders_on_time, total_shift, total_cost, aborted)
+
+    def export_operations(self, progress: OperationProgress) -> List:
+        """
+        Tạo bản sao các công đoạn mang KPI đạt được và lịch chi tiết từ progress
+        (dùng khi xuất kết quả, không dùng trong vòng tìm kiếm).
+        Lịch chi tiết được tạo từ ScheduleLog theo định dạng của phiên bản này (date, "Ca N", machine_id).
+        """
+        inst = self.instance
+        hours = inst.hours_per_shift
+        log = progress.schedule
+        if log is not None:
+            columns = log.columns()
+            days = columns["day"].tolist()
+            shifts = columns["shift"].tolist()
+            workers = columns["worker"].tolist()
+            assets = columns["asset"].tolist()
+            outputs0 = columns["output0"].tolist()
+            outputs1 = columns["output1"].tolist()
+        operations = []
+        for j, op in enumerate(inst.operations):
+            operation = copy.copy(op)
+            operation.achieved_kpis = list(op.achieved_kpis)
+            kpi_count = inst.op_kpi_count[j]
+            if progress.started[j] and kpi_count:
+                # Đảm bảo achieved_kpis có đủ phần tử
+                while len(operation.achieved_kpis) < kpi_count:
+                    operation.achieved_kpis.append(0.0)
+                operation.achieved_kpis[0] = progress.achieved_kpi0[j]
+                for k_idx in range(1, kpi_count):
+                    operation.achieved_kpis[k_idx] = progress.achieved_kpi1[j]
+            operation.detailed_schedule = list(op.detailed_schedule)
+            if log is not None:
+                rows = log.operation_rows(j)
+                for d, shift, w, m, ns, cl in zip(
+                    days[rows], shifts[rows], workers[rows], assets[rows], outputs0[rows], outputs1[rows]
+                ):
+                    operation.detailed_schedule.append({
+                        "worker_id": inst.worker_ids[w],
+                        "machine_id": inst.asset_ids[m],
+                        "date": self.day_labels[d],
+                        "shift": f"Ca {shift + 1}",
+                        "hours": hours,
+                        "achieved_kpi_0": ns,
+                        "achieved_kpi_1": cl
+                    })
+            operations.append(operation)
+        return operations
+
@@ -0,0 +1,195 @@
+import math
+from typing import List
+
+from fitness_cache import FitnessCache
+from models import Fitness, OperationProgress, fitness_key
+from parallel_evaluator import ParallelEvaluator
+
+
+class HarmonySearchBase:
+    """
+    Phần dùng chung của các biến thể HarmonySearch: so sánh và xếp hạng Harmony Memory, đánh giá theo lô
+    qua bộ nhớ đệm fitness và ParallelEvaluator, sàng lọc bằng mô hình thô / mô hình thay thế và kiểm tra
+    vi phạm ràng buộc. Lớp con tạo các thuộc tính mà các hàm này dùng (harmony_memory, instance, operations,
+    evaluator, parallel_evaluator, fitness_cache, coarse_model, surrogate_model, ...) trong preprocess_data/__init__
+    và cung cấp improvise_new_solution.
+    """
+    # parallel_evaluate_solutions không có cutoff: dùng giải pháp tệ nhất trong Harmony Memory làm ngưỡng cắt
+    cutoff_from_harmony_memory = False
+
+    def create_parallel_evaluator(self) -> ParallelEvaluator:
+        """
+        Bộ đánh giá theo lô trên n_jobs tiến trình cho self.evaluator. Nếu bộ đánh giá kiểm tra ràng buộc,
+        tiến trình con gửi về báo cáo vi phạm cùng fitness.
+        """
+        return ParallelEvaluator(
+            self.evaluator.evaluate_batch,
+            self.n_jobs,
+            num_operations=self.instance.num_operations if self.evaluator.reports_violations else None,
+        )
+
+    def is_better_fitness(self, fitness1, fitness2):
+        """
+        So sánh hai giá trị fitness để xác định cái nào tốt hơn.
+        :param fitness1: Tuple (completed_orders, shifts, cost)
+        :param fitness2: Tuple (completed_orders, shifts, cost)
+        :return: True nếu fitness1 tốt hơn fitness2, False nếu ngược lại
+        """
+        # Ưu tiên số lệnh hoàn thành đúng hạn (càng nhiều càng tốt), rồi số ca làm việc
+        # và chi phí (càng ít càng tốt): cùng thứ tự với khóa so sánh (xem models.pack_fitness)
+        return fitness_key(fitness1) < fitness_key(fitness2)
+
+    def harmony_memory_keys(self) -> List:
+        """Khóa so sánh (nhỏ hơn là tốt hơn, xem models.pack_fitness) của các giải pháp trong Harmony Memory."""
+        return [fitness_key(entry[1]) for entry in self.harmony_memory]
+
+    def rank_harmony_memory(self, reverse: bool = False) -> List[int]:
+        """
+        Chỉ số các giải pháp trong Harmony Memory từ tốt nhất tới tệ nhất (reverse: từ tệ nhất),
+        các giải pháp bằng nhau giữ thứ tự trong bộ nhớ.
+        """
+        keys = self.harmony_memory_keys()
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+    def find_worst_solution_index(self):
+        """Tìm chỉ số của giải pháp tệ nhất trong Harmony Memory (đầu tiên nếu có nhiều giải pháp bằng nhau)."""
+        keys = self.harmony_memory_keys()
+        return keys.index(max(keys))
+
+    def find_best_solution_index(self):
+        """Tìm chỉ số của giải pháp tốt nhất trong Harmony Memory (đầu tiên nếu có nhiều giải pháp bằng nhau)."""
+        keys = self.harmony_memory_keys()
+        return keys.index(min(keys))
+
+    def screen_candidates(self, solutions_list):
+        """
+        Sàng lọc giải pháp mới bằng mô hình thô (chỉ khi bật coarse_screening): giải pháp có số lệnh
+        đúng hạn ước lượng thấp hơn ước lượng của giải pháp tệ nhất trong Harmony Memory quá coarse_margin
+        bị loại mà không đánh giá chính xác. Giải pháp có ước lượng tốt nhất luôn được giữ lại.
+        Mức độ khớp giữa ước lượng và đánh giá chính xác: xem coarse_calibration.py.
+
+        :param solutions_list: Danh sách các cặp (solution, progress)
+        :return: Các cặp được giữ lại, theo thứ tự đầu vào
+        """
+        if self.coarse_model is None or len(solutions_list) <= 1 or not self.harmony_memory:
+            return solutions_list
+
+        # Ước lượng của giải pháp tệ nhất chỉ tính lại khi giải pháp này thay đổi
+        worst_solution = self.harmony_memory[self.find_worst_solution_index()][0]
+        if self._coarse_reference is None or self._coarse_reference[0] is not worst_solution:
+            reference = self.coarse_model.estimate(self.instance.encode_solution(worst_solution))
+            self._coarse_reference = (worst_solution, reference)
+        reference = self._coarse_reference[1]
+
+        estimates = [
+            self.coarse_model.estimate(self.instance.encode_solution(solution))
+            for solution, _ in solutions_list
+        ]
+        best_index = 0
+        for index, estimate in enumerate(estimates):
+            if self.is_better_fitness(estimate, estimates[best_index]):
+                best_index = index
+        kept = [
+            entry for index, (entry, estimate) in enumerate(zip(solutions_list, estimates))
+            if index == best_index or estimate[0] >= reference[0] - self.coarse_margin
+        ]
+        self.screened_candidates += len(solutions_list) - len(kept)
+        return kept
+
+    def preselect_by_surrogate(self, num_new_solutions: int):
+        """
+        Chọn trước giải pháp mới bằng mô hình thay thế (chỉ khi bật surrogate và mô hình đã được huấn luyện):
+        tạo ceil(num_new_solutions / surrogate_top_fraction) giải pháp, xếp hạng theo điểm dự đoán
+        và giữ num_new_solutions giải pháp tốt nhất để đánh giá chính xác.
+
+        :return: Danh sách các cặp (solution, progress); rỗng nếu không dùng mô hình thay thế
+        """
+        if self.surrogate_model is None or not self.surrogate_model.trained:
+            return []
+        pool_size = max(num_new_solutions, math.ceil(num_new_solutions / self.surrogate_top_fraction))
+        pool = [self.improvise_new_solution() for _ in range(pool_size)]
+        predicted = self.surrogate_model.predict(
+            [self.instance.encode_solution(solution) for solution, _ in pool]
+        )
+        ranked = sorted(range(pool_size), key=lambda index: -predicted[index])
+        return [pool[index] for index in ranked[:num_new_solutions]]
+
+    def observe_surrogate(self, allocation: List[tuple], fitness: Fitness):
+        """Thêm một kết quả đánh giá chính xác vào dữ liệu huấn luyện của mô hình thay thế (nếu bật)."""
+        if self.surrogate_model is None:
+            return
+        correlation = self.surrogate_model.observe(allocation, fitness)
+        if correlation is not False:
+            if correlation is None:
+                print(f"Mô hình thay thế: huấn luyện lần đầu trên {len(self.surrogate_model.samples)} mẫu")
+            else:
+                print(f"Mô hình thay thế: huấn luyện lại trên {len(self.surrogate_model.samples)} mẫu, "
+                      f"tương quan hạng dự đoán - chính xác trên mẫu mới: {correlation:.2f}")
+
+    def parallel_evaluate_solutions(self, solutions_list, cutoff: tuple = None):
+        """
+        Đánh giá nhiều giải pháp cùng lúc. Các giải pháp chưa có trong bộ nhớ đệm được mô phỏng
+        đồng thời bởi bộ đánh giá (Evaluator.evaluate_batch), chia cho n_jobs tiến trình nếu n_jobs > 1;
+        kết quả giống hệt đánh giá lần lượt từng giải pháp. Khi đánh giá trên pool tiến trình,
+        progress của các giải pháp mới không được ghi KPI (chỉ fitness và báo cáo vi phạm ràng buộc
+        được gửi về) và không được lưu vào bộ nhớ đệm. Mọi giải pháp mới được kiểm tra bằng validate_schedule.
+        
+        :param solutions_list: Danh sách các cặp (solution, progress)
+        :param cutoff: Fitness ngưỡng để dừng sớm, dùng chung cho cả lô (xem ShiftSimulator.run);
+            nếu None và cutoff_from_harmony_memory thì là giải pháp tệ nhất trong Harmony Memory.
+        :return: Danh sách các bộ (solution, fitness, progress) theo thứ tự đầu vào
+        """
+        results = [None] * len(solutions_list)
+        pending = []
+        for index, (solution, progress) in enumerate(solutions_list):
+            if progress is None:
+                progress = OperationProgress(len(self.operations))
+            allocation = self.instance.encode_solution(solution)
+            cache_key = FitnessCache.make_key(allocation)
+            fitness = self.fitness_cache.get(cache_key, progress)
+            if fitness is None:
+                pending.append((index, allocation, cache_key, progress))
+            else:
+                results[index] = (solution, fitness, progress)
+        if not pending:
+            return results
+
+        if cutoff is None and self.cutoff_from_harmony_memory and self.harmony_memory:
+            cutoff = self.harmony_memory[self.find_worst_solution_index()][1]
+
+        # progress từ pool tiến trình còn rỗng: không lưu vào bộ nhớ đệm, lần tra sau sẽ đánh giá lại
+        cacheable = self.parallel_evaluator.fills_progresses(len(pending))
+        fitnesses = self.parallel_evaluator.evaluate(
+            [allocation for _, allocation, _, _ in pending],
+            [progress for _, _, _, progress in pending],
+            cutoff=cutoff,
+        )
+        for (index, allocation, cache_key, progress), fitness in zip(pending, fitnesses):
+            if fitness.aborted:
+                self.aborted_evaluations += 1
+            else:
+                if cacheable:
+                    self.fitness_cache.put(cache_key, fitness, progress)
+                self.observe_surrogate(allocation, fitness)
+            self.validate_schedule(progress)
+            results[index] = (solutions_list[index][0], fitness, progress)
+        return results
+
+    def validate_schedule(self, progress: OperationProgress) -> bool:
+        """
+        Kiểm tra ràng buộc lịch trình theo báo cáo của bộ kiểm tra trực tuyến (ConstraintMonitor) trong
+        progress.violations: chỉ có khi bộ đánh giá bật kiểm tra (evaluator="checked"), nên ở chế độ
+        thường hàm này không làm gì. In tóm tắt và vài vi phạm đầu tiên nếu có.
+
+        :param progress: Kết quả đánh giá của giải pháp
+        :return: True nếu lịch trình hợp lệ (hoặc không được kiểm tra), False nếu có vi phạm ràng buộc
+        """
+        report = progress.violations
+        if report is None or not report["total"]:
+            return True
+        counts = ", ".join(f"{kind}: {count}" for kind, count in report["by_type"].items() if count)
+        print(f"VI PHẠM RÀNG BUỘC: {report['total']} lần ({counts})")
+        for violation in report["violations"][:5]:
+            print(f"  {violation['type']}: công đoạn {violation['operation_id']}, ngày {violation['day']} "
+                  f"ca {violation['shift']}, nhân viên {violation['worker_id']}, máy {violation['asset_id']}")
+        return False
@@ -1,13 +1,22 @@
-import random
 from typing import List, Dict
-import copy
 import json
 from datetime import datetime, timedelta
 import math
 from functools import lru_cache  # Thêm cache decorator
 
+from coarse_model import CoarseModel
+from encoder import build_problem_instance
+from evaluators import create_evaluator
+from fitness_cache import FitnessCache
+from harmony_search_base import HarmonySearchBase
+from models import Fitness, OperationProgress, ProblemInstance, copy_solution
+from random_streams import make_random
+from surrogate_model import SurrogateModel
+
+
+class HarmonySearch(HarmonySearchBase):
+    cutoff_from_harmony_memory = True
 
-class HarmonySearch:
     def preprocess_data(self):
         """
         Tiền xử lý dữ liệu để nhóm nhân viên, máy móc và công đoạn theo yêu cầu.
@@ -64,6 +73,17 @@ class HarmonySearch:
         # Cache cho việc tìm kiếm production order
         self.order_lookup = {order.order_id: order for order in self.production_orders}
 
+        # Biên dịch bài toán sang dạng chỉ số nguyên cho bộ mô phỏng
+        if self.instance is None:
+            self.instance = build_problem_instance(
+                self.workers, self.machines, self.operations, self.production_orders
+            )
+        self.evaluator = create_evaluator(self.evaluator, self.instance)
+        self.parallel_evaluator = self.create_parallel_evaluator()
+        self.coarse_model = CoarseModel(self.instance) if self.coarse_screening else None
+        self._coarse_reference = None  # (giải pháp, ước lượng) của giải pháp tệ nhất lần gần nhất
+        self.surrogate_model = SurrogateModel(self.instance) if self.surrogate else None
+
     def __init__(
         self,
         workers: List[Dict],
@@ -74,6 +94,15 @@ class HarmonySearch:
         max_iterations: int = None,
         harmony_consideration_rate: float = 0.9,
         pitch_adjustment_rate: float = 0.3,
+        instance: ProblemInstance = None,
+        fitness_cache_size: int = 0,
+        n_jobs: int = 1,
+        evaluator="reference",
+        coarse_screening: bool = False,
+        coarse_margin: int = 1,
+        surrogate: bool = False,
+        surrogate_top_fraction: float = 0.25,
+        seed=None,
     ):
         """
         :param workers: Danh sách nhân viên (mỗi nhân viên là một dictionary chứa thông tin)
@@ -84,11 +113,38 @@ class HarmonySearch:
         :param max_iterations: Số lần lặp tối đa (tự động tính toán nếu không nhập)
         :param harmony_consideration_rate: Tỷ lệ xem xét Harmony Memory
         :param pitch_adjustment_rate: Tỷ lệ điều chỉnh pitch
+        :param instance: ProblemInstance đã biên dịch (tự tạo từ danh sách đối tượng nếu không truyền)
+        :param fitness_cache_size: Số phân bổ tối đa trong bộ nhớ đệm fitness (giữ qua các lần tái khởi tạo)
+            0 (mặc định): tắt, vì các giải pháp trong một lần chạy hầu như không bao giờ lặp lại
+        :param n_jobs: Số tiến trình đánh giá song song các lô giải pháp (1: đánh giá trong tiến trình hiện tại,
+            số âm: dùng tất cả lõi CPU)
+        :param evaluator: Bộ đánh giá phân bổ: tên đã đăng ký trong evaluators ("reference", "vectorized",
+            "optimized") hoặc một Evaluator đã tạo cho cùng ProblemInstance
+        :param coarse_screening: Sàng lọc giải pháp mới bằng mô hình thô (CoarseModel) trước khi đánh giá chính xác
+        :param coarse_margin: Số lệnh đúng hạn ước lượng được phép thấp hơn ước lượng của giải pháp tệ nhất
+            trong Harmony Memory mà vẫn được đánh giá chính xác (xem screen_candidates)
+        :param surrogate: Dùng mô hình thay thế (SurrogateModel, hồi quy ridge học trực tuyến) để chọn trước
+            giải pháp mới có triển vọng từ một nhóm lớn hơn (xem preselect_by_surrogate)
+        :param surrogate_top_fraction: Tỷ lệ giải pháp trong nhóm được mô hình thay thế giữ lại để đánh giá chính xác
+        :param seed: Hạt giống của bộ sinh số ngẫu nhiên riêng (số nguyên hoặc numpy.random.SeedSequence,
+            xem random_streams.spawn_seeds); None: dùng trạng thái chung của module random
         """
         self.workers = workers
         self.machines = machines
         self.operations = operations
         self.production_orders = production_orders
+        self.instance = instance
+        self.fitness_cache = FitnessCache(fitness_cache_size)
+        self.aborted_evaluations = 0  # Số lần đánh giá dừng sớm theo ngưỡng cắt
+        self.n_jobs = n_jobs
+        self.evaluator = evaluator  # Được tạo trong preprocess_data (xem create_evaluator)
+        self.coarse_screening = coarse_screening
+        self.coarse_margin = coarse_margin
+        self.screened_candidates = 0  # Số giải pháp mới bị loại bởi mô hình thô
+        self.surrogate = surrogate
+        self.surrogate_top_fraction = surrogate_top_fraction
+        self.seed = seed
+        self.random = make_random(seed)  # Mọi lựa chọn ngẫu nhiên của lần chạy đi qua bộ sinh này
         
         # Tự động điều chỉnh tham số dựa trên kích thước dữ liệu
         data_size = len(workers) + len(machines) + len(operations) + len(production_orders)
@@ -123,16 +179,14 @@ class HarmonySearch:
         self.preprocess_data()
 
     def initialize_harmony_memory(self):
-        """Khởi tạo Harmony Memory với các giải pháp ngẫu nhiên."""
-        for _ in range(self.harmony_memory_size):
-            solution, operations_copy = self.generate_random_solution()
-            fitness = self.evaluate_solution(solution, operations_copy)
-            self.harmony_memory.append((solution, fitness, operations_copy))
+        """Khởi tạo Harmony Memory với các giải pháp ngẫu nhiên (được đánh giá cùng một lô)."""
+        candidates = [self.generate_random_solution() for _ in range(self.harmony_memory_size)]
+        self.harmony_memory.extend(self.parallel_evaluate_solutions(candidates))
 
     def generate_random_solution(self) -> tuple[Dict, List]:
         """
         Tạo một giải pháp ngẫu nhiên với cải tiến giảm thiểu tình trạng nhân viên bị khóa.
-        :return: Tuple gồm giải pháp (solution) và bản deepcopy của danh sách operations.
+        :return: Tuple gồm giải pháp (solution) và OperationProgress dùng khi đánh giá.
         """
         solution = {
             operation.operation_id: {"workers": [], "machines": []}
@@ -143,8 +197,8 @@ class HarmonySearch:
         operation_priority = self.calculate_operation_priority()
         
         # Bước 2: Phân bổ tài nguyên theo thứ tự ưu tiên, tránh khóa tài nguyên
-        available_workers = set(self.workers)
-        available_machines = set(self.machines)
+        available_workers = dict.fromkeys(self.workers)
+        available_machines = dict.fromkeys(self.machines)
         
         # Theo dõi tài nguyên đã được phân bổ cho mỗi công đoạn
         allocated_workers = {}
@@ -175,7 +229,7 @@ class HarmonySearch:
                 # Chỉ loại bỏ workers khỏi available nếu công đoạn này có thể bắt đầu ngay
                 if self.can_operation_start_immediately(operation):
                     for worker in selected_workers:
-                        available_workers.discard(worker)
+                        available_workers.pop(worker, None)
                 else:
                     # Nếu công đoạn chưa thể bắt đầu, chỉ phân bổ tạm thời
                     allocated_workers[op_id] = selected_workers
@@ -189,7 +243,7 @@ class HarmonySearch:
                 # Chỉ loại bỏ machines khỏi available nếu công đoạn này có thể bắt đầu ngay
                 if self.can_operation_start_immediately(operation):
                     for machine in selected_machines:
-                        available_machines.discard(machine)
+                        available_machines.pop(machine, None)
                 else:
                     # Nếu công đoạn chưa thể bắt đầu, chỉ phân bổ tạm thời
                     allocated_machines[op_id] = selected_machines
@@ -203,10 +257,10 @@ class HarmonySearch:
         # Bước 4: Phân bổ tài nguyên còn lại một cách linh hoạt
         self.allocate_remaining_resources(solution, available_workers, available_machines)
         
-        # Tạo một bản deepcopy của danh sách operations
-        operations_copy = copy.deepcopy(self.operations)
+        # Trạng thái đánh giá riêng cho giải pháp (không sao chép danh sách operations)
+        progress = OperationProgress(len(self.operations))
         
-        return solution, operations_copy
+        return solution, progress
     
     def calculate_operation_priority(self):
         """
@@ -214,10 +268,10 @@ class HarmonySearch:
         """
         operation_priority = []
         
-        for operation in self.operations:
+        for j, operation in enumerate(self.operations):
             # Tính độ ưu tiên dựa trên dependencies
             dependency_count = len(operation.prev_operation) if operation.prev_operation else 0
-            dependent_count = sum(1 for deps in self.operation_dependencies.values() if operation.operation_id in deps)
+            dependent_count = self.instance.critical_path.dependent_count[j]
             
             # Tính độ ưu tiên dựa trên KPI
             kpi_value = operation.assigned_kpis[0]["value"] if operation.assigned_kpis else 0
@@ -231,7 +285,12 @@ class HarmonySearch:
             operation_priority.append((priority, operation))
         
         # Sắp xếp theo độ ưu tiên giảm dần
-        operation_priority.sort(key=lambda x: x[0], reverse=True)
+        # Cùng độ ưu tiên: công đoạn gấp hơn (ít độ trễ cho phép, nhiều việc phía sau) được xét trước
+        urgency_rank = self.instance.critical_path.urgency_rank
+        operation_index = self.instance.operation_index
+        operation_priority.sort(
+            key=lambda x: (x[0], -urgency_rank[operation_index[x[1].operation_id]]), reverse=True
+        )
         
         return operation_priority
     
@@ -268,7 +327,7 @@ class HarmonySearch:
                             break
                     else:
                         # Nếu không tìm thấy, trả về available
-                        available_workers.add(worker)
+                        available_workers[worker] = None
         
         # Tái phân bổ machines bị khóa
         for op_id, machines in allocated_machines.items():
@@ -285,7 +344,7 @@ class HarmonySearch:
                             break
                     else:
                         # Nếu không tìm thấy, trả về available
-                        available_machines.add(machine)
+                        available_machines[machine] = None
     
     def allocate_remaining_resources(self, solution, available_workers, available_machines):
         """
@@ -322,15 +381,37 @@ class HarmonySearch:
                     solution[target_operation.operation_id]["machines"].append(machine)
 
     def evaluate_solution(
-        self, solution: Dict, operations: List
-    ) -> tuple[int, int, int]:
+        self,
+        solution: Dict,
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+    ) -> Fitness:
         """
         Hàm đánh giá giải pháp.
         :param solution: Giải pháp hiện tại.
-        :param operations: Danh sách các công đoạn.
-        :return: Tuple gồm số lệnh sản xuất hoàn thành đúng hạn và tổng số ca làm việc.
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành của từng công đoạn (có thể None).
+        :param record: Ghi thêm lịch chi tiết vào progress; mặc định chỉ tính fitness.
+        :param cutoff: Fitness ngưỡng; dừng đánh giá ngay khi giải pháp chắc chắn không vượt được.
+        :return: Fitness gồm số lệnh sản xuất hoàn thành đúng hạn, tổng số ca làm việc và tổng chi phí;
+            Fitness.aborted cho biết đánh giá đã dừng sớm.
         """
-        return self.schedule_operations(solution, operations)
+        fitness = self.schedule_operations(solution, progress, record, cutoff)
+        if fitness.aborted:
+            self.aborted_evaluations += 1
+        return fitness
+
+    def materialize_schedule(self, solution: Dict) -> List:
+        """
+        Chạy lại một giải pháp ở chế độ ghi đầy đủ để lấy KPI đạt được và lịch chi tiết
+        (dùng cho export_all_operations_to_json).
+        :param solution: Giải pháp cần lập lịch chi tiết.
+        :return: Bản sao danh sách công đoạn đã được ghi kết quả.
+        """
+        progress = OperationProgress(len(self.operations))
+        # Không áp dụng nhánh cận khi chạy lại để luôn có lịch đầy đủ
+        self.evaluator.evaluate(self.instance.encode_solution(solution), progress, record=True)
+        return self.evaluator.export_operations(progress)
 
     def optimize(self):
         """Chạy thuật toán Harmony Search với cải tiến hội tụ sớm và cải tiến giải pháp cục bộ."""
@@ -350,7 +431,6 @@ class HarmonySearch:
         # Lưu trữ giải pháp tốt nhất từng tìm thấy
         global_best_solution = None
         global_best_fitness = (-float('inf'), float('inf'), float('inf'))
-        global_best_operations_copy = None
         
         # Thêm điều kiện dừng sớm cho dữ liệu nhỏ
         early_stop_threshold = 5  # Số lần lặp không cải thiện trước khi dừng sớm với dữ liệu nhỏ
@@ -377,33 +457,41 @@ class HarmonySearch:
             best_new_solution = None
             best_new_fitness = (-float('inf'), float('inf'), float('inf'))
 
-            for _ in range(num_new_solutions):
-                # Tạo và đánh giá giải pháp mới
-                new_solution, operations_copy = self.improvise_new_solution()
-                
+            # Mô hình thay thế (nếu bật) chọn trước các giải pháp mới có triển vọng từ một nhóm lớn hơn
+            preselected = self.preselect_by_surrogate(num_new_solutions)
+
+            candidates = []
+            for index in range(num_new_solutions):
+                # Tạo giải pháp mới
+                new_solution, progress = preselected[index] if preselected else self.improvise_new_solution()
+
                 # Áp dụng cải tiến cục bộ cho giải pháp mới
-                if random.random() < 0.3:  # 30% cơ hội cải tiến cục bộ
-                    new_solution, operations_copy = self.local_refinement(new_solution, operations_copy)
-                
-                fitness = self.evaluate_solution(new_solution, operations_copy)
-                
+                if self.random.random() < 0.3:  # 30% cơ hội cải tiến cục bộ
+                    new_solution, progress = self.local_refinement(new_solution, progress)
+                candidates.append((new_solution, progress))
+
+            # Loại các giải pháp mà mô hình thô cho là không thể cạnh tranh
+            candidates = self.screen_candidates(candidates)
+
+            # Đánh giá các giải pháp mới cùng một lô
+            for new_solution, fitness, progress in self.parallel_evaluate_solutions(candidates):
                 # Cập nhật giải pháp tốt nhất trong lần lặp này
                 if self.is_better_fitness(fitness, best_new_fitness):
-                    best_new_solution = (new_solution, fitness, operations_copy)
+                    best_new_solution = (new_solution, fitness, progress)
                     best_new_fitness = fitness
 
             # Lấy giải pháp mới tốt nhất
-            new_solution, fitness, operations_copy = best_new_solution
+            new_solution, fitness, progress = best_new_solution
             completed_orders_on_time, total_shift, total_cost = fitness
             
             # Áp dụng lai tạo với giải pháp tốt nhất hiện tại (nếu có)
-            if global_best_solution is not None and random.random() < 0.4:
+            if global_best_solution is not None and self.random.random() < 0.4:
                 hybrid_solution = self.hybridize_solutions(new_solution, global_best_solution)
-                hybrid_operations_copy = copy.deepcopy(self.operations)
-                hybrid_fitness = self.evaluate_solution(hybrid_solution, hybrid_operations_copy)
+                hybrid_progress = OperationProgress(len(self.operations))
+                hybrid_fitness = self.evaluate_solution(hybrid_solution, hybrid_progress)
                 
                 if self.is_better_fitness(hybrid_fitness, fitness):
-                    new_solution, fitness, operations_copy = hybrid_solution, hybrid_fitness, hybrid_operations_copy
+                    new_solution, fitness, progress = hybrid_solution, hybrid_fitness, hybrid_progress
                     completed_orders_on_time, total_shift, total_cost = hybrid_fitness
             
             print(
@@ -417,8 +505,8 @@ class HarmonySearch:
             if self.is_better_fitness(fitness, self.harmony_memory[worst_solution_index][1]):
                 self.harmony_memory[worst_solution_index] = (
                     new_solution,
-                    (completed_orders_on_time, total_shift, total_cost),
-                    operations_copy,
+                    fitness,
+                    progress,
                 )
 
             # Tìm giải pháp tốt nhất hiện tại
@@ -428,9 +516,8 @@ class HarmonySearch:
 
             # Cập nhật giải pháp tốt nhất toàn cục
             if self.is_better_fitness(current_best_fitness, global_best_fitness):
-                global_best_solution = copy.deepcopy(self.harmony_memory[best_solution_index][0])
+                global_best_solution = copy_solution(self.harmony_memory[best_solution_index][0])
                 global_best_fitness = current_best_fitness
-                global_best_operations_copy = copy.deepcopy(self.harmony_memory[best_solution_index][2])
 
             # Kiểm tra cải tiến
             if self.is_better_fitness(current_best_fitness, best_fitness_so_far):
@@ -466,6 +553,9 @@ class HarmonySearch:
                     print(f"Dừng sớm tại lần lặp {iteration + 1} do không có cải tiến")
                     break
 
+        # Dừng pool tiến trình đánh giá song song (nếu đã khởi động)
+        self.parallel_evaluator.shutdown()
+
         # Tính thời gian thực thi
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds()
@@ -481,73 +571,29 @@ class HarmonySearch:
         self.print_harmony_memory(execution_time)
 
         # Kiểm tra xem giải pháp tốt nhất toàn cục có tốt hơn giải pháp tốt nhất trong harmony_memory không
-        best_hm_solution = min(
-            self.harmony_memory,
-            key=lambda x: (-x[1][0], x[1][1], x[1][2]),
-        )
+        best_hm_solution = self.harmony_memory[self.find_best_solution_index()]
         
         if self.is_better_fitness(global_best_fitness, best_hm_solution[1]):
-            return global_best_solution, global_best_fitness, global_best_operations_copy
+            best_solution, best_fitness = global_best_solution, global_best_fitness
         else:
-            return best_hm_solution
+            best_solution, best_fitness = best_hm_solution[0], best_hm_solution[1]
+
+        # Trong quá trình tìm kiếm chỉ tính fitness, lịch chi tiết được tạo một lần tại đây
+        return best_solution, best_fitness, self.materialize_schedule(best_solution)
             
-    def is_better_fitness(self, fitness1, fitness2):
-        """
-        So sánh hai giá trị fitness để xác định cái nào tốt hơn.
-        :param fitness1: Tuple (completed_orders, shifts, cost)
-        :param fitness2: Tuple (completed_orders, shifts, cost)
-        :return: True nếu fitness1 tốt hơn fitness2, False nếu ngược lại
-        """
-        # Ưu tiên số lệnh hoàn thành đúng hạn (càng nhiều càng tốt)
-        if fitness1[0] > fitness2[0]:
-            return True
-        elif fitness1[0] < fitness2[0]:
-            return False
-        
-        # Nếu số lệnh bằng nhau, ưu tiên số ca làm việc (càng ít càng tốt)
-        if fitness1[1] < fitness2[1]:
-            return True
-        elif fitness1[1] > fitness2[1]:
-            return False
-        
-        # Nếu số ca bằng nhau, ưu tiên chi phí (càng ít càng tốt)
-        return fitness1[2] < fitness2[2]
-        
-    def find_worst_solution_index(self):
-        """Tìm chỉ số của giải pháp tệ nhất trong Harmony Memory."""
-        return max(
-            range(len(self.harmony_memory)),
-            key=lambda i: (
-                -self.harmony_memory[i][1][0],  # Ưu tiên số lệnh đúng hạn
-                self.harmony_memory[i][1][1],   # Sau đó ưu tiên tổng số ca
-                self.harmony_memory[i][1][2],   # Cuối cùng ưu tiên tổng chi phí
-            ),
-        )
-        
-    def find_best_solution_index(self):
-        """Tìm chỉ số của giải pháp tốt nhất trong Harmony Memory."""
-        return min(
-            range(len(self.harmony_memory)),
-            key=lambda i: (
-                -self.harmony_memory[i][1][0],  # Ưu tiên số lệnh đúng hạn
-                self.harmony_memory[i][1][1],   # Sau đó ưu tiên tổng số ca
-                self.harmony_memory[i][1][2],   # Cuối cùng ưu tiên tổng chi phí
-            ),
-        )
-    
-    def local_refinement(self, solution, operations_copy):
+    def local_refinement(self, solution, progress):
         """
         Cải tiến cục bộ cho giải pháp bằng cách hoán đổi tài nguyên.
         
         :param solution: Giải pháp cần cải tiến
-        :param operations_copy: Bản sao của các công đoạn
-        :return: Giải pháp đã cải tiến và bản sao operations mới
+        :param progress: Trạng thái đánh giá của giải pháp
+        :return: Giải pháp đã cải tiến và OperationProgress mới
         """
-        refined_solution = copy.deepcopy(solution)
+        refined_solution = copy_solution(solution)
         
         # Lựa chọn ngẫu nhiên một số công đoạn để tối ưu
         num_operations_to_refine = min(5, len(self.operations))
-        operations_to_refine = random.sample(self.operations, num_operations_to_refine)
+        operations_to_refine = self.random.sample(self.operations, num_operations_to_refine)
         
         for operation in operations_to_refine:
             op_id = operation.operation_id
@@ -593,10 +639,10 @@ class HarmonySearch:
                         refined_solution[op_id]["machines"].remove(worst_machine)
                         refined_solution[op_id]["machines"].append(best_replacement)
         
-        # Cập nhật operations_copy
-        new_operations_copy = copy.deepcopy(self.operations)
+        # Trạng thái đánh giá riêng cho giải pháp đã cải tiến
+        new_progress = OperationProgress(len(self.operations))
         
-        return refined_solution, new_operations_copy
+        return refined_solution, new_progress
     
     def restart_search(self, best_solution=None):
         """
@@ -610,23 +656,23 @@ class HarmonySearch:
             if best_entry:
                 best_entry = best_entry[0]
             else:
-                best_entry = min(self.harmony_memory, key=lambda x: (-x[1][0], x[1][1], x[1][2]))
+                best_entry = self.harmony_memory[self.find_best_solution_index()]
         else:
-            best_entry = min(self.harmony_memory, key=lambda x: (-x[1][0], x[1][1], x[1][2]))
+            best_entry = self.harmony_memory[self.find_best_solution_index()]
         
         # Xóa bộ nhớ Harmony cũ
         self.harmony_memory = []
         
-        # Khởi tạo lại Harmony Memory
-        for i in range(self.harmony_memory_size):
-            if i == 0 and best_entry is not None:
-                # Giữ lại giải pháp tốt nhất
-                self.harmony_memory.append(best_entry)
-            else:
-                # Tạo giải pháp mới với độ đa dạng cao
-                solution, operations_copy = self.generate_random_solution()
-                fitness = self.evaluate_solution(solution, operations_copy)
-                self.harmony_memory.append((solution, fitness, operations_copy))
+        # Khởi tạo lại Harmony Memory: giữ lại giải pháp tốt nhất, phần còn lại là giải pháp mới
+        # với độ đa dạng cao, được đánh giá cùng một lô trước khi đưa vào bộ nhớ
+        candidates = [
+            self.generate_random_solution()
+            for _ in range(self.harmony_memory_size - (1 if best_entry is not None else 0))
+        ]
+        new_entries = self.parallel_evaluate_solutions(candidates)
+        if best_entry is not None:
+            self.harmony_memory.append(best_entry)
+        self.harmony_memory.extend(new_entries)
         
         # Reset tham số về giá trị ban đầu
         self.harmony_consideration_rate = 0.9
@@ -723,28 +769,29 @@ class HarmonySearch:
             hybrid_solution[operation_id] = {"workers": [], "machines": []}
             
             # Lấy thông tin công đoạn tương ứng
-            operation = next((op for op in self.operations if op.operation_id == operation_id), None)
+            operation_index = self.instance.operation_index.get(operation_id)
+            operation = self.operations[operation_index] if operation_index is not None else None
             if not operation:
                 continue
             
             # Lai tạo workers (lấy từ một trong hai giải pháp gốc)
-            workers_pool = set()
+            workers_pool = {}  # Giữ thứ tự thêm vào (thứ tự duyệt ổn định giữa các lần chạy)
             
             # Tạo tập hợp tất cả nhân viên có thể sử dụng
-            if random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
+            if self.random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
                 for worker in solution1[operation_id]["workers"]:
                     if worker.position == operation.required_position:
-                        workers_pool.add(worker)
+                        workers_pool[worker] = None
             else:
                 for worker in solution2[operation_id]["workers"]:
                     if worker.position == operation.required_position:
-                        workers_pool.add(worker)
+                        workers_pool[worker] = None
             
             # Lấy thêm nhân viên từ giải pháp còn lại nếu chưa đủ
             if len(workers_pool) < 2:
                 for worker in solution2[operation_id]["workers"] + solution1[operation_id]["workers"]:
                     if worker.position == operation.required_position and worker not in workers_pool:
-                        workers_pool.add(worker)
+                        workers_pool[worker] = None
                         if len(workers_pool) >= 2:
                             break
             
@@ -755,22 +802,22 @@ class HarmonySearch:
             hybrid_solution[operation_id]["workers"] = workers_list[:3]
             
             # Lai tạo machines (tương tự như workers)
-            machines_pool = set()
+            machines_pool = {}
             
-            if random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
+            if self.random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
                 for machine in solution1[operation_id]["machines"]:
                     if machine.asset_type == operation.required_machine_type:
-                        machines_pool.add(machine)
+                        machines_pool[machine] = None
             else:
                 for machine in solution2[operation_id]["machines"]:
                     if machine.asset_type == operation.required_machine_type:
-                        machines_pool.add(machine)
+                        machines_pool[machine] = None
             
             # Lấy thêm máy móc từ giải pháp còn lại nếu chưa đủ
             if len(machines_pool) < 2:
                 for machine in solution2[operation_id]["machines"] + solution1[operation_id]["machines"]:
                     if machine.asset_type == operation.required_machine_type and machine not in machines_pool:
-                        machines_pool.add(machine)
+                        machines_pool[machine] = None
                         if len(machines_pool) >= 2:
                             break
             
@@ -803,7 +850,7 @@ class HarmonySearch:
         """
         formatted_memory = []
 
-        for solution, fitness, operations_copy in self.harmony_memory:
+        for solution, fitness, progress in self.harmony_memory:
             formatted_solution = {"operations": []}
 
             for operation_id, allocation in solution.items():
@@ -845,6 +892,11 @@ class HarmonySearch:
         
         if execution_time is not None:
             algorithm_info["execution_time_seconds"] = execution_time
+        algorithm_info["fitness_cache"] = self.fitness_cache.stats()
+        algorithm_info["aborted_evaluations"] = self.aborted_evaluations
+        algorithm_info["screened_candidates"] = self.screened_candidates
+        if self.surrogate_model is not None:
+            algorithm_info["surrogate_rank_correlations"] = self.surrogate_model.rank_correlations
         
         # In thông tin tổng quan
         print(f"\nTổng quan thuật toán:")
@@ -856,11 +908,20 @@ class HarmonySearch:
               f"{best_fitness[2]} chi phí")
         if execution_time is not None:
             print(f"Thời gian chạy: {execution_time:.2f} giây")
+        if self.fitness_cache.enabled:
+            print(f"Bộ nhớ đệm fitness: {self.fitness_cache.hits} lần trúng / "
+                  f"{self.fitness_cache.hits + self.fitness_cache.misses} lần tra "
+                  f"({self.fitness_cache.hit_rate:.1%}), đang lưu {len(self.fitness_cache)} phân bổ")
+        print(f"Số lần đánh giá dừng sớm theo ngưỡng cắt: {self.aborted_evaluations}")
+        if self.coarse_model is not None:
+            print(f"Số giải pháp mới bị loại bởi mô hình thô: {self.screened_candidates}")
+        if self.surrogate_model is not None:
+            print(f"Mô hình thay thế: {self.surrogate_model}")
 
     def improvise_new_solution(self) -> tuple[Dict, List]:
         """
         Tạo một giải pháp mới dựa trên Harmony Memory với cải tiến heuristic.
-        :return: Tuple gồm giải pháp (solution) và bản deepcopy của danh sách operations.
+        :return: Tuple gồm giải pháp (solution) và OperationProgress dùng khi đánh giá.
         """
         solution = {
             operation.operation_id: {"workers": [], "machines": []}
@@ -872,9 +933,9 @@ class HarmonySearch:
         
         # Sắp xếp các công đoạn theo độ ưu tiên (ví dụ: dựa trên dependencies)
         operations_priority = []
-        for op in self.operations:
+        for j, op in enumerate(self.operations):
             # Số lượng công đoạn phụ thuộc vào công đoạn này
-            dependent_count = sum(1 for deps in self.operation_dependencies.values() if op.operation_id in deps)
+            dependent_count = self.instance.critical_path.dependent_count[j]
             # Số lượng công đoạn mà công đoạn này phụ thuộc vào
             dependency_count = len(op.prev_operation) if op.prev_operation else 0
             # Độ ưu tiên: công đoạn có nhiều dependencies nhưng ít dependents sẽ có ưu tiên cao hơn
@@ -883,21 +944,25 @@ class HarmonySearch:
             operations_priority.append((priority, op))
         
         # Sắp xếp các công đoạn theo độ ưu tiên tăng dần
-        operations_priority.sort(key=lambda x: x[0])
+        # Cùng độ ưu tiên: công đoạn gấp hơn (ít độ trễ cho phép, nhiều việc phía sau) được xét trước
+        urgency_rank = self.instance.critical_path.urgency_rank
+        operation_index = self.instance.operation_index
+        operations_priority.sort(key=lambda x: (x[0], urgency_rank[operation_index[x[1].operation_id]]))
+
+        # Harmony Memory không đổi trong lúc tạo giải pháp: chỉ xếp hạng một lần (khi cần)
+        ranked_solutions = None
 
         # Bước 1: Áp dụng Harmony Consideration cho các công đoạn theo thứ tự ưu tiên
         for _, operation in operations_priority:
             operation_id = operation.operation_id
             
-            if random.random() < self.harmony_consideration_rate:
+            if self.random.random() < self.harmony_consideration_rate:
                 # Chọn một giải pháp ngẫu nhiên từ Harmony Memory, thiên vị các giải pháp tốt
-                weights = [1 / (i + 1) for i in range(len(self.harmony_memory))]
-                sorted_hm = sorted(
-                    self.harmony_memory,
-                    key=lambda x: (-x[1][0], x[1][1], x[1][2])
-                )
-                selected_solution = random.choices(
-                    [entry[0] for entry in sorted_hm],
+                if ranked_solutions is None:
+                    ranked_solutions = [self.harmony_memory[i][0] for i in self.rank_harmony_memory()]
+                    weights = [1 / (i + 1) for i in range(len(ranked_solutions))]
+                selected_solution = self.random.choices(
+                    ranked_solutions,
                     weights=weights,
                     k=1
                 )[0]
@@ -911,14 +976,14 @@ class HarmonySearch:
                             used_workers.add(worker)
                             
                             # Áp dụng Pitch Adjustment với xác suất PAR
-                            if random.random() < self.pitch_adjustment_rate:
+                            if self.random.random() < self.pitch_adjustment_rate:
                                 # Tìm công đoạn khác có cùng yêu cầu
                                 alternative_ops = [
                                     op for _, op in operations_priority
                                     if op.required_position == worker.position and op.operation_id != operation_id
                                 ]
                                 if alternative_ops:
-                                    alt_op = random.choice(alternative_ops)
+                                    alt_op = self.random.choice(alternative_ops)
                                     solution[operation_id]["workers"].remove(worker)
                                     solution[alt_op.operation_id]["workers"].append(worker)
                     
@@ -929,14 +994,14 @@ class HarmonySearch:
                             used_machines.add(machine)
                             
                             # Áp dụng Pitch Adjustment với xác suất PAR
-                            if random.random() < self.pitch_adjustment_rate:
+                            if self.random.random() < self.pitch_adjustment_rate:
                                 # Tìm công đoạn khác có cùng yêu cầu
                                 alternative_ops = [
                                     op for _, op in operations_priority
                                     if op.required_machine_type == machine.asset_type and op.operation_id != operation_id
                                 ]
                                 if alternative_ops:
-                                    alt_op = random.choice(alternative_ops)
+                                    alt_op = self.random.choice(alternative_ops)
                                     solution[operation_id]["machines"].remove(machine)
                                     solution[alt_op.operation_id]["machines"].append(machine)
         
@@ -964,7 +1029,7 @@ class HarmonySearch:
                 total_weight = sum(weights) if sum(weights) > 0 else 1
                 norm_weights = [w / total_weight for w in weights]
                 
-                selected_operation = random.choices(eligible_operations, weights=norm_weights, k=1)[0]
+                selected_operation = self.random.choices(eligible_operations, weights=norm_weights, k=1)[0]
                 solution[selected_operation.operation_id]["workers"].append(worker)
                 used_workers.add(worker)
 
@@ -992,7 +1057,7 @@ class HarmonySearch:
                 total_weight = sum(weights) if sum(weights) > 0 else 1
                 norm_weights = [w / total_weight for w in weights]
                 
-                selected_operation = random.choices(eligible_operations, weights=norm_weights, k=1)[0]
+                selected_operation = self.random.choices(eligible_operations, weights=norm_weights, k=1)[0]
                 solution[selected_operation.operation_id]["machines"].append(machine)
                 used_machines.add(machine)
 
@@ -1022,10 +1087,10 @@ class HarmonySearch:
                     selected_machine = max(eligible_machines, key=lambda m: m.productivity)
                     solution[operation_id]["machines"].append(selected_machine)
 
-        # Tạo một bản deepcopy của danh sách operations
-        operations_copy = copy.deepcopy(self.operations)
+        # Trạng thái đánh giá riêng cho giải pháp (không sao chép danh sách operations)
+        progress = OperationProgress(len(self.operations))
 
-        return solution, operations_copy
+        return solution, progress
 
     def diversify_harmony_memory(self, percentage: float):
         """
@@ -1038,15 +1103,11 @@ class HarmonySearch:
         num_to_replace = max(1, int(percentage * self.harmony_memory_size))
         
         # Xác định các giải pháp tệ nhất trong Harmony Memory
-        worst_indices = sorted(
-            range(len(self.harmony_memory)),
-            key=lambda i: (-self.harmony_memory[i][1][0], self.harmony_memory[i][1][1], self.harmony_memory[i][1][2]),
-            reverse=True
-        )[:num_to_replace]
+        worst_indices = self.rank_harmony_memory(reverse=True)[:num_to_replace]
         
-        # Thay thế các giải pháp tệ nhất bằng các giải pháp mới
-        for idx in worst_indices:
-            # Tạo giải pháp mới với xáo trộn cao hơn
+        # Tạo các giải pháp mới với xáo trộn cao hơn
+        candidates = []
+        for _ in worst_indices:
             old_harmony_consideration_rate = self.harmony_consideration_rate
             old_pitch_adjustment_rate = self.pitch_adjustment_rate
             
@@ -1055,392 +1116,54 @@ class HarmonySearch:
             self.pitch_adjustment_rate = 0.5      # Tăng để thúc đẩy đa dạng
             
             # Tạo giải pháp mới
-            new_solution, operations_copy = self.generate_random_solution()
-            fitness = self.evaluate_solution(new_solution, operations_copy)
+            candidates.append(self.generate_random_solution())
             
             # Khôi phục tham số
             self.harmony_consideration_rate = old_harmony_consideration_rate
             self.pitch_adjustment_rate = old_pitch_adjustment_rate
-            
-            # Thay thế giải pháp tệ
-            self.harmony_memory[idx] = (new_solution, fitness, operations_copy)
+
+        # Đánh giá cùng một lô rồi thay thế các giải pháp tệ nhất
+        for idx, entry in zip(worst_indices, self.parallel_evaluate_solutions(candidates)):
+            self.harmony_memory[idx] = entry
             
         print(f"Đã đa dạng hóa {num_to_replace} giải pháp trong Harmony Memory")
 
-    def parallel_evaluate_solutions(self, solutions_list):
-        """
-        Đánh giá song song nhiều giải pháp để cải thiện hiệu suất.
-        
-        :param solutions_list: Danh sách các cặp (solution, operations_copy)
-        :return: Danh sách các kết quả đánh giá
-        """
-        results = []
-        for solution, operations_copy in solutions_list:
-            fitness = self.evaluate_solution(solution, operations_copy)
-            results.append((solution, fitness, operations_copy))
-        return results
-
     def schedule_operations(
-        self, solution: Dict, operations: List
-    ) -> tuple[int, int, int]:
+        self,
+        solution: Dict,
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+    ) -> Fitness:
         """
         Lên lịch cho các công đoạn dựa trên giải pháp - phiên bản cải tiến với chiến lược lập lịch thông minh.
+        Việc lập lịch được thực hiện bởi bộ đánh giá (self.evaluator) trên ProblemInstance đã biên dịch.
         :param solution: Giải pháp hiện tại (mapping công đoạn với nhân viên và máy móc).
-        :param operations: Danh sách các công đoạn.
-        """
-        total_shift = 0  # Tổng số ca làm việc
-        total_cost = 0
-        completed_orders_on_time = 0  # Số lệnh sản xuất hoàn thành đúng hạn
-        completed_operations_by_order = {
-            order.order_id: 0 for order in self.production_orders
-        }  # Số công đoạn hoàn thành theo từng production_order_id
-
-        start_date = "2025-04-01"
-        completed_operations = []  # Danh sách các công đoạn đã hoàn thành
-        current_date = datetime.strptime(start_date, "%Y-%m-%d")  # Ngày bắt đầu
-        solution_copy = copy.deepcopy(solution)
-        workers_in_completed_operation = set()
-        machines_in_completed_operation = set()
-
-        workers_in_last_shift = set()  # Tập hợp nhân viên đã làm việc trong ca trước
-        
-        # Tạo priority_queue - hàng đợi ưu tiên cho các công đoạn sẵn sàng
-        ready_operations = []  # (độ ưu tiên, operation) - số càng thấp, ưu tiên càng cao
-        
-        # NHÁNH CẬN: Theo dõi số lệnh hoàn thành đúng hạn tối đa có thể đạt được
-        max_possible_completed_orders = len(self.production_orders)  # Ban đầu = tổng số lệnh
-        
-        # Lấy trường hợp tồi nhất trong harmony memory để so sánh
-        worst_completed_orders = 0
-        worst_shifts = float('inf')
-        if hasattr(self, 'harmony_memory') and self.harmony_memory:
-            worst_fitness = max(self.harmony_memory, key=lambda x: (-x[1][0], x[1][1], x[1][2]))[1]
-            worst_completed_orders = worst_fitness[0]
-            worst_shifts = worst_fitness[1]
-        
-        # Hàm cập nhật hàng đợi công đoạn sẵn sàng
-        def update_ready_operations():
-            ready_operations.clear()
-            for op in operations:
-                if op.operation_id in completed_operations:
-                    continue
-                
-                # Kiểm tra nếu tất cả công đoạn tiên quyết đã hoàn thành
-                if all(prev_op in completed_operations for prev_op in op.prev_operation):
-                    # Tính độ ưu tiên
-                    # 1. Ưu tiên lệnh sản xuất gần deadline
-                    order = self.order_lookup.get(op.production_order_id)
-                    days_to_deadline = 0
-                    if order:
-                        deadline = datetime.strptime(order.end_date, "%Y-%m-%d")
-                        days_to_deadline = (deadline - current_date).days
-                    
-                    # 2. Ưu tiên giá trị KPI cao
-                    kpi_value = op.assigned_kpis[0]["value"] if op.assigned_kpis else 0
-                    
-                    # 3. Ưu tiên công đoạn có nhiều dependents (nhiều công đoạn phụ thuộc vào nó)
-                    dependent_count = sum(1 for deps in self.operation_dependencies.values() if op.operation_id in deps)
-                    
-                    # Tính tổng trọng số - số càng nhỏ ưu tiên càng cao
-                    priority = days_to_deadline - 0.2 * kpi_value - 0.5 * dependent_count
-                    
-                    ready_operations.append((priority, op))
-            
-            # Sắp xếp theo độ ưu tiên tăng dần
-            ready_operations.sort(key=lambda x: x[0])
-
-        # Chiến lược lập lịch cải tiến
-        max_days = 59  # Giới hạn số ngày
-        
-        while True:
-            # Chuyển đổi datetime thành chuỗi
-            day_str = current_date.strftime("%Y-%m-%d")
-            
-            # Cập nhật hàng đợi ưu tiên
-            update_ready_operations()
-            
-            for shift in range(1, 5):  # Duyệt qua các ca từ 1 đến 4
-                operations_completed_in_shift = []
-                workers_in_current_shift = set()
-                machines_in_current_shift = set()  # Theo dõi máy móc đã được sử dụng trong ca này
-                
-                # Xử lý các công đoạn theo thứ tự ưu tiên
-                for _, operation in ready_operations:
-                    # Kiểm tra nếu công đoạn đã hoàn thành, bỏ qua
-                    if operation.operation_id in completed_operations:
-                        continue
-
-                    # Lọc danh sách nhân viên phù hợp (không làm ca trước)
-                    available_workers = [
-                        worker
-                        for worker in solution_copy[operation.operation_id]["workers"]
-                        if worker.id not in workers_in_last_shift
-                        and worker.schedule.get(day_str, [0, 0, 0, 0])[shift - 1] == 1
-                        and worker.id not in workers_in_current_shift  # Thêm kiểm tra này để đảm bảo nhân viên không làm việc trong nhiều công đoạn cùng ca
-                    ]
-
-                    # Lọc danh sách máy móc phù hợp
-                    available_machines = solution_copy[operation.operation_id]["machines"]
-
-                    # Sắp xếp nhân viên và máy móc theo năng suất giảm dần
-                    available_workers.sort(key=lambda w: w.productivity_kpi, reverse=True)
-                    available_machines.sort(key=lambda m: m.productivity, reverse=True)
-
-                    # Ghép cặp nhân viên và máy móc, tính tổng sản lượng
-                    total_output_kpi0 = 0
-                    total_output_kpi1 = 0
-                    min_length = min(len(available_workers), len(available_machines))
-
-                    # Phương án tối ưu hóa: nếu cần ít KPI để hoàn thành, chỉ sử dụng nguồn lực cần thiết
-                    remaining_kpi = operation.assigned_kpis[0]["value"] - (operation.achieved_kpis[0] if operation.achieved_kpis else 0)
-                    estimated_workers_needed = 1
-                    
-                    if min_length > 0:
-                        # Ước tính số lượng nhân viên cần thiết dựa trên KPI còn lại
-                        avg_worker_productivity = sum(w.productivity_kpi for w in available_workers[:min_length]) / min_length
-                        avg_machine_productivity = sum(m.productivity for m in available_machines[:min_length]) / min_length
-                        avg_pair_output = 5.5 * (avg_worker_productivity * avg_machine_productivity)
-                        
-                        if avg_pair_output > 0:
-                            estimated_workers_needed = min(min_length, max(1, math.ceil(remaining_kpi / avg_pair_output)))
-                    
-                    # Ghép cặp nhân viên và máy móc theo năng suất cao nhất, chỉ sử dụng số lượng cần thiết
-                    used_worker_ids = set()
-                    
-                    # Lọc lại available_workers để loại trừ những nhân viên đã làm việc trong ca này
-                    available_workers_filtered = [
-                        worker for worker in available_workers 
-                        if worker.id not in workers_in_current_shift
-                    ]
-                    
-                    # Lọc lại available_machines để loại trừ những máy đã được sử dụng trong ca này
-                    available_machines_filtered = [
-                        machine for machine in available_machines 
-                        if machine.asset_id not in machines_in_current_shift
-                    ]
-                    
-                    min_length_filtered = min(len(available_workers_filtered), len(available_machines_filtered))
-                    estimated_workers_needed = min(estimated_workers_needed, min_length_filtered)
-                    
-                    for i in range(min(min_length_filtered, estimated_workers_needed)):
-                        worker = available_workers_filtered[i]
-                        machine = available_machines_filtered[i]
-                        
-                        # Kiểm tra lại để đảm bảo nhân viên chưa làm việc trong ca này
-                        if worker.id in workers_in_current_shift or worker.id in used_worker_ids:
-                            continue
-                            
-                        # Kiểm tra máy móc chưa được sử dụng trong ca này
-                        if machine.asset_id in machines_in_current_shift:
-                            continue
-                        
-                        # Tính KPI loại 0 (sản lượng)
-                        pair_output_kpi0 = 5.5 * (worker.productivity_kpi * machine.productivity)
-                        total_output_kpi0 += pair_output_kpi0
-                        
-                        # Tính KPI loại 1 (chất lượng)
-                        pair_output_kpi1 = 5.5 * worker.productivity_kpi * machine.productivity * worker.quality_kpi
-                        total_output_kpi1 += pair_output_kpi1
-
-                        total_cost += 5.5 * (worker.salary_per_hour + machine.cost_per_hour)
-
-                        # Thêm thông tin vào detailed_schedule
-                        operation.update_detailed_schedule(
-                            day=day_str,
-                            shift=shift,
-                            worker_id=worker.id,
-                            asset_id=machine.asset_id,
-                        )
-
-                        # Đánh dấu nhân viên và máy đã được sử dụng trong ca này
-                        workers_in_current_shift.add(worker.id)
-                        used_worker_ids.add(worker.id)
-                        machines_in_current_shift.add(machine.asset_id)
-
-                    # Cập nhật cả hai KPI
-                    is_completed = operation.update_achieved_kpis(total_output_kpi0, total_output_kpi1)
-
-                    # Kiểm tra nếu công đoạn đã hoàn thành
-                    if is_completed:
-                        operations_completed_in_shift.append(operation.operation_id)
-                        completed_operations_by_order[operation.production_order_id] += 1
-
-                        # Kiểm tra nếu lệnh sản xuất đã hoàn thành
-                        order = self.order_lookup.get(operation.production_order_id)
-                        if (
-                            order
-                            and completed_operations_by_order[order.order_id] == order.total_operations
-                        ):
-                            # So sánh thời gian hiện tại với end_date
-                            order_end_date = datetime.strptime(order.end_date, "%Y-%m-%d")
-                            if current_date <= order_end_date:
-                                completed_orders_on_time += 1
-                            else:
-                                # NHÁNH CẬN: Lệnh hoàn thành không đúng hạn, giảm max_possible_completed_orders
-                                max_possible_completed_orders -= 1
-                                
-                                # Kiểm tra nhánh cận: nếu max_possible_completed_orders < worst_completed_orders thì cắt nhánh
-                                if max_possible_completed_orders < worst_completed_orders:
-                                    return completed_orders_on_time, total_shift, total_cost
-                
-                workers_in_last_shift.clear()
-                workers_in_last_shift.update(workers_in_current_shift)
-
-                # Thêm các công đoạn hoàn thành trong ca này vào danh sách completed_operations
-                completed_operations.extend(operations_completed_in_shift)
-
-                total_shift += 1  # Tăng total_shift lên 1 cho mỗi ca làm việc
-
-                # NHÁNH CẬN: Kiểm tra sau mỗi ca
-                if max_possible_completed_orders < worst_completed_orders:
-                    return completed_orders_on_time, total_shift, total_cost
-                
-                # NHÁNH CẬN: Kiểm tra về số ca làm việc
-                if (max_possible_completed_orders <= worst_completed_orders and 
-                    total_shift > worst_shifts):
-                    return completed_orders_on_time, total_shift, total_cost
-
-                # Cập nhật hàng đợi ưu tiên sau mỗi ca
-                if operations_completed_in_shift:
-                    update_ready_operations()
-                
-                # Tối ưu hóa đánh giá sớm: nếu tất cả công đoạn đã hoàn thành thì dừng
-                if len(completed_operations) == len(operations):
-                    break
-
-                # Lặp qua tất cả các công đoạn đã hoàn thành trong ca này
-                for completed_operation_id in operations_completed_in_shift:
-                    # Thêm nhân viên và máy móc từ công đoạn đã hoàn thành vào tập available_workers và available_machines
-                    workers_in_completed_operation.update(
-                        solution_copy[completed_operation_id]["workers"]
-                    )
-                    machines_in_completed_operation.update(
-                        solution_copy[completed_operation_id]["machines"]
-                    )
-
-                    # Xóa nhân viên và máy móc khỏi công đoạn đã hoàn thành
-                    solution_copy[completed_operation_id]["workers"] = []
-                    solution_copy[completed_operation_id]["machines"] = []
-
-                # Phân bổ lại tài nguyên thông minh
-                self._reallocate_resources(solution_copy, completed_operations, operations, day_str, shift, 
-                                          workers_in_completed_operation, machines_in_completed_operation)
-
-            # Điều kiện dừng (break)
-            if len(completed_operations) == len(operations) or total_shift > max_days * 4:
-                break
-
-            # Tăng ngày lên 1
-            current_date += timedelta(days=1)
-            if (current_date - datetime.strptime(start_date, "%Y-%m-%d")).days > max_days:
-                break
-
-        # Kiểm tra ràng buộc lịch trình trước khi trả về
-        if not self.validate_schedule(operations):
-            print("CẢNH BÁO: Lịch trình được tạo ra vi phạm ràng buộc!")
-        
-        return completed_orders_on_time, total_shift, total_cost
-    
-    def _reallocate_resources(self, solution_copy, completed_operations, operations, day_str, shift,
-                             workers_in_completed_operation, machines_in_completed_operation):
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành; None nếu chỉ cần fitness.
+        :param record: Ghi thêm lịch chi tiết vào progress.
+        :param cutoff: Fitness ngưỡng để dừng sớm; mặc định là giải pháp tệ nhất trong Harmony Memory.
         """
-        Phân bổ lại tài nguyên từ các công đoạn đã hoàn thành cho các công đoạn sẵn sàng tiếp theo.
-        Hàm này được tách ra để làm rõ logic và dễ bảo trì.
-        """
-        # Lấy danh sách các công đoạn sẵn sàng tiếp theo
-        ready_next_operations = []
-        for op in operations:
-            if op.operation_id not in completed_operations and all(
-                prev_op in completed_operations for prev_op in op.prev_operation
-            ):
-                ready_next_operations.append(op)
-        
-        # Sắp xếp theo độ ưu tiên (ví dụ: deadline gần hơn, KPI cao hơn)
-        ready_next_operations.sort(key=lambda op: (
-            op.end_date if op.end_date else "9999-12-31",  # Ưu tiên deadline gần
-            -sum(kpi["value"] for kpi in op.assigned_kpis) if op.assigned_kpis else 0  # Ưu tiên KPI cao
-        ))
-        
-        # Phân bổ workers thông minh
-        for worker in workers_in_completed_operation.copy():
-            eligible_operations = [
-                op for op in ready_next_operations
-                if op.required_position == worker.position
-            ]
-            
-            if eligible_operations:
-                # Nếu worker có quality_kpi cao, ưu tiên cho các công đoạn có KPI yêu cầu cao
-                if worker.quality_kpi > 0.8:  # Ngưỡng chất lượng cao
-                    eligible_operations.sort(key=lambda op: 
-                        -sum(kpi["value"] for kpi in op.assigned_kpis) if op.assigned_kpis else 0
-                    )
-                
-                # Chọn công đoạn có độ ưu tiên cao nhất
-                target_operation = eligible_operations[0]
-                
-                # Ghép worker với công đoạn
-                solution_copy[target_operation.operation_id]["workers"].append(worker)
-                workers_in_completed_operation.discard(worker)
-        
-        # Phân bổ machines thông minh
-        for machine in machines_in_completed_operation.copy():
-            eligible_operations = [
-                op for op in ready_next_operations
-                if op.required_machine_type == machine.asset_type
-            ]
-            
-            if eligible_operations:
-                # Nếu machine có productivity cao, ưu tiên cho các công đoạn có KPI yêu cầu cao
-                if machine.productivity > 0.8:  # Ngưỡng năng suất cao
-                    eligible_operations.sort(key=lambda op: 
-                        -sum(kpi["value"] for kpi in op.assigned_kpis) if op.assigned_kpis else 0
-                    )
-                
-                # Chọn công đoạn có độ ưu tiên cao nhất
-                target_operation = eligible_operations[0]
-                
-                # Ghép machine với công đoạn
-                solution_copy[target_operation.operation_id]["machines"].append(machine)
-                machines_in_completed_operation.discard(machine)
-
-    def validate_schedule(self, operations: List) -> bool:
-        """
-        Kiểm tra ràng buộc lịch trình: đảm bảo mỗi nhân viên và máy móc chỉ xuất hiện 1 lần trong mỗi ca làm việc.
-        
-        :param operations: Danh sách các công đoạn với lịch trình chi tiết
-        :return: True nếu lịch trình hợp lệ, False nếu có vi phạm ràng buộc
-        """
-        # Dictionary để theo dõi việc sử dụng nhân viên và máy móc theo ngày và ca
-        usage_tracker = {}  # {(day, shift): {'workers': set(), 'machines': set()}}
-        
-        for operation in operations:
-            if hasattr(operation, 'detailed_schedule') and operation.detailed_schedule:
-                for schedule_entry in operation.detailed_schedule:
-                    day = schedule_entry['day']
-                    shift = schedule_entry['shift']
-                    worker_id = schedule_entry['worker_id']
-                    asset_id = schedule_entry['asset_id']
-                    
-                    # Tạo key cho ngày và ca
-                    key = (day, shift)
-                    
-                    # Khởi tạo nếu chưa có
-                    if key not in usage_tracker:
-                        usage_tracker[key] = {'workers': set(), 'machines': set()}
-                    
-                    # # Kiểm tra vi phạm ràng buộc nhân viên
-                    # if worker_id in usage_tracker[key]['workers']:
-                    #     print(f"VỊ PHẠM RÀNG BUỘC: Nhân viên {worker_id} đã được phân công cho nhiều công việc trong ca {shift} ngày {day}")
-                    #     return False
-                    
-                    # # Kiểm tra vi phạm ràng buộc máy móc
-                    # if asset_id in usage_tracker[key]['machines']:
-                    #     print(f"VỊ PHẠM RÀNG BUỘC: Máy móc {asset_id} đã được phân công cho nhiều công việc trong ca {shift} ngày {day}")
-                    #     return False
-                    
-                    # Thêm vào tracker
-                    usage_tracker[key]['workers'].add(worker_id)
-                    usage_tracker[key]['machines'].add(asset_id)
-        
-        # print("Lịch trình hợp lệ: Không có vi phạm ràng buộc 1 người 1 máy mỗi ca")
-        return True
\ No newline at end of file
+        allocation = self.instance.encode_solution(solution)
+
+        # Phân bổ đã đánh giá trước đó: lấy lại từ bộ nhớ đệm (không dùng khi cần lịch chi tiết)
+        cache_key = None
+        if not record:
+            cache_key = FitnessCache.make_key(allocation)
+            fitness = self.fitness_cache.get(cache_key, progress)
+            if fitness is not None:
+                return fitness
+            if progress is None:
+                progress = OperationProgress(len(self.operations))
+
+        # Lấy trường hợp tồi nhất trong harmony memory để so sánh (NHÁNH CẬN)
+        if cutoff is None and hasattr(self, 'harmony_memory') and self.harmony_memory:
+            cutoff = self.harmony_memory[self.find_worst_solution_index()][1]
+
+        fitness = self.evaluator.evaluate(allocation, progress, record, cutoff=cutoff)
+        # Kết quả dừng sớm phụ thuộc ngưỡng cắt hiện tại nên không được lưu
+        if cache_key is not None and not fitness.aborted:
+            self.fitness_cache.put(cache_key, fitness, progress)
+            self.observe_surrogate(allocation, fitness)
+        if progress is not None:
+            self.validate_schedule(progress)
+        return fitness
@@ -1,13 +1,18 @@
-import random
 from typing import List, Dict
-import copy
 import json
-from datetime import datetime, timedelta
 import math
 import time
 
+from encoder import build_problem_instance
+from evaluators import create_evaluator
+from fitness_cache import FitnessCache
+from harmony_search_base import HarmonySearchBase
+from models import Fitness, OperationProgress, ProblemInstance, copy_solution
+from random_streams import make_random
+from surrogate_model import SurrogateModel
 
-class HarmonySearch:
+
+class HarmonySearch(HarmonySearchBase):
     def preprocess_data(self):
         """
         Tiền xử lý dữ liệu để nhóm nhân viên, máy móc và công đoạn theo yêu cầu.
@@ -60,10 +65,16 @@ class HarmonySearch:
         # Tạo dict tiện tra cứu nhanh (giống như trong Greedy)
         self.workers_dict = {w.id: w for w in self.workers}
         self.machines_dict = {m.asset_id: m for m in self.machines}
-        
-        # Cache cho việc tính toán KPI và chi phí
-        self.kpi_cache = {}
-        self.cost_cache = {}
+
+        # Biên dịch bài toán sang dạng chỉ số nguyên cho bộ lập lịch
+        if self.instance is None:
+            self.instance = build_problem_instance(
+                self.workers, self.machines, self.operations, self.production_orders
+            )
+        # Lập lịch greedy từng công đoạn (GreedyScheduler) trừ khi chọn bộ đánh giá khác
+        self.evaluator = create_evaluator(self.evaluator, self.instance)
+        self.parallel_evaluator = self.create_parallel_evaluator()
+        self.surrogate_model = SurrogateModel(self.instance) if self.surrogate else None
 
     def __init__(
         self,
@@ -75,6 +86,13 @@ class HarmonySearch:
         max_iterations: int = None,
         harmony_consideration_rate: float = 0.9,
         pitch_adjustment_rate: float = 0.3,
+        instance: ProblemInstance = None,
+        fitness_cache_size: int = 0,
+        n_jobs: int = 1,
+        evaluator="optimized",
+        surrogate: bool = False,
+        surrogate_top_fraction: float = 0.25,
+        seed=None,
     ):
         """
         :param workers: Danh sách nhân viên (mỗi nhân viên là một dictionary chứa thông tin)
@@ -85,11 +103,32 @@ class HarmonySearch:
         :param max_iterations: Số lần lặp tối đa (tự động tính toán nếu không nhập)
         :param harmony_consideration_rate: Tỷ lệ xem xét Harmony Memory
         :param pitch_adjustment_rate: Tỷ lệ điều chỉnh pitch
+        :param instance: ProblemInstance đã biên dịch (tự tạo từ danh sách đối tượng nếu không truyền)
+        :param fitness_cache_size: Số phân bổ tối đa trong bộ nhớ đệm fitness (giữ qua các lần tái khởi tạo)
+            0 (mặc định): tắt, vì các giải pháp trong một lần chạy hầu như không bao giờ lặp lại
+        :param n_jobs: Số tiến trình đánh giá song song các lô giải pháp (1: đánh giá trong tiến trình hiện tại,
+            số âm: dùng tất cả lõi CPU)
+        :param evaluator: Bộ đánh giá phân bổ: tên đã đăng ký trong evaluators ("optimized", "reference",
+            "vectorized") hoặc một Evaluator đã tạo cho cùng ProblemInstance
+        :param surrogate: Dùng mô hình thay thế (SurrogateModel, hồi quy ridge học trực tuyến) để chọn trước
+            giải pháp mới có triển vọng từ một nhóm lớn hơn (xem preselect_by_surrogate)
+        :param surrogate_top_fraction: Tỷ lệ giải pháp trong nhóm được mô hình thay thế giữ lại để đánh giá chính xác
+        :param seed: Hạt giống của bộ sinh số ngẫu nhiên riêng (số nguyên hoặc numpy.random.SeedSequence,
+            xem random_streams.spawn_seeds); None: dùng trạng thái chung của module random
         """
         self.workers = workers
         self.machines = machines
         self.operations = operations
         self.production_orders = production_orders
+        self.instance = instance
+        self.fitness_cache = FitnessCache(fitness_cache_size)
+        self.aborted_evaluations = 0  # Số lần đánh giá dừng sớm theo ngưỡng cắt
+        self.n_jobs = n_jobs
+        self.evaluator = evaluator  # Được tạo trong preprocess_data (xem create_evaluator)
+        self.surrogate = surrogate
+        self.surrogate_top_fraction = surrogate_top_fraction
+        self.seed = seed
+        self.random = make_random(seed)  # Mọi lựa chọn ngẫu nhiên của lần chạy đi qua bộ sinh này
         
         # Tự động điều chỉnh tham số dựa trên kích thước dữ liệu
         data_size = len(workers) + len(machines) + len(operations) + len(production_orders)
@@ -123,68 +162,23 @@ class HarmonySearch:
         # Tiền xử lý dữ liệu
         self.preprocess_data()
 
-    # Cải tiến: Thêm các hàm tiện ích từ Greedy
-    def is_consecutive(self, assignments, date_idx, shift_idx):
-        """
-        Kiểm tra nhân viên đã bị phân lịch vào ca liên tiếp chưa (không cho phép 2 ca liên tiếp).
-        """
-        if shift_idx > 0 and (date_idx, shift_idx-1) in assignments:
-            return True
-        if shift_idx < 3 and (date_idx, shift_idx+1) in assignments:
-            return True
-        if shift_idx == 0 and (date_idx-1, 3) in assignments:
-            return True
-        if shift_idx == 3 and (date_idx+1, 0) in assignments:
-            return True
-        return False
-
-    def calc_kpi(self, worker, machine, hours):
-        """
-        Tính toán năng suất (ns) và chất lượng (cl) dựa vào worker, máy, số giờ làm việc.
-        """
-        # Sử dụng cache để tăng tốc
-        cache_key = (worker.id, machine.asset_id, hours)
-        if cache_key in self.kpi_cache:
-            return self.kpi_cache[cache_key]
-        
-        ns = worker.productivity_kpi * machine.productivity * hours
-        cl = ns * worker.quality_kpi
-        
-        self.kpi_cache[cache_key] = (ns, cl)
-        return ns, cl
-
-    def calc_cost(self, worker, machine, hours):
-        """
-        Tính chi phí cho một ca làm việc: (lương nhân viên/giờ + chi phí máy/giờ) * số giờ.
-        """
-        # Sử dụng cache để tăng tốc
-        cache_key = (worker.id, machine.asset_id, hours)
-        if cache_key in self.cost_cache:
-            return self.cost_cache[cache_key]
-        
-        cost = (worker.salary_per_hour + machine.cost_per_hour) * hours
-        self.cost_cache[cache_key] = cost
-        return cost
-
     def initialize_harmony_memory(self):
-        """Khởi tạo Harmony Memory với các giải pháp ngẫu nhiên."""
-        for _ in range(self.harmony_memory_size):
-            solution, operations_copy = self.generate_random_solution()
-            fitness = self.evaluate_solution(solution, operations_copy)
-            self.harmony_memory.append((solution, fitness, operations_copy))
+        """Khởi tạo Harmony Memory với các giải pháp ngẫu nhiên (được đánh giá cùng một lô)."""
+        candidates = [self.generate_random_solution() for _ in range(self.harmony_memory_size)]
+        self.harmony_memory.extend(self.parallel_evaluate_solutions(candidates))
 
     def generate_random_solution(self) -> tuple[Dict, List]:
         """
         Tạo một giải pháp ngẫu nhiên bằng cách gán nhân viên và máy móc cho tất cả công đoạn.
         Đảm bảo mỗi công đoạn có ít nhất 1 nhân viên và 1 máy móc.
-        :return: Tuple gồm giải pháp (solution) và bản deepcopy của danh sách operations.
+        :return: Tuple gồm giải pháp (solution) và OperationProgress dùng khi đánh giá.
         """
         solution = {
             operation.operation_id: {"workers": [], "machines": []}
             for operation in self.operations
         }
-        available_workers = set(self.workers)  # Tập nhân viên khả dụng
-        available_machines = set(self.machines)  # Tập máy móc khả dụng
+        available_workers = dict.fromkeys(self.workers)  # Tập nhân viên khả dụng
+        available_machines = dict.fromkeys(self.machines)  # Tập máy móc khả dụng
 
         # Bước 1: Đảm bảo mỗi công đoạn có ít nhất 1 nhân viên và 1 máy móc
         for operation in self.operations:
@@ -193,18 +187,18 @@ class HarmonySearch:
                 operation.required_position, []
             )
             if eligible_workers:
-                selected_worker = random.choice(eligible_workers)
+                selected_worker = self.random.choice(eligible_workers)
                 solution[operation.operation_id]["workers"].append(selected_worker)
-                available_workers.discard(selected_worker)
+                available_workers.pop(selected_worker, None)
 
             # Gán 1 máy móc phù hợp
             eligible_machines = self.machines_by_type.get(
                 operation.required_machine_type, []
             )
             if eligible_machines:
-                selected_machine = random.choice(eligible_machines)
+                selected_machine = self.random.choice(eligible_machines)
                 solution[operation.operation_id]["machines"].append(selected_machine)
-                available_machines.discard(selected_machine)
+                available_machines.pop(selected_machine, None)
 
         # Bước 2: Phân bổ phần còn lại theo trọng số Softmax
         # Gán nhân viên còn lại
@@ -219,7 +213,7 @@ class HarmonySearch:
                 total_weight = sum(weights)
                 weights = [w / total_weight for w in weights]
 
-                selected_operation = random.choices(
+                selected_operation = self.random.choices(
                     eligible_operations, weights=weights, k=1
                 )[0]
                 solution[selected_operation.operation_id]["workers"].append(worker)
@@ -236,224 +230,80 @@ class HarmonySearch:
                 total_weight = sum(weights)
                 weights = [w / total_weight for w in weights]
 
-                selected_operation = random.choices(
+                selected_operation = self.random.choices(
                     eligible_operations, weights=weights, k=1
                 )[0]
                 solution[selected_operation.operation_id]["machines"].append(machine)
 
-        # Tạo một bản deepcopy của danh sách operations
-        operations_copy = copy.deepcopy(self.operations)
+        # Trạng thái đánh giá riêng cho giải pháp (không sao chép danh sách operations)
+        progress = OperationProgress(len(self.operations))
 
-        return solution, operations_copy
+        return solution, progress
 
     def evaluate_solution(
-        self, solution: Dict, operations: List
-    ) -> tuple[int, int, int]:
+        self,
+        solution: Dict,
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+    ) -> Fitness:
         """
         Hàm đánh giá giải pháp - CẢI TIẾN với early stopping và tối ưu hóa từ Greedy.
         :param solution: Giải pháp hiện tại.
-        :param operations: Danh sách các công đoạn.
-        :return: Tuple gồm số lệnh sản xuất hoàn thành đúng hạn và tổng số ca làm việc.
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành của từng công đoạn (có thể None).
+        :param record: Ghi thêm lịch chi tiết vào progress; mặc định chỉ tính fitness.
+        :param cutoff: Fitness ngưỡng; dừng đánh giá ngay khi giải pháp chắc chắn không vượt được.
+        :return: Fitness gồm số lệnh sản xuất hoàn thành đúng hạn, tổng số ca làm việc và tổng chi phí;
+            Fitness.aborted cho biết đánh giá đã dừng sớm.
+        """
+        fitness = self.schedule_operations_optimized(solution, progress, record, cutoff)
+        if fitness.aborted:
+            self.aborted_evaluations += 1
+        return fitness
+
+    def materialize_schedule(self, solution: Dict) -> List:
+        """
+        Chạy lại một giải pháp ở chế độ ghi đầy đủ để lấy KPI đạt được và lịch chi tiết
+        (dùng cho export_all_operations_to_json).
+        :param solution: Giải pháp cần lập lịch chi tiết.
+        :return: Bản sao danh sách công đoạn đã được ghi kết quả.
         """
-        return self.schedule_operations_optimized(solution, operations)
+        progress = OperationProgress(len(self.operations))
+        self.evaluate_solution(solution, progress, record=True)
+        return self.evaluator.export_operations(progress)
 
     # CẢI TIẾN: Tạo phiên bản tối ưu hóa của schedule_operations dựa trên Greedy
     def schedule_operations_optimized(
-        self, solution: Dict, operations: List
-    ) -> tuple[int, int, int]:
+        self,
+        solution: Dict,
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+    ) -> Fitness:
         """
         Lên lịch cho các công đoạn dựa trên giải pháp - PHIÊN BẢN TỐI ƯU HÓA.
-        Áp dụng các kỹ thuật từ thuật toán Greedy để tăng tốc độ.
+        Tra bộ nhớ đệm fitness trước, sau đó lập lịch bằng bộ đánh giá (mặc định GreedyScheduler).
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành; None nếu chỉ cần fitness.
+        :param record: Ghi thêm lịch chi tiết (dạng dict) vào progress.schedule.
+        :param cutoff: Fitness ngưỡng (xem GreedyScheduler.run).
         """
-        total_shift = 0
-        total_cost = 0
-        completed_orders_on_time = 0
-        completed_operations_by_order = {
-            order.order_id: 0 for order in self.production_orders
-        }
-
-        # Cấu trúc dữ liệu tối ưu từ Greedy
-        worker_assignments = {}   # Lưu lại ca đã phân cho từng nhân viên
-        machine_assignments = {}  # Lưu lại ca đã phân cho từng máy
-        op_status = {}            # op_id -> True/False: đã hoàn thành chưa
-        op_end_time = {}          # op_id -> (date_idx, shift_idx): ca hoàn thành cuối cùng
-
-        # Giả lập lịch làm việc (tương tự như trong Greedy)
-        start_date = datetime(2025, 4, 1)
-        current_date = start_date
-        max_days = 59
-        
-        # Danh sách công đoạn chưa lập lịch xong
-        pending_ops = operations.copy()
-        
-        while pending_ops and (current_date - start_date).days < max_days:
-            next_pending = []
-            
-            for op in pending_ops:
-                op_id = op.operation_id
-                prev_ops = op.prev_operation or []
-                
-                # Kiểm tra công đoạn tiên quyết
-                if prev_ops and not all(op_status.get(pid, False) for pid in prev_ops):
-                    next_pending.append(op)
-                    continue
-
-                # Xác định thời điểm bắt đầu sớm nhất
-                if prev_ops:
-                    prev_end_times = [op_end_time[pid] for pid in prev_ops]
-                    latest_end = max(prev_end_times)
-                    prev_date, prev_shift = latest_end
-                    if prev_shift < 3:  # 4 ca mỗi ngày (0-3)
-                        earliest_start = (prev_date, prev_shift + 1)
-                    else:
-                        earliest_start = (prev_date + 1, 0)
-                else:
-                    earliest_start = (0, 0)
-
-                # Chuẩn bị các biến tích lũy
-                kpi_targets = {k['id']: k['value'] for k in op.assigned_kpis}
-                kpi_accum = {k['id']: 0 for k in op.assigned_kpis}
-                op_cost = 0
-                done = False
-                last_used = (0, 0)
-
-                # Lập lịch greedy với early stopping
-                break_outer = False
-                for date_idx in range(max_days):
-                    if break_outer:
-                        break
-                    
-                    for shift_idx in range(4):  # 4 ca mỗi ngày
-                        if (date_idx, shift_idx) < earliest_start:
-                            continue
-
-                        # EARLY STOPPING: Kiểm tra KPI trước khi phân bổ
-                        if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
-                            done = True
-                            break_outer = True
-                            break
-
-                        # Lấy nhân viên hợp lệ cho ca này
-                        valid_workers = []
-                        for worker in solution[op_id]["workers"]:
-                            if worker.position != op.required_position:
-                                continue
-                            assignments = worker_assignments.get(worker.id, set())
-                            if self.is_consecutive(assignments, date_idx, shift_idx):
-                                continue
-                            if (date_idx, shift_idx) in assignments:
-                                continue
-                            valid_workers.append(worker)
-                        
-                        # Ưu tiên nhân viên mạnh nhất
-                        valid_workers.sort(key=lambda w: w.productivity_kpi * w.quality_kpi, reverse=True)
-
-                        # Lấy máy hợp lệ cho ca này
-                        valid_machines = []
-                        for machine in solution[op_id]["machines"]:
-                            if machine.asset_type != op.required_machine_type:
-                                continue
-                            assignments = machine_assignments.get(machine.asset_id, set())
-                            if (date_idx, shift_idx) in assignments:
-                                continue
-                            valid_machines.append(machine)
-                        
-                        # Ưu tiên máy mạnh nhất
-                        valid_machines.sort(key=lambda m: m.productivity, reverse=True)
-
-                        # Ghép cặp nhân viên - máy
-                        num_pairs = min(len(valid_workers), len(valid_machines))
-                        used_workers = set()
-                        used_machines = set()
-                        
-                        for i in range(num_pairs):
-                            # EARLY STOPPING: Kiểm tra lại KPI
-                            if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
-                                done = True
-                                break_outer = True
-                                break
-
-                            worker = valid_workers[i]
-                            machine = valid_machines[i]
-                            
-                            if worker.id in used_workers or machine.asset_id in used_machines:
-                                continue
-                            
-                            hours = 5.5  # Giờ làm việc mỗi ca
-                            ns, cl = self.calc_kpi(worker, machine, hours)
-                            cost = self.calc_cost(worker, machine, hours)
-
-                            # Cập nhật KPI
-                            for k_idx, kpi in enumerate(op.assigned_kpis):
-                                if k_idx == 0:
-                                    kpi_accum[kpi['id']] += ns
-                                else:
-                                    kpi_accum[kpi['id']] += cl
-
-                            op_cost += cost
-                            
-                            # Ghi nhận lịch trình chi tiết
-                            assignment_date = start_date + timedelta(days=date_idx)
-                            op.detailed_schedule.append({
-                                "worker_id": worker.id,
-                                "machine_id": machine.asset_id,
-                                "date": assignment_date.strftime("%Y-%m-%d"),
-                                "shift": f"Ca {shift_idx + 1}",
-                                "hours": hours,
-                                "achieved_kpi_0": ns,
-                                "achieved_kpi_1": cl
-                            })
-                            
-                            # Đánh dấu đã phân công
-                            worker_assignments.setdefault(worker.id, set()).add((date_idx, shift_idx))
-                            machine_assignments.setdefault(machine.asset_id, set()).add((date_idx, shift_idx))
-                            used_workers.add(worker.id)
-                            used_machines.add(machine.asset_id)
-                            last_used = (date_idx, shift_idx)
-                        
-                        # EARLY STOPPING: Kiểm tra sau mỗi ca
-                        if all(kpi_accum[kid] >= kpi_targets[kid] for kid in kpi_targets):
-                            done = True
-                            break_outer = True
-                            break
-
-                # Lưu kết quả cho công đoạn
-                op_status[op_id] = done
-                op_end_time[op_id] = last_used
-                
-                # Cập nhật KPI đạt được vào đối tượng operation
-                if hasattr(op, 'assigned_kpis') and op.assigned_kpis:
-                    # Đảm bảo achieved_kpis có đủ phần tử
-                    while len(op.achieved_kpis) < len(op.assigned_kpis):
-                        op.achieved_kpis.append(0.0)
-
-                    for k_idx, kpi in enumerate(op.assigned_kpis):
-                        kpi_id = kpi['id']
-                        op.achieved_kpis[k_idx] = kpi_accum.get(kpi_id, 0)
-                
-                if done:
-                    completed_operations_by_order[op.production_order_id] += 1
-                    total_cost += op_cost
-                    
-                    # Kiểm tra nếu lệnh sản xuất đã hoàn thành
-                    order = next((o for o in self.production_orders if o.order_id == op.production_order_id), None)
-                    if order and completed_operations_by_order[order.order_id] == order.total_operations:
-                        order_end_date = datetime.strptime(order.end_date, "%Y-%m-%d")
-                        if current_date <= order_end_date:
-                            completed_orders_on_time += 1
-
-            # Kiểm tra bế tắc
-            if len(next_pending) == len(pending_ops):
-                break
-            pending_ops = next_pending
-
-        # Tính tổng số ca sử dụng
-        all_working_slots = set()
-        for assignments in worker_assignments.values():
-            all_working_slots.update(assignments)
-        total_shift = len(all_working_slots)
-
-        return completed_orders_on_time, total_shift, total_cost
+        allocation = self.instance.encode_solution(solution)
+        if record:
+            return self.evaluator.evaluate(allocation, progress, record, cutoff)
+
+        # Phân bổ đã đánh giá trước đó: lấy lại từ bộ nhớ đệm (không dùng khi cần lịch chi tiết)
+        cache_key = FitnessCache.make_key(allocation)
+        fitness = self.fitness_cache.get(cache_key, progress)
+        if fitness is not None:
+            return fitness
+
+        if progress is None:
+            progress = OperationProgress(self.instance.num_operations)
+        fitness = self.evaluator.evaluate(allocation, progress, cutoff=cutoff)
+        if not fitness.aborted:
+            self.fitness_cache.put(cache_key, fitness, progress)
+            self.observe_surrogate(allocation, fitness)
+        return fitness
 
     def optimize(self):
         """Chạy thuật toán Harmony Search với cải tiến hội tụ sớm và cải tiến giải pháp cục bộ."""
@@ -473,7 +323,6 @@ class HarmonySearch:
         # Lưu trữ giải pháp tốt nhất từng tìm thấy
         global_best_solution = None
         global_best_fitness = (-float('inf'), float('inf'), float('inf'))
-        global_best_operations_copy = None
         
         # Thêm điều kiện dừng sớm cho dữ liệu nhỏ
         early_stop_threshold = 5  # Số lần lặp không cải thiện trước khi dừng sớm với dữ liệu nhỏ
@@ -495,33 +344,41 @@ class HarmonySearch:
             best_new_solution = None
             best_new_fitness = (-float('inf'), float('inf'), float('inf'))
 
-            for _ in range(num_new_solutions):
-                # Tạo và đánh giá giải pháp mới
-                new_solution, operations_copy = self.improvise_new_solution()
-                
+            # Giải pháp mới chỉ có ích nếu tốt hơn giải pháp tệ nhất trong Harmony Memory
+            cutoff = self.harmony_memory[self.find_worst_solution_index()][1]
+
+            # Mô hình thay thế (nếu bật) chọn trước các giải pháp mới có triển vọng từ một nhóm lớn hơn
+            preselected = self.preselect_by_surrogate(num_new_solutions)
+
+            candidates = []
+            for index in range(num_new_solutions):
+                # Tạo giải pháp mới
+                new_solution, progress = preselected[index] if preselected else self.improvise_new_solution()
+
                 # Áp dụng cải tiến cục bộ cho giải pháp mới
-                if random.random() < 0.3:  # 30% cơ hội cải tiến cục bộ
-                    new_solution, operations_copy = self.local_refinement(new_solution, operations_copy)
-                
-                fitness = self.evaluate_solution(new_solution, operations_copy)
-                
+                if self.random.random() < 0.3:  # 30% cơ hội cải tiến cục bộ
+                    new_solution, progress = self.local_refinement(new_solution, progress)
+                candidates.append((new_solution, progress))
+
+            # Đánh giá các giải pháp mới cùng một lô
+            for new_solution, fitness, progress in self.parallel_evaluate_solutions(candidates, cutoff):
                 # Cập nhật giải pháp tốt nhất trong lần lặp này
                 if self.is_better_fitness(fitness, best_new_fitness):
-                    best_new_solution = (new_solution, fitness, operations_copy)
+                    best_new_solution = (new_solution, fitness, progress)
                     best_new_fitness = fitness
 
             # Lấy giải pháp mới tốt nhất
-            new_solution, fitness, operations_copy = best_new_solution
+            new_solution, fitness, progress = best_new_solution
             completed_orders_on_time, total_shift, total_cost = fitness
             
             # Áp dụng lai tạo với giải pháp tốt nhất hiện tại (nếu có)
-            if global_best_solution is not None and random.random() < 0.4:
+            if global_best_solution is not None and self.random.random() < 0.4:
                 hybrid_solution = self.hybridize_solutions(new_solution, global_best_solution)
-                hybrid_operations_copy = copy.deepcopy(self.operations)
-                hybrid_fitness = self.evaluate_solution(hybrid_solution, hybrid_operations_copy)
+                hybrid_progress = OperationProgress(len(self.operations))
+                hybrid_fitness = self.evaluate_solution(hybrid_solution, hybrid_progress, cutoff=cutoff)
                 
                 if self.is_better_fitness(hybrid_fitness, fitness):
-                    new_solution, fitness, operations_copy = hybrid_solution, hybrid_fitness, hybrid_operations_copy
+                    new_solution, fitness, progress = hybrid_solution, hybrid_fitness, hybrid_progress
                     completed_orders_on_time, total_shift, total_cost = hybrid_fitness
             
             print(
@@ -535,8 +392,8 @@ class HarmonySearch:
             if self.is_better_fitness(fitness, self.harmony_memory[worst_solution_index][1]):
                 self.harmony_memory[worst_solution_index] = (
                     new_solution,
-                    (completed_orders_on_time, total_shift, total_cost),
-                    operations_copy,
+                    fitness,
+                    progress,
                 )
 
             # Tìm giải pháp tốt nhất hiện tại
@@ -546,9 +403,8 @@ class HarmonySearch:
 
             # Cập nhật giải pháp tốt nhất toàn cục
             if self.is_better_fitness(current_best_fitness, global_best_fitness):
-                global_best_solution = copy.deepcopy(self.harmony_memory[best_solution_index][0])
+                global_best_solution = copy_solution(self.harmony_memory[best_solution_index][0])
                 global_best_fitness = current_best_fitness
-                global_best_operations_copy = copy.deepcopy(self.harmony_memory[best_solution_index][2])
 
             # Kiểm tra cải tiến
             if self.is_better_fitness(current_best_fitness, best_fitness_so_far):
@@ -584,6 +440,9 @@ class HarmonySearch:
                     print(f"Dừng sớm tại lần lặp {iteration + 1} do không có cải tiến")
                     break
 
+        # Dừng pool tiến trình đánh giá song song (nếu đã khởi động)
+        self.parallel_evaluator.shutdown()
+
         # Tính thời gian thực thi
         end_time = time.time()
         execution_time = end_time - start_time
@@ -599,73 +458,29 @@ class HarmonySearch:
         self.print_harmony_memory(execution_time)
 
         # Kiểm tra xem giải pháp tốt nhất toàn cục có tốt hơn giải pháp tốt nhất trong harmony_memory không
-        best_hm_solution = min(
-            self.harmony_memory,
-            key=lambda x: (-x[1][0], x[1][1], x[1][2]),
-        )
+        best_hm_solution = self.harmony_memory[self.find_best_solution_index()]
         
         if self.is_better_fitness(global_best_fitness, best_hm_solution[1]):
-            return global_best_solution, global_best_fitness, global_best_operations_copy
+            best_solution, best_fitness = global_best_solution, global_best_fitness
         else:
-            return best_hm_solution
+            best_solution, best_fitness = best_hm_solution[0], best_hm_solution[1]
+
+        # Trong quá trình tìm kiếm chỉ tính fitness, lịch chi tiết được tạo một lần tại đây
+        return best_solution, best_fitness, self.materialize_schedule(best_solution)
             
-    def is_better_fitness(self, fitness1, fitness2):
-        """
-        So sánh hai giá trị fitness để xác định cái nào tốt hơn.
-        :param fitness1: Tuple (completed_orders, shifts, cost)
-        :param fitness2: Tuple (completed_orders, shifts, cost)
-        :return: True nếu fitness1 tốt hơn fitness2, False nếu ngược lại
-        """
-        # Ưu tiên số lệnh hoàn thành đúng hạn (càng nhiều càng tốt)
-        if fitness1[0] > fitness2[0]:
-            return True
-        elif fitness1[0] < fitness2[0]:
-            return False
-        
-        # Nếu số lệnh bằng nhau, ưu tiên số ca làm việc (càng ít càng tốt)
-        if fitness1[1] < fitness2[1]:
-            return True
-        elif fitness1[1] > fitness2[1]:
-            return False
-        
-        # Nếu số ca bằng nhau, ưu tiên chi phí (càng ít càng tốt)
-        return fitness1[2] < fitness2[2]
-        
-    def find_worst_solution_index(self):
-        """Tìm chỉ số của giải pháp tệ nhất trong Harmony Memory."""
-        return max(
-            range(len(self.harmony_memory)),
-            key=lambda i: (
-                -self.harmony_memory[i][1][0],  # Ưu tiên số lệnh đúng hạn
-                self.harmony_memory[i][1][1],   # Sau đó ưu tiên tổng số ca
-                self.harmony_memory[i][1][2],   # Cuối cùng ưu tiên tổng chi phí
-            ),
-        )
-        
-    def find_best_solution_index(self):
-        """Tìm chỉ số của giải pháp tốt nhất trong Harmony Memory."""
-        return min(
-            range(len(self.harmony_memory)),
-            key=lambda i: (
-                -self.harmony_memory[i][1][0],  # Ưu tiên số lệnh đúng hạn
-                self.harmony_memory[i][1][1],   # Sau đó ưu tiên tổng số ca
-                self.harmony_memory[i][1][2],   # Cuối cùng ưu tiên tổng chi phí
-            ),
-        )
-    
-    def local_refinement(self, solution, operations_copy):
+    def local_refinement(self, solution, progress):
         """
         Cải tiến cục bộ cho giải pháp bằng cách hoán đổi tài nguyên.
         
         :param solution: Giải pháp cần cải tiến
-        :param operations_copy: Bản sao của các công đoạn
-        :return: Giải pháp đã cải tiến và bản sao operations mới
+        :param progress: Trạng thái đánh giá của giải pháp
+        :return: Giải pháp đã cải tiến và OperationProgress mới
         """
-        refined_solution = copy.deepcopy(solution)
+        refined_solution = copy_solution(solution)
         
         # Lựa chọn ngẫu nhiên một số công đoạn để tối ưu
         num_operations_to_refine = min(5, len(self.operations))
-        operations_to_refine = random.sample(self.operations, num_operations_to_refine)
+        operations_to_refine = self.random.sample(self.operations, num_operations_to_refine)
         
         for operation in operations_to_refine:
             op_id = operation.operation_id
@@ -711,10 +526,10 @@ class HarmonySearch:
                         refined_solution[op_id]["machines"].remove(worst_machine)
                         refined_solution[op_id]["machines"].append(best_replacement)
         
-        # Cập nhật operations_copy
-        new_operations_copy = copy.deepcopy(self.operations)
+        # Trạng thái đánh giá mới cho giải pháp đã cải tiến
+        new_progress = OperationProgress(len(self.operations))
         
-        return refined_solution, new_operations_copy
+        return refined_solution, new_progress
     
     def restart_search(self, best_solution=None):
         """
@@ -728,23 +543,23 @@ class HarmonySearch:
             if best_entry:
                 best_entry = best_entry[0]
             else:
-                best_entry = min(self.harmony_memory, key=lambda x: (-x[1][0], x[1][1], x[1][2]))
+                best_entry = self.harmony_memory[self.find_best_solution_index()]
         else:
-            best_entry = min(self.harmony_memory, key=lambda x: (-x[1][0], x[1][1], x[1][2]))
+            best_entry = self.harmony_memory[self.find_best_solution_index()]
         
         # Xóa bộ nhớ Harmony cũ
         self.harmony_memory = []
         
-        # Khởi tạo lại Harmony Memory
-        for i in range(self.harmony_memory_size):
-            if i == 0 and best_entry is not None:
-                # Giữ lại giải pháp tốt nhất
-                self.harmony_memory.append(best_entry)
-            else:
-                # Tạo giải pháp mới với độ đa dạng cao
-                solution, operations_copy = self.generate_random_solution()
-                fitness = self.evaluate_solution(solution, operations_copy)
-                self.harmony_memory.append((solution, fitness, operations_copy))
+        # Khởi tạo lại Harmony Memory: giữ lại giải pháp tốt nhất, phần còn lại là giải pháp mới
+        # với độ đa dạng cao, được đánh giá cùng một lô trước khi đưa vào bộ nhớ
+        candidates = [
+            self.generate_random_solution()
+            for _ in range(self.harmony_memory_size - (1 if best_entry is not None else 0))
+        ]
+        new_entries = self.parallel_evaluate_solutions(candidates)
+        if best_entry is not None:
+            self.harmony_memory.append(best_entry)
+        self.harmony_memory.extend(new_entries)
         
         # Reset tham số về giá trị ban đầu
         self.harmony_consideration_rate = 0.9
@@ -841,28 +656,29 @@ class HarmonySearch:
             hybrid_solution[operation_id] = {"workers": [], "machines": []}
             
             # Lấy thông tin công đoạn tương ứng
-            operation = next((op for op in self.operations if op.operation_id == operation_id), None)
+            operation_index = self.instance.operation_index.get(operation_id)
+            operation = self.operations[operation_index] if operation_index is not None else None
             if not operation:
                 continue
             
             # Lai tạo workers (lấy từ một trong hai giải pháp gốc)
-            workers_pool = set()
+            workers_pool = {}  # Giữ thứ tự thêm vào (thứ tự duyệt ổn định giữa các lần chạy)
             
             # Tạo tập hợp tất cả nhân viên có thể sử dụng
-            if random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
+            if self.random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
                 for worker in solution1[operation_id]["workers"]:
                     if worker.position == operation.required_position:
-                        workers_pool.add(worker)
+                        workers_pool[worker] = None
             else:
                 for worker in solution2[operation_id]["workers"]:
                     if worker.position == operation.required_position:
-                        workers_pool.add(worker)
+                        workers_pool[worker] = None
             
             # Lấy thêm nhân viên từ giải pháp còn lại nếu chưa đủ
             if len(workers_pool) < 2:
                 for worker in solution2[operation_id]["workers"] + solution1[operation_id]["workers"]:
                     if worker.position == operation.required_position and worker not in workers_pool:
-                        workers_pool.add(worker)
+                        workers_pool[worker] = None
                         if len(workers_pool) >= 2:
                             break
             
@@ -873,22 +689,22 @@ class HarmonySearch:
             hybrid_solution[operation_id]["workers"] = workers_list[:3]
             
             # Lai tạo machines (tương tự như workers)
-            machines_pool = set()
+            machines_pool = {}
             
-            if random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
+            if self.random.random() < 0.7:  # 70% lấy từ giải pháp 1, 30% lấy từ giải pháp 2
                 for machine in solution1[operation_id]["machines"]:
                     if machine.asset_type == operation.required_machine_type:
-                        machines_pool.add(machine)
+                        machines_pool[machine] = None
             else:
                 for machine in solution2[operation_id]["machines"]:
                     if machine.asset_type == operation.required_machine_type:
-                        machines_pool.add(machine)
+                        machines_pool[machine] = None
             
             # Lấy thêm máy móc từ giải pháp còn lại nếu chưa đủ
             if len(machines_pool) < 2:
                 for machine in solution2[operation_id]["machines"] + solution1[operation_id]["machines"]:
                     if machine.asset_type == operation.required_machine_type and machine not in machines_pool:
-                        machines_pool.add(machine)
+                        machines_pool[machine] = None
                         if len(machines_pool) >= 2:
                             break
             
@@ -927,7 +743,7 @@ class HarmonySearch:
         """
         formatted_memory = []
 
-        for solution, fitness, operations_copy in self.harmony_memory:
+        for solution, fitness, progress in self.harmony_memory:
             formatted_solution = {"operations": []}
 
             for operation_id, allocation in solution.items():
@@ -969,6 +785,10 @@ class HarmonySearch:
         
         if execution_time is not None:
             algorithm_info["execution_time_seconds"] = execution_time
+        algorithm_info["fitness_cache"] = self.fitness_cache.stats()
+        algorithm_info["aborted_evaluations"] = self.aborted_evaluations
+        if self.surrogate_model is not None:
+            algorithm_info["surrogate_rank_correlations"] = self.surrogate_model.rank_correlations
         
         # In thông tin tổng quan
         print(f"\nTổng quan thuật toán:")
@@ -980,11 +800,18 @@ class HarmonySearch:
               f"{best_fitness[2]} chi phí")
         if execution_time is not None:
             print(f"Thời gian chạy: {execution_time:.2f} giây")
+        if self.fitness_cache.enabled:
+            print(f"Bộ nhớ đệm fitness: {self.fitness_cache.hits} lần trúng / "
+                  f"{self.fitness_cache.hits + self.fitness_cache.misses} lần tra "
+                  f"({self.fitness_cache.hit_rate:.1%}), đang lưu {len(self.fitness_cache)} phân bổ")
+        print(f"Số lần đánh giá dừng sớm theo ngưỡng cắt: {self.aborted_evaluations}")
+        if self.surrogate_model is not None:
+            print(f"Mô hình thay thế: {self.surrogate_model}")
 
     def improvise_new_solution(self) -> tuple[Dict, List]:
         """
         Tạo một giải pháp mới dựa trên Harmony Memory với cải tiến heuristic.
-        :return: Tuple gồm giải pháp (solution) và bản deepcopy của danh sách operations.
+        :return: Tuple gồm giải pháp (solution) và OperationProgress dùng khi đánh giá.
         """
         solution = {
             operation.operation_id: {"workers": [], "machines": []}
@@ -996,33 +823,37 @@ class HarmonySearch:
         
         # Sắp xếp các công đoạn theo độ ưu tiên
         operations_priority = {}
-        for op in self.operations:
+        for j, op in enumerate(self.operations):
             # Số lượng công đoạn phụ thuộc vào công đoạn này
-            dependent_count = sum(1 for deps in self.operation_dependencies.values() if op.operation_id in deps)
+            dependent_count = self.instance.critical_path.dependent_count[j]
             # Số lượng công đoạn mà công đoạn này phụ thuộc vào
             dependency_count = len(op.prev_operation) if op.prev_operation else 0
             # Độ ưu tiên: công đoạn có nhiều dependencies nhưng ít dependents sẽ có ưu tiên cao hơn
             operations_priority[op.operation_id] = dependency_count - 0.5 * dependent_count
             
         # Sắp xếp các công đoạn theo độ ưu tiên tăng dần
+        # Cùng độ ưu tiên: công đoạn gấp hơn (ít độ trễ cho phép, nhiều việc phía sau) được xét trước
+        urgency_rank = self.instance.critical_path.urgency_rank
+        operation_index = self.instance.operation_index
         sorted_operations = sorted(
             self.operations, 
-            key=lambda op: operations_priority[op.operation_id]
+            key=lambda op: (operations_priority[op.operation_id], urgency_rank[operation_index[op.operation_id]])
         )
 
+        # Harmony Memory không đổi trong lúc tạo giải pháp: chỉ xếp hạng một lần (khi cần)
+        ranked_solutions = None
+
         # Bước 1: Áp dụng Harmony Consideration cho các công đoạn theo thứ tự ưu tiên
         for operation in sorted_operations:
             operation_id = operation.operation_id
             
-            if random.random() < self.harmony_consideration_rate:
+            if self.random.random() < self.harmony_consideration_rate:
                 # Chọn một giải pháp ngẫu nhiên từ Harmony Memory, thiên vị các giải pháp tốt
-                weights = [1 / (i + 1) for i in range(len(self.harmony_memory))]
-                sorted_hm = sorted(
-                    self.harmony_memory,
-                    key=lambda x: (-x[1][0], x[1][1], x[1][2])
-                )
-                selected_solution = random.choices(
-                    [entry[0] for entry in sorted_hm],
+                if ranked_solutions is None:
+                    ranked_solutions = [self.harmony_memory[i][0] for i in self.rank_harmony_memory()]
+                    weights = [1 / (i + 1) for i in range(len(ranked_solutions))]
+                selected_solution = self.random.choices(
+                    ranked_solutions,
                     weights=weights,
                     k=1
                 )[0]
@@ -1036,14 +867,14 @@ class HarmonySearch:
                             used_workers.add(worker)
                             
                             # Áp dụng Pitch Adjustment với xác suất PAR
-                            if random.random() < self.pitch_adjustment_rate:
+                            if self.random.random() < self.pitch_adjustment_rate:
                                 # Tìm công đoạn khác có cùng yêu cầu
                                 alternative_ops = [
                                     op for op in sorted_operations
                                     if op.required_position == worker.position and op.operation_id != operation_id
                                 ]
                                 if alternative_ops:
-                                    alt_op = random.choice(alternative_ops)
+                                    alt_op = self.random.choice(alternative_ops)
                                     solution[operation_id]["workers"].remove(worker)
                                     solution[alt_op.operation_id]["workers"].append(worker)
                     
@@ -1054,14 +885,14 @@ class HarmonySearch:
                             used_machines.add(machine)
                             
                             # Áp dụng Pitch Adjustment với xác suất PAR
-                            if random.random() < self.pitch_adjustment_rate:
+                            if self.random.random() < self.pitch_adjustment_rate:
                                 # Tìm công đoạn khác có cùng yêu cầu
                                 alternative_ops = [
                                     op for op in sorted_operations
                                     if op.required_machine_type == machine.asset_type and op.operation_id != operation_id
                                 ]
                                 if alternative_ops:
-                                    alt_op = random.choice(alternative_ops)
+                                    alt_op = self.random.choice(alternative_ops)
                                     solution[operation_id]["machines"].remove(machine)
                                     solution[alt_op.operation_id]["machines"].append(machine)
         
@@ -1091,7 +922,7 @@ class HarmonySearch:
                 total_weight = sum(weights) if sum(weights) > 0 else 1
                 norm_weights = [w / total_weight for w in weights]
                 
-                selected_operation = random.choices(eligible_operations, weights=norm_weights, k=1)[0]
+                selected_operation = self.random.choices(eligible_operations, weights=norm_weights, k=1)[0]
                 solution[selected_operation.operation_id]["workers"].append(worker)
                 used_workers.add(worker)
 
@@ -1121,7 +952,7 @@ class HarmonySearch:
                 total_weight = sum(weights) if sum(weights) > 0 else 1
                 norm_weights = [w / total_weight for w in weights]
                 
-                selected_operation = random.choices(eligible_operations, weights=norm_weights, k=1)[0]
+                selected_operation = self.random.choices(eligible_operations, weights=norm_weights, k=1)[0]
                 solution[selected_operation.operation_id]["machines"].append(machine)
                 used_machines.add(machine)
 
@@ -1151,10 +982,10 @@ class HarmonySearch:
                     selected_machine = max(eligible_machines, key=lambda m: m.productivity)
                     solution[operation_id]["machines"].append(selected_machine)
 
-        # Tạo một bản deepcopy của danh sách operations
-        operations_copy = copy.deepcopy(self.operations)
+        # Trạng thái đánh giá riêng cho giải pháp (không sao chép danh sách operations)
+        progress = OperationProgress(len(self.operations))
 
-        return solution, operations_copy
+        return solution, progress
 
     def diversify_harmony_memory(self, percentage: float):
         """
@@ -1167,15 +998,11 @@ class HarmonySearch:
         num_to_replace = max(1, int(percentage * self.harmony_memory_size))
         
         # Xác định các giải pháp tệ nhất trong Harmony Memory
-        worst_indices = sorted(
-            range(len(self.harmony_memory)),
-            key=lambda i: (-self.harmony_memory[i][1][0], self.harmony_memory[i][1][1], self.harmony_memory[i][1][2]),
-            reverse=True
-        )[:num_to_replace]
+        worst_indices = self.rank_harmony_memory(reverse=True)[:num_to_replace]
         
-        # Thay thế các giải pháp tệ nhất bằng các giải pháp mới
-        for idx in worst_indices:
-            # Tạo giải pháp mới với xáo trộn cao hơn
+        # Tạo các giải pháp mới với xáo trộn cao hơn
+        candidates = []
+        for _ in worst_indices:
             old_harmony_consideration_rate = self.harmony_consideration_rate
             old_pitch_adjustment_rate = self.pitch_adjustment_rate
             
@@ -1184,27 +1011,14 @@ class HarmonySearch:
             self.pitch_adjustment_rate = 0.5      # Tăng để thúc đẩy đa dạng
             
             # Tạo giải pháp mới
-            new_solution, operations_copy = self.generate_random_solution()
-            fitness = self.evaluate_solution(new_solution, operations_copy)
+            candidates.append(self.generate_random_solution())
             
             # Khôi phục tham số
             self.harmony_consideration_rate = old_harmony_consideration_rate
             self.pitch_adjustment_rate = old_pitch_adjustment_rate
-            
-            # Thay thế giải pháp tệ
-            self.harmony_memory[idx] = (new_solution, fitness, operations_copy)
+
+        # Đánh giá cùng một lô rồi thay thế các giải pháp tệ nhất
+        for idx, entry in zip(worst_indices, self.parallel_evaluate_solutions(candidates)):
+            self.harmony_memory[idx] = entry
             
         print(f"Đã đa dạng hóa {num_to_replace} giải pháp trong Harmony Memory")
-
-    def parallel_evaluate_solutions(self, solutions_list):
-        """
-        Đánh giá song song nhiều giải pháp để cải thiện hiệu suất.
-        
-        :param solutions_list: Danh sách các cặp (solution, operations_copy)
-        :return: Danh sách các kết quả đánh giá
-        """
-        results = []
-        for solution, operations_copy in solutions_list:
-            fitness = self.evaluate_solution(solution, operations_copy)
-            results.append((solution, fitness, operations_copy))
-        return results
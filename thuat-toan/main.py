@@ -4,6 +4,7 @@ from encoder import (
     parse_operations,
     parse_production_orders,
     parse_assets,
+    build_problem_instance,
 )
 from harmony_search import HarmonySearch  # Import thuật toán Harmony Search
 import json
@@ -67,17 +68,23 @@ def main():
     schedule_data = load_json("./data-2/monthly_schedule_t45.json")
 
     # Parse dữ liệu
-    workers = parse_workers(input_data, schedule_data)
+    workers, availability = parse_workers(input_data, schedule_data, as_array=True)
     operations = parse_operations(input_data)
     production_orders = parse_production_orders(input_data, operations)
     assets = parse_assets(input_data)
 
+    # Biên dịch bài toán sang dạng chỉ số nguyên
+    instance = build_problem_instance(
+        workers, assets, operations, production_orders, schedule_data, availability
+    )
+
     # Khởi tạo và chạy Harmony Search
     hs = HarmonySearch(
         workers=workers,
         machines=assets,
         operations=operations,
         production_orders=production_orders,
+        instance=instance,
     )
     # Đánh dấu thời gian bắt đầu
     start_time = time.time()
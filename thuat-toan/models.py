@@ -1,7 +1,15 @@
 # filepath: d:\Ki_2_nam_4\KPI\tour\models.py
 from typing import List, Dict
-from datetime import datetime, timedelta
 import json
+import math
+import struct
+
+import numpy as np
+
+from components import ResourceComponents
+from critical_path import CriticalPath
+from schedule_log import ScheduleLog
+from shift_calendar import Calendar, shift_date
 
 
 class Worker:
@@ -31,10 +39,125 @@ class Worker:
         """
         return self.schedule.get(day, [])
 
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        """
+        Nhân viên là dữ liệu đầu vào dùng chung, giải pháp chỉ giữ tham chiếu tới nhân viên
+        nên sao chép giải pháp không nhân bản lịch làm việc cả tháng của từng người.
+        """
+        return self
+
     def __repr__(self):
         return f"Worker(id={self.id}, name={self.name}, position={self.position}, schedule={(self.schedule)})"
 
 
+
+class WorkerAvailability:
+    def __init__(
+        self,
+        worker_ids: List[str],
+        positions: List[str],
+        dates: List[str],
+        matrix: np.ndarray,
+    ):
+        """
+        Lịch làm việc của toàn bộ nhân viên dưới dạng mảng NumPy bool (nhân viên × ngày × ca):
+        matrix[i, d, s] = True nếu nhân viên thứ i làm được ca s của ngày dates[d].
+        Mảng được cắt sẵn theo vị trí để lọc nhân viên khả dụng của cả một nhóm trong một phép toán.
+
+        :param worker_ids: ID nhân viên theo thứ tự hàng của matrix
+        :param positions: Vị trí của từng nhân viên
+        :param dates: Danh sách ngày theo thứ tự cột của matrix
+        :param matrix: Mảng bool kích thước (số nhân viên, số ngày, số ca)
+        """
+        self.worker_ids = list(worker_ids)
+        self.worker_index = {worker_id: i for i, worker_id in enumerate(self.worker_ids)}
+        self.dates = list(dates)
+        self.date_index = {date: d for d, date in enumerate(self.dates)}
+        self.matrix = matrix
+        self.shifts_per_day = matrix.shape[2]
+
+        # Cắt theo vị trí: position_workers[p] là chỉ số nhân viên, position_matrix[p] là lịch tương ứng
+        self.position_workers = {}
+        for i, position in enumerate(positions):
+            self.position_workers.setdefault(position, []).append(i)
+        self.position_workers = {
+            position: np.array(rows, dtype=np.intp)
+            for position, rows in self.position_workers.items()
+        }
+        self.position_matrix = {
+            position: matrix[rows] for position, rows in self.position_workers.items()
+        }
+
+    def get_schedule_by_day(self, worker: int, day: str) -> List[int]:
+        """
+        Lịch làm việc của nhân viên (chỉ số hàng) trong một ngày, dạng danh sách 0/1 như file lịch.
+        Ngày không có trong lịch trả về danh sách rỗng.
+        """
+        d = self.date_index.get(day)
+        if d is None:
+            return []
+        return self.matrix[worker, d].astype(np.int8).tolist()
+
+    def available_workers(self, position: str, day: str, shift: int) -> np.ndarray:
+        """
+        Chỉ số các nhân viên thuộc vị trí `position` làm được ca `shift` (0-based) của ngày `day`.
+        """
+        rows = self.position_workers.get(position)
+        d = self.date_index.get(day)
+        if rows is None or d is None:
+            return np.empty(0, dtype=np.intp)
+        return rows[self.position_matrix[position][:, d, shift]]
+
+    def view(self, worker: int) -> "WorkerScheduleView":
+        """Khung nhìn dạng dict (ngày -> danh sách ca) lên lịch của một nhân viên."""
+        return WorkerScheduleView(self, worker)
+
+    def __repr__(self):
+        workers, days, shifts = self.matrix.shape
+        return f"WorkerAvailability(workers={workers}, days={days}, shifts={shifts})"
+
+
+class WorkerScheduleView:
+    def __init__(self, availability: WorkerAvailability, worker: int):
+        """
+        Khung nhìn chỉ đọc, tương thích với dict lịch làm việc cũ của Worker
+        (key: ngày, value: danh sách ca làm việc), đọc trực tiếp từ WorkerAvailability.
+        """
+        self.availability = availability
+        self.worker = worker
+
+    def get(self, day: str, default=None):
+        if day not in self.availability.date_index:
+            return default
+        return self.availability.get_schedule_by_day(self.worker, day)
+
+    def __getitem__(self, day: str) -> List[int]:
+        if day not in self.availability.date_index:
+            raise KeyError(day)
+        return self.availability.get_schedule_by_day(self.worker, day)
+
+    def __contains__(self, day) -> bool:
+        return day in self.availability.date_index
+
+    def __iter__(self):
+        return iter(self.availability.dates)
+
+    def __len__(self) -> int:
+        return len(self.availability.dates)
+
+    def keys(self):
+        return list(self.availability.dates)
+
+    def items(self):
+        return [(day, self[day]) for day in self.availability.dates]
+
+    def __repr__(self):
+        return f"WorkerScheduleView(worker={self.availability.worker_ids[self.worker]}, days={len(self)})"
+
+
 class Operation:
     def __init__(
         self,
@@ -236,9 +359,7 @@ class Operation:
         # Xác định ca trước
         if shift == 1:
             # Nếu là ca 1, chuyển sang ngày trước và lấy ca 4
-            previous_day = (
-                datetime.strptime(day, "%Y-%m-%d") - timedelta(days=1)
-            ).strftime("%Y-%m-%d")
+            previous_day = shift_date(day, -1)
             previous_shift = 4
         else:
             # Nếu không phải ca 1, chỉ cần giảm ca
@@ -265,6 +386,111 @@ class Operation:
         )
 
 
+
+def pack_fitness(completed_orders_on_time, total_shift, total_cost):
+    """
+    Khóa so sánh của một fitness: số nguyên duy nhất, nhỏ hơn là tốt hơn, cùng thứ tự từ điển với
+    (-số lệnh đúng hạn, tổng số ca, tổng chi phí). Chi phí được đổi sang dãy bit IEEE 754 giữ thứ tự
+    (so sánh chính xác như số thực), số ca chiếm 32 bit phía trên, số lệnh đúng hạn (đổi dấu) ở trên cùng.
+    Fitness không hữu hạn (ví dụ giá trị khởi đầu (-inf, inf, inf)) được so sánh qua ±math.inf.
+    """
+    if not (math.isfinite(completed_orders_on_time) and math.isfinite(total_shift) and math.isfinite(total_cost)):
+        if completed_orders_on_time == -math.inf or total_shift == math.inf or total_cost == math.inf:
+            return math.inf
+        return -math.inf
+    bits = struct.unpack("<Q", struct.pack("<d", float(total_cost) + 0.0))[0]  # + 0.0: -0.0 thành 0.0
+    bits = bits ^ 0xFFFFFFFFFFFFFFFF if bits >> 63 else bits | 0x8000000000000000
+    return (-int(completed_orders_on_time) << 96) + (int(total_shift) << 64) + bits
+
+
+def fitness_key(fitness):
+    """Khóa so sánh (xem pack_fitness) của Fitness hoặc tuple (số lệnh đúng hạn, số ca, chi phí)."""
+    try:
+        return fitness.key
+    except AttributeError:
+        return pack_fitness(fitness[0], fitness[1], fitness[2])
+
+
+class Fitness(tuple):
+    def __new__(cls, completed_orders_on_time: int, total_shift: int, total_cost: float, aborted: bool = False):
+        """
+        Fitness (số lệnh hoàn thành đúng hạn, tổng số ca, tổng chi phí), dùng như tuple thông thường.
+        Khóa so sánh (key, xem pack_fitness) được tính một lần khi tạo.
+        :param aborted: Đánh giá bị dừng sớm vì chắc chắn không vượt được ngưỡng cắt (cutoff);
+            khi đó các giá trị chỉ là kết quả tại thời điểm dừng.
+        """
+        fitness = super().__new__(cls, (completed_orders_on_time, total_shift, total_cost))
+        fitness.aborted = aborted
+        fitness.key = pack_fitness(completed_orders_on_time, total_shift, total_cost)
+        return fitness
+
+    def __getnewargs__(self):
+        # Cho pickle/copy tạo lại đúng đối tượng
+        return self[0], self[1], self[2], self.aborted
+
+    def __repr__(self):
+        suffix = ", aborted=True" if self.aborted else ""
+        return f"Fitness({self[0]}, {self[1]}, {self[2]}{suffix})"
+
+
+class OperationProgress:
+    def __init__(self, num_operations: int, record: bool = False, parent: "OperationProgress" = None):
+        """
+        Trạng thái thay đổi của các công đoạn trong một lần đánh giá, tách khỏi định nghĩa Operation.
+        Lưu dưới dạng mảng song song theo chỉ số công đoạn (thứ tự của ProblemInstance)
+        nên mỗi lần đánh giá chỉ cấp phát O(số công đoạn) số thay vì sao chép cả cây đối tượng.
+
+        :param num_operations: Số công đoạn
+        :param record: Có lưu lịch chi tiết (schedule) hay không
+        :param parent: Trạng thái đánh giá của giải pháp gốc khi giải pháp này là lân cận của nó;
+            bộ mô phỏng dùng các điểm lưu (checkpoints) của parent để chỉ mô phỏng lại phần bị ảnh hưởng.
+        """
+        self.num_operations = num_operations
+        self.parent = parent
+        self.reset(record)
+
+    def reset(self, record: bool = False):
+        """Đưa trạng thái về ban đầu để dùng lại cho lần đánh giá khác."""
+        n = self.num_operations
+        self.achieved_kpi0 = [0.0] * n
+        self.achieved_kpi1 = [0.0] * n
+        self.started = bytearray(n)  # Công đoạn đã được xét ít nhất một ca
+        self.completed = bytearray(n)  # Công đoạn đã hoàn thành
+        # Lịch chi tiết dạng cột (định dạng JSON chỉ được tạo khi xuất kết quả)
+        self.schedule = ScheduleLog(n) if record else None
+        # Thông tin cho đánh giá lại gia tăng (do ShiftSimulator ghi khi bật checkpoint)
+        self.first_slot = [-1] * n  # Ca đầu tiên công đoạn được xét (-1 nếu chưa từng)
+        self.allocation = None  # Phân bổ đã mô phỏng
+        self.checkpoints = None  # Danh sách trạng thái mô phỏng ở đầu mỗi ngày
+        self.end_slot = 0  # Ca mà lần mô phỏng dừng lại
+        self.violations = None  # Báo cáo vi phạm ràng buộc (khi bộ mô phỏng bật ConstraintMonitor)
+
+    def copy(self) -> "OperationProgress":
+        """Bản sao KPI đạt được và trạng thái hoàn thành (không gồm lịch chi tiết và điểm lưu)."""
+        progress = OperationProgress(self.num_operations)
+        progress.copy_from(self)
+        return progress
+
+    def copy_from(self, other: "OperationProgress"):
+        """Ghi đè trạng thái bằng bản sao trạng thái của `other` (không gồm lịch chi tiết và điểm lưu)."""
+        self.achieved_kpi0 = list(other.achieved_kpi0)
+        self.achieved_kpi1 = list(other.achieved_kpi1)
+        self.started = bytearray(other.started)
+        self.completed = bytearray(other.completed)
+        self.first_slot = list(other.first_slot)
+        self.allocation = other.allocation
+        self.end_slot = other.end_slot
+        self.schedule = None
+        self.checkpoints = None
+        self.parent = None
+
+    def __repr__(self):
+        return (
+            f"OperationProgress(operations={self.num_operations}, "
+            f"completed={sum(self.completed)}, record={self.schedule is not None})"
+        )
+
+
 class ProductionOrder:
     def __init__(
         self,
@@ -349,8 +575,256 @@ class Asset:
         self.cost_per_hour = cost_per_hour
         self.productivity = productivity
 
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # Máy móc là dữ liệu dùng chung, giống Worker
+        return self
+
     def __repr__(self):
         return (
             f"asset(asset_id={self.asset_id}, name={self.name}, asset_type={self.asset_type}, "
             f"cost_per_hour={self.cost_per_hour}, productivity={self.productivity})"
         )
+
+
+def copy_solution(solution: Dict) -> Dict:
+    """
+    Sao chép cấu trúc của giải pháp: chỉ tạo mới dict của từng công đoạn và danh sách
+    nhân viên/máy móc, các đối tượng Worker và Asset được dùng chung.
+    :param solution: Giải pháp dạng {operation_id: {"workers": [...], "machines": [...]}}
+    :return: Bản sao có thể chỉnh sửa độc lập với giải pháp gốc
+    """
+    return {
+        op_id: {"workers": list(resources["workers"]), "machines": list(resources["machines"])}
+        for op_id, resources in solution.items()
+    }
+
+
+def rank_descending(values: List[float]) -> List[int]:
+    """
+    Thứ hạng của từng phần tử khi sắp giảm dần theo giá trị (0 = lớn nhất); các giá trị bằng nhau
+    xếp theo chỉ số tăng dần, nên sắp một danh sách chỉ số tăng dần theo thứ hạng cho cùng thứ tự
+    với sort ổn định theo giá trị giảm dần.
+    """
+    ranks = [0] * len(values)
+    for rank, i in enumerate(sorted(range(len(values)), key=lambda i: -values[i])):
+        ranks[i] = rank
+    return ranks
+
+
+class ProblemInstance:
+    def __init__(
+        self,
+        workers: List[Worker],
+        assets: List[Asset],
+        operations: List[Operation],
+        production_orders: List[ProductionOrder],
+        dates: List[str],
+        shifts_per_day: int = 4,
+        hours_per_shift: float = 5.5,
+        availability: WorkerAvailability = None,
+    ):
+        """
+        Bài toán đã được "biên dịch" sang dạng chỉ số nguyên để các bộ mô phỏng
+        làm việc trên mảng thay vì tra cứu dict/chuỗi.
+
+        Nhân viên, máy móc, công đoạn và lệnh sản xuất được đánh chỉ số liên tục
+        theo đúng thứ tự đầu vào; vị trí và loại máy được mã hóa thành số nguyên.
+        Quan hệ tiền nhiệm/kế nhiệm lưu theo kiểu CSR: các công đoạn tiền nhiệm
+        của công đoạn j là pred_idx[pred_ptr[j]:pred_ptr[j + 1]].
+
+        :param workers: Danh sách nhân viên
+        :param assets: Danh sách máy móc
+        :param operations: Danh sách công đoạn
+        :param production_orders: Danh sách lệnh sản xuất
+        :param dates: Danh sách ngày của lịch (ngày thứ d có chỉ số d)
+        :param shifts_per_day: Số ca mỗi ngày
+        :param hours_per_shift: Số giờ làm việc mỗi ca
+        :param availability: Lịch làm việc dạng mảng (nếu có sẽ sao chép trực tiếp thay vì đọc từng dict)
+        """
+        self.workers = workers
+        self.assets = assets
+        self.operations = operations
+        self.production_orders = production_orders
+
+        # Lịch: ngày -> chỉ số ngày, (ngày, ca) -> ca tuyệt đối
+        self.calendar = Calendar(dates, shifts_per_day)
+        self.dates = self.calendar.dates
+        self.date_index = self.calendar.date_index
+        self.num_days = self.calendar.num_days
+        self.shifts_per_day = shifts_per_day
+        self.hours_per_shift = hours_per_shift
+
+        # Mã hóa vị trí và loại máy
+        self.positions = []
+        self.position_index = {}
+        self.machine_types = []
+        self.machine_type_index = {}
+
+        # Nhân viên
+        self.num_workers = len(workers)
+        self.worker_ids = [w.id for w in workers]
+        self.worker_index = {w.id: i for i, w in enumerate(workers)}
+        self.worker_position = [self._position_code(w.position) for w in workers]
+        self.worker_productivity = [w.productivity_kpi for w in workers]
+        self.worker_quality = [w.quality_kpi for w in workers]
+        self.worker_salary = [w.salary_per_hour for w in workers]
+
+        # Lịch làm việc: availability[i, d, s] = True nếu nhân viên i làm được ca s của ngày d
+        self.availability = np.zeros((self.num_workers, self.num_days, shifts_per_day), dtype=bool)
+        if availability is not None and all(w.id in availability.worker_index for w in workers):
+            rows = [availability.worker_index[w.id] for w in workers]
+            src_days = [k for k, date in enumerate(availability.dates) if date in self.date_index]
+            dst_days = [self.date_index[availability.dates[k]] for k in src_days]
+            shifts = min(shifts_per_day, availability.shifts_per_day)
+            self.availability[:, dst_days, :shifts] = availability.matrix[np.ix_(rows, src_days)][:, :, :shifts]
+        else:
+            for i, worker in enumerate(workers):
+                for date, shifts in worker.schedule.items():
+                    d = self.date_index.get(date)
+                    if d is None:
+                        continue
+                    for s in range(min(len(shifts), shifts_per_day)):
+                        if shifts[s] == 1:
+                            self.availability[i, d, s] = True
+
+        # Máy móc
+        self.num_assets = len(assets)
+        self.asset_ids = [a.asset_id for a in assets]
+        self.asset_index = {a.asset_id: i for i, a in enumerate(assets)}
+        self.asset_type = [self._machine_type_code(a.asset_type) for a in assets]
+        self.asset_productivity = [a.productivity for a in assets]
+        self.asset_cost = [a.cost_per_hour for a in assets]
+
+        # Lệnh sản xuất
+        self.num_orders = len(production_orders)
+        self.order_ids = [o.order_id for o in production_orders]
+        self.order_index = {o.order_id: k for k, o in enumerate(production_orders)}
+        self.order_operation_count = [o.total_operations for o in production_orders]
+        self.order_deadline_day = [self.day_of(o.end_date) for o in production_orders]
+
+        # Công đoạn
+        self.num_operations = len(operations)
+        self.operation_ids = [op.operation_id for op in operations]
+        self.operation_index = {op.operation_id: j for j, op in enumerate(operations)}
+        self.op_order = [self.order_index.get(op.production_order_id, -1) for op in operations]
+        self.op_position = [self._position_code(op.required_position) for op in operations]
+        self.op_machine_type = [self._machine_type_code(op.required_machine_type) for op in operations]
+        self.op_kpi_count = [len(op.assigned_kpis) for op in operations]
+        self.op_target0 = [
+            op.assigned_kpis[0]["value"] if len(op.assigned_kpis) > 0 else 0.0
+            for op in operations
+        ]
+        self.op_target1 = [
+            op.assigned_kpis[1]["value"] if len(op.assigned_kpis) > 1 else 0.0
+            for op in operations
+        ]
+
+        # CSR tiền nhiệm/kế nhiệm. Tiền nhiệm không tồn tại được đếm riêng,
+        # công đoạn có tiền nhiệm như vậy sẽ không bao giờ sẵn sàng.
+        self.pred_ptr = [0]
+        self.pred_idx = []
+        self.op_missing_preds = []
+        successors = [[] for _ in operations]
+        for j, op in enumerate(operations):
+            missing = 0
+            for prev_id in dict.fromkeys(op.prev_operation or []):
+                p = self.operation_index.get(prev_id)
+                if p is None:
+                    missing += 1
+                    continue
+                self.pred_idx.append(p)
+                successors[p].append(j)
+            self.pred_ptr.append(len(self.pred_idx))
+            self.op_missing_preds.append(missing)
+        self.succ_ptr = [0]
+        self.succ_idx = []
+        for succ in successors:
+            self.succ_idx.extend(succ)
+            self.succ_ptr.append(len(self.succ_idx))
+
+        # Nhóm tài nguyên theo mã
+        self.workers_by_position = [[] for _ in self.positions]
+        for i, code in enumerate(self.worker_position):
+            self.workers_by_position[code].append(i)
+        # Lịch làm việc cắt sẵn theo vị trí
+        self.position_workers = [np.array(ws, dtype=np.intp) for ws in self.workers_by_position]
+        self.position_availability = [self.availability[rows] for rows in self.position_workers]
+        self.assets_by_type = [[] for _ in self.machine_types]
+        for i, code in enumerate(self.asset_type):
+            self.assets_by_type[code].append(i)
+
+        # Thứ hạng toàn cục theo năng suất, tính một lần cho bài toán. Trong cùng vị trí/loại máy,
+        # danh sách tài nguyên của mỗi công đoạn được sắp một lần theo thứ hạng thay vì sắp lại mỗi ca.
+        self.worker_productivity_rank = rank_descending(self.worker_productivity)
+        self.worker_strength_rank = rank_descending(
+            [p * q for p, q in zip(self.worker_productivity, self.worker_quality)]
+        )
+        self.asset_productivity_rank = rank_descending(self.asset_productivity)
+
+        # Đường găng, khối lượng còn lại và độ trễ cho phép của từng công đoạn (dùng chung cho mọi quy tắc ưu tiên)
+        self.critical_path = CriticalPath(self)
+        # Thành phần độc lập về tài nguyên (vị trí, loại máy, lệnh sản xuất và quan hệ tiền nhiệm)
+        self.components = ResourceComponents(self)
+
+    def _position_code(self, position: str) -> int:
+        if position not in self.position_index:
+            self.position_index[position] = len(self.positions)
+            self.positions.append(position)
+        return self.position_index[position]
+
+    def _machine_type_code(self, machine_type: str) -> int:
+        if machine_type not in self.machine_type_index:
+            self.machine_type_index[machine_type] = len(self.machine_types)
+            self.machine_types.append(machine_type)
+        return self.machine_type_index[machine_type]
+
+    def day_of(self, date: str) -> int:
+        """
+        Đổi ngày (chuỗi '%Y-%m-%d') sang chỉ số ngày so với ngày đầu tiên của lịch.
+        Ngày nằm ngoài lịch vẫn được tính theo khoảng cách ngày (có thể âm hoặc vượt num_days).
+        """
+        return self.calendar.day_of(date)
+
+    def available_workers(self, position: int, day: int, shift: int) -> np.ndarray:
+        """Chỉ số các nhân viên thuộc vị trí (mã) `position` làm được ca `shift` của ngày `day`."""
+        if day >= self.num_days:
+            return self.position_workers[position][:0]
+        return self.position_workers[position][self.position_availability[position][:, day, shift]]
+
+    def predecessors(self, j: int) -> List[int]:
+        """Danh sách chỉ số các công đoạn tiền nhiệm của công đoạn j."""
+        return self.pred_idx[self.pred_ptr[j]:self.pred_ptr[j + 1]]
+
+    def successors(self, j: int) -> List[int]:
+        """Danh sách chỉ số các công đoạn kế nhiệm của công đoạn j."""
+        return self.succ_idx[self.succ_ptr[j]:self.succ_ptr[j + 1]]
+
+    def encode_solution(self, solution: Dict) -> List[tuple]:
+        """
+        Chuyển giải pháp dạng {operation_id: {"workers": [...], "machines": [...]}}
+        sang danh sách (chỉ số nhân viên, chỉ số máy) theo thứ tự công đoạn.
+        Chỉ số trong mỗi công đoạn được sắp tăng dần nên kết quả mô phỏng chỉ phụ thuộc
+        vào tập nhân viên/máy được giao, không phụ thuộc thứ tự trong danh sách.
+        """
+        encoded = []
+        for op_id in self.operation_ids:
+            allocation = solution.get(op_id)
+            if allocation is None:
+                encoded.append(((), ()))
+                continue
+            encoded.append((
+                tuple(sorted(self.worker_index[w.id] for w in allocation["workers"])),
+                tuple(sorted(self.asset_index[m.asset_id] for m in allocation["machines"])),
+            ))
+        return encoded
+
+    def __repr__(self):
+        return (
+            f"ProblemInstance(workers={self.num_workers}, assets={self.num_assets}, "
+            f"operations={self.num_operations}, production_orders={self.num_orders}, "
+            f"days={self.num_days}, positions={len(self.positions)}, "
+            f"machine_types={len(self.machine_types)})"
+        )
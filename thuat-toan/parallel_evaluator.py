@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Callable
+
+from models import Fitness, OperationProgress
+
+# Hàm đánh giá của tiến trình con, được gán một lần khi pool khởi động (xem _init_worker)
+_worker_evaluate = None
+# Số công đoạn khi tiến trình con cần gửi về báo cáo vi phạm ràng buộc (None: chỉ gửi fitness)
+_worker_num_operations = None
+
+
+def _init_worker(evaluate: Callable, num_operations: int = None):
+    """Khởi tạo tiến trình con: giữ lại hàm đánh giá (cùng ProblemInstance) cho mọi lần gọi sau."""
+    global _worker_evaluate, _worker_num_operations
+    _worker_evaluate = evaluate
+    _worker_num_operations = num_operations
+
+
+def _evaluate_chunk(allocations: List[List[tuple]], cutoff: tuple = None) -> List[tuple]:
+    """
+    Đánh giá một phần lô trong tiến trình con.
+    :return: Danh sách bộ (số lệnh đúng hạn, tổng số ca, tổng chi phí, aborted, báo cáo vi phạm);
+        báo cáo vi phạm là progress.violations, None nếu không thu thập
+    """
+    progresses = None
+    if _worker_num_operations is not None:
+        progresses = [OperationProgress(_worker_num_operations) for _ in allocations]
+    fitnesses = _worker_evaluate(allocations, progresses, cutoff)
+    reports = [progress.violations for progress in progresses] if progresses else [None] * len(fitnesses)
+    return [
+        (fitness[0], fitness[1], fitness[2], fitness.aborted, report)
+        for fitness, report in zip(fitnesses, reports)
+    ]
+
+
+class ParallelEvaluator:
+    def __init__(self, evaluate: Callable, n_jobs: int = 1, num_operations: int = None):
+        """
+        Đánh giá một lô phân bổ trên pool tiến trình của concurrent.futures.
+        Hàm đánh giá (cùng ProblemInstance mà nó giữ) được gửi sang mỗi tiến trình con đúng một lần,
+        khi pool khởi động; mỗi lần đánh giá chỉ gửi đi phân bổ đã mã hóa (ProblemInstance.encode_solution)
+        và nhận về bộ fitness.
+        Chưa đo mức tăng tốc trên máy nhiều lõi: các phép đo hiện có (input18, lô 32 giải pháp) chạy trên
+        máy 1 CPU nên chỉ cho thấy chi phí của pool (n_jobs=2..8 chậm hơn hoặc ngang n_jobs=1), không phải
+        khả năng mở rộng. Vì vậy n_jobs mặc định là 1; cần đo lại trước khi bật mặc định.
+        :param evaluate: Hàm evaluate(allocations, progresses, cutoff) -> List[Fitness] pickle được
+            (ví dụ BatchSimulator.run)
+        :param n_jobs: Số tiến trình con; 1 thì đánh giá ngay trong tiến trình hiện tại,
+            số âm thì dùng tất cả lõi CPU
+        :param num_operations: Số công đoạn, chỉ truyền khi bộ đánh giá kiểm tra ràng buộc
+            (Evaluator.reports_violations): tiến trình con khi đó tạo progress cho từng phân bổ và gửi về
+            báo cáo vi phạm (progress.violations) cùng fitness
+        """
+        if n_jobs is None or n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        self.evaluate_function = evaluate
+        self.n_jobs = max(1, n_jobs)
+        self.num_operations = num_operations
+        self.executor = None
+
+    def __getstate__(self):
+        # Pool không pickle được; bản sao sẽ tự khởi động pool riêng khi cần
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
+
+    def start(self):
+        """Khởi động pool (nếu chưa có) và gửi hàm đánh giá sang các tiến trình con."""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self.evaluate_function, self.num_operations),
+            )
+        return self.executor
+
+    def shutdown(self):
+        """Dừng pool; lần đánh giá song song tiếp theo sẽ khởi động lại."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def fills_progresses(self, num_allocations: int) -> bool:
+        """
+        Lô có num_allocations phân bổ có được đánh giá trong tiến trình hiện tại hay không,
+        tức là progress truyền vào evaluate có được ghi KPI và trạng thái hoàn thành.
+        Kết quả từ pool tiến trình chỉ có fitness: progress của chúng không được lưu vào FitnessCache.
+        """
+        return self.n_jobs == 1 or num_allocations < 2
+
+    def evaluate(
+        self,
+        allocations: List[List[tuple]],
+        progresses: List[OperationProgress] = None,
+        cutoff: tuple = None,
+    ) -> List[Fitness]:
+        """
+        Đánh giá một lô phân bổ. Lô được chia đều cho các tiến trình con theo thứ tự.
+        :param allocations: Danh sách phân bổ
+        :param progresses: Nơi ghi KPI đạt được cho từng phân bổ; chỉ được ghi khi đánh giá
+            trong tiến trình hiện tại (xem fills_progresses). Trên pool tiến trình chỉ báo cáo vi phạm
+            ràng buộc được ghi lại (progress.violations, khi có num_operations)
+        :param cutoff: Fitness ngưỡng để dừng sớm, dùng chung cho cả lô
+        :return: Danh sách Fitness theo thứ tự của allocations
+        """
+        if self.fills_progresses(len(allocations)):
+            return self.evaluate_function(allocations, progresses, cutoff)
+
+        executor = self.start()
+        chunk_size = -(-len(allocations) // self.n_jobs)
+        futures = [
+            executor.submit(_evaluate_chunk, allocations[start:start + chunk_size], cutoff)
+            for start in range(0, len(allocations), chunk_size)
+        ]
+        fitnesses = []
+        for future in futures:
+            for *values, aborted, report in future.result():
+                if progresses is not None:
+                    progresses[len(fitnesses)].violations = report
+                fitnesses.append(Fitness(*values, aborted=aborted))
+        return fitnesses
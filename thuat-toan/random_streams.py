@@ -0,0 +1,31 @@
+import random
+from typing import List
+
+import numpy as np
+
+
+def make_random(seed=None):
+    """
+    Bộ sinh số ngẫu nhiên riêng cho một lần chạy Harmony Search.
+    :param seed: None: dùng trạng thái chung của module random (kết quả phụ thuộc random.seed như trước);
+        số nguyên hoặc numpy.random.SeedSequence (xem spawn_seeds): một random.Random riêng,
+        nên các lần chạy cùng seed cho cùng kết quả và không dùng chung trạng thái với lần chạy khác
+    """
+    if seed is None:
+        return random
+    if isinstance(seed, np.random.SeedSequence):
+        # 128 bit trạng thái của luồng con làm hạt giống cho random.Random
+        seed = int.from_bytes(seed.generate_state(4, dtype=np.uint32).tobytes(), "little")
+    return random.Random(seed)
+
+
+def spawn_seeds(seed, count: int) -> List[np.random.SeedSequence]:
+    """
+    Các luồng ngẫu nhiên con độc lập (numpy.random.SeedSequence.spawn) của một seed gốc,
+    dùng cho các lần chạy song song hoặc hàng loạt: lần chạy thứ i luôn nhận luồng thứ i
+    bất kể thứ tự hay tiến trình thực hiện.
+    :param seed: Số nguyên hoặc SeedSequence gốc
+    :param count: Số luồng con
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return root.spawn(count)
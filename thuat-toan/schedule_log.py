@@ -0,0 +1,105 @@
+import array
+from typing import Dict
+
+import numpy as np
+
+_INT_COLUMNS = ("operation", "day", "shift", "worker", "asset")
+_OUTPUT_COLUMNS = ("output0", "output1")
+
+
+class ScheduleLog:
+    def __init__(self, num_operations: int, with_outputs: bool = False):
+        """
+        Lịch chi tiết dạng cột: mỗi lần phân công (một cặp nhân viên - máy trong một ca) là một hàng
+        của các mảng kiểu cố định (chỉ số công đoạn, chỉ số ngày, ca bắt đầu từ 0, chỉ số nhân viên,
+        chỉ số máy), thay vì một dict cho mỗi hàng. Định dạng JSON chỉ được tạo khi xuất kết quả.
+        :param num_operations: Số công đoạn của bài toán
+        :param with_outputs: Ghi thêm sản lượng (output0) và chất lượng (output1) của từng cặp
+        """
+        self.num_operations = num_operations
+        self.operation = array.array("i")
+        self.day = array.array("i")
+        self.shift = array.array("i")
+        self.worker = array.array("i")
+        self.asset = array.array("i")
+        self.output0 = array.array("d") if with_outputs else None
+        self.output1 = array.array("d") if with_outputs else None
+        self._columns = None  # Các cột đã sắp theo công đoạn (tính khi cần, xem columns)
+        self._operation_ptr = None
+        self._groups = {}  # Tên cột -> (thứ tự hàng theo cột đó, giá trị đã sắp)
+
+    def append(
+        self,
+        operation: int,
+        day: int,
+        shift: int,
+        worker: int,
+        asset: int,
+        output0: float = 0.0,
+        output1: float = 0.0,
+    ):
+        """Ghi một lần phân công (ca tính từ 0)."""
+        self.operation.append(operation)
+        self.day.append(day)
+        self.shift.append(shift)
+        self.worker.append(worker)
+        self.asset.append(asset)
+        if self.output0 is not None:
+            self.output0.append(output0)
+            self.output1.append(output1)
+        self._columns = None
+
+    def __len__(self):
+        return len(self.operation)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Các cột dưới dạng mảng NumPy, sắp ổn định theo công đoạn (trong mỗi công đoạn giữ thứ tự ghi)
+        để hàng của một công đoạn là một đoạn liên tiếp. Chỉ tính lại khi có hàng mới.
+        """
+        if self._columns is None:
+            operation = np.frombuffer(self.operation, dtype=np.intc)
+            order = np.argsort(operation, kind="stable")
+            columns = {name: np.frombuffer(getattr(self, name), dtype=np.intc)[order] for name in _INT_COLUMNS}
+            if self.output0 is not None:
+                for name in _OUTPUT_COLUMNS:
+                    columns[name] = np.frombuffer(getattr(self, name), dtype=np.float64)[order]
+            self._columns = columns
+            self._operation_ptr = np.searchsorted(columns["operation"], np.arange(self.num_operations + 1))
+            self._groups = {}
+        return self._columns
+
+    def operation_rows(self, operation: int) -> slice:
+        """Đoạn hàng (trong columns()) của một công đoạn; cắt cột bằng đoạn này không sao chép dữ liệu."""
+        self.columns()
+        return slice(int(self._operation_ptr[operation]), int(self._operation_ptr[operation + 1]))
+
+    def _group_rows(self, name: str, value: int) -> np.ndarray:
+        columns = self.columns()
+        if name not in self._groups:
+            order = np.argsort(columns[name], kind="stable")
+            self._groups[name] = (order, columns[name][order])
+        order, keys = self._groups[name]
+        start, end = np.searchsorted(keys, [value, value + 1])
+        return order[start:end]
+
+    def worker_rows(self, worker: int) -> np.ndarray:
+        """Chỉ số các hàng (trong columns()) của một nhân viên, là một lát cắt của chỉ mục tính sẵn."""
+        return self._group_rows("worker", worker)
+
+    def day_rows(self, day: int) -> np.ndarray:
+        """Chỉ số các hàng (trong columns()) của một ngày, là một lát cắt của chỉ mục tính sẵn."""
+        return self._group_rows("day", day)
+
+    def count_conflicts(self, shifts_per_day: int) -> int:
+        """
+        Số lần một nhân viên hoặc một máy bị phân công nhiều hơn một lần trong cùng một ca.
+        :param shifts_per_day: Số ca mỗi ngày (để gộp ngày và ca thành chỉ số ca)
+        """
+        columns = self.columns()
+        slot = columns["day"].astype(np.int64) * shifts_per_day + columns["shift"]
+        conflicts = 0
+        for name in ("worker", "asset"):
+            keys = slot * (int(columns[name].max(initial=0)) + 1) + columns[name]
+            conflicts += len(keys) - len(np.unique(keys))
+        return conflicts
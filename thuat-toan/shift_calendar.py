@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Tuple
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+@lru_cache(maxsize=None)
+def parse_date(date: str) -> datetime:
+    """Đọc ngày dạng chuỗi '%Y-%m-%d'; mỗi chuỗi chỉ được parse một lần."""
+    return datetime.strptime(date, DATE_FORMAT)
+
+
+@lru_cache(maxsize=None)
+def shift_date(date: str, days: int) -> str:
+    """Ngày cách `date` một số ngày (có thể âm), dạng chuỗi '%Y-%m-%d'."""
+    return (parse_date(date) + timedelta(days=days)).strftime(DATE_FORMAT)
+
+
+def date_range(first: str, last: str) -> List[str]:
+    """Danh sách các ngày liên tiếp từ `first` tới `last` (gồm cả hai đầu)."""
+    start = parse_date(first)
+    return [
+        (start + timedelta(days=d)).strftime(DATE_FORMAT)
+        for d in range((parse_date(last) - start).days + 1)
+    ]
+
+
+class Calendar:
+    def __init__(self, dates: List[str], shifts_per_day: int = 4):
+        """
+        Lịch theo chỉ số nguyên: ngày dates[d] có chỉ số d, ca s (tính từ 0) của ngày d
+        là ca tuyệt đối (slot) d * shifts_per_day + s. Chuỗi ngày chỉ được đọc khi nhập dữ liệu
+        và tạo lại khi xuất kết quả; hạn chót, thời điểm bắt đầu sớm nhất và kiểm tra ca liền kề
+        đều là phép so sánh số nguyên.
+        :param dates: Danh sách ngày liên tiếp của lịch (dạng '%Y-%m-%d')
+        :param shifts_per_day: Số ca mỗi ngày
+        """
+        self.dates = list(dates)
+        self.date_index = {date: d for d, date in enumerate(self.dates)}
+        self.num_days = len(self.dates)
+        self.shifts_per_day = shifts_per_day
+        self._labels = list(self.dates)
+
+    def day_of(self, date: str) -> int:
+        """
+        Chỉ số ngày của `date` so với ngày đầu tiên của lịch.
+        Ngày nằm ngoài lịch vẫn được tính theo khoảng cách ngày (có thể âm hoặc vượt num_days).
+        """
+        d = self.date_index.get(date)
+        if d is None:
+            d = (parse_date(date) - parse_date(self.dates[0])).days
+        return d
+
+    def labels(self, num_days: int) -> List[str]:
+        """Chuỗi ngày của các chỉ số 0..num_days-1, tính thêm một lần cho các ngày sau cuối lịch."""
+        while len(self._labels) < num_days:
+            self._labels.append(shift_date(self.dates[0], len(self._labels)))
+        return self._labels[:num_days]
+
+    def slot(self, day: int, shift: int) -> int:
+        """Ca tuyệt đối của ca `shift` (tính từ 0) trong ngày `day`."""
+        return day * self.shifts_per_day + shift
+
+    def split(self, slot: int) -> Tuple[int, int]:
+        """Ngược lại với slot: trả về (ngày, ca)."""
+        return divmod(slot, self.shifts_per_day)
+
+    def __repr__(self):
+        first = self.dates[0] if self.dates else None
+        return f"Calendar(start={first}, days={self.num_days}, shifts_per_day={self.shifts_per_day})"
+
+
+class ReservationCalendar:
+    def __init__(self, num_resources: int):
+        """
+        Lịch đặt chỗ của một nhóm tài nguyên (nhân viên hoặc máy) trên trục ca tuyệt đối.
+        Các ca đã đặt của tài nguyên r là một bitset (số nguyên Python): bit thứ slot bằng 1
+        nếu tài nguyên đã được phân công vào ca đó. Mọi phép kiểm tra và đặt chỗ là phép toán bit.
+        :param num_resources: Số tài nguyên (chỉ số 0..num_resources-1)
+        """
+        self.booked = [0] * num_resources
+
+    def is_free(self, resource: int, slot: int) -> bool:
+        """Tài nguyên chưa được đặt vào ca `slot`."""
+        return not self.booked[resource] & 1 << slot
+
+    def is_adjacent(self, resource: int, slot: int) -> bool:
+        """Tài nguyên đã được đặt vào ca ngay trước hoặc ngay sau ca `slot`."""
+        return bool(self.booked[resource] & 0b101 << slot >> 1)
+
+    def is_blocked(self, resource: int, slot: int) -> bool:
+        """Ca `slot` đã đặt hoặc liền kề một ca đã đặt (không được làm 2 ca liên tiếp)."""
+        return bool(self.booked[resource] & 0b111 << slot >> 1)
+
+    def free(self, resources: List[int], slot: int) -> List[int]:
+        """Các tài nguyên (giữ thứ tự của `resources`) chưa được đặt vào ca `slot`."""
+        booked = self.booked
+        mask = 1 << slot
+        return [r for r in resources if not booked[r] & mask]
+
+    def unblocked(self, resources: List[int], slot: int) -> List[int]:
+        """Các tài nguyên (giữ thứ tự của `resources`) mà ca `slot` không bị chặn (xem is_blocked)."""
+        booked = self.booked
+        mask = 0b111 << slot >> 1  # Các ca slot-1, slot, slot+1
+        return [r for r in resources if not booked[r] & mask]
+
+    def book(self, resource: int, slot: int):
+        """Đặt tài nguyên vào ca `slot`."""
+        self.booked[resource] |= 1 << slot
+
+    def first_free(self, resource: int, slot: int) -> int:
+        """Ca nhỏ nhất >= `slot` mà tài nguyên chưa được đặt."""
+        free = ~(self.booked[resource] >> slot)
+        return slot + (free & -free).bit_length() - 1
+
+    def first_unblocked(self, resource: int, slot: int) -> int:
+        """Ca nhỏ nhất >= `slot` không bị chặn (chưa đặt và không liền kề ca đã đặt)."""
+        booked = self.booked[resource]
+        free = ~((booked | booked << 1 | booked >> 1) >> slot)
+        return slot + (free & -free).bit_length() - 1
+
+    def earliest_free(self, resources: List[int], slot: int) -> int:
+        """Ca nhỏ nhất >= `slot` mà ít nhất một tài nguyên trong `resources` (không rỗng) chưa được đặt."""
+        booked = self.booked
+        common = -1  # Ca mà mọi tài nguyên đều đã đặt
+        for r in resources:
+            common &= booked[r]
+        free = ~(common >> slot)
+        return slot + (free & -free).bit_length() - 1
+
+    def earliest_unblocked(self, resources: List[int], slot: int) -> int:
+        """Ca nhỏ nhất >= `slot` không bị chặn với ít nhất một tài nguyên trong `resources` (không rỗng)."""
+        booked = self.booked
+        common = -1  # Ca bị chặn với mọi tài nguyên
+        for r in resources:
+            b = booked[r]
+            common &= b | b << 1 | b >> 1
+        free = ~(common >> slot)
+        return slot + (free & -free).bit_length() - 1
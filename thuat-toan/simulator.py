@@ -0,0 +1,668 @@
+import bisect
+import copy
+import heapq
+import math
+from typing import List
+
+import numpy as np
+
+from constraint_monitor import ConstraintMonitor
+from models import Fitness, OperationProgress, ProblemInstance
+
+
+def apply_kpi_increment(
+    achieved0: float,
+    achieved1: float,
+    target0: float,
+    target1: float,
+    increment_kpi0: float,
+    increment_kpi1: float,
+    hours: float = 5.5,
+) -> tuple:
+    """
+    Cộng sản lượng của một ca vào hai KPI, giống hệt Operation.update_achieved_kpis:
+    nếu vượt chỉ tiêu thì trừ bớt increment*x/hours với x nguyên lớn nhất sao cho vẫn đạt.
+    :return: Tuple (achieved0 mới, achieved1 mới, đã đạt cả hai KPI hay chưa)
+    """
+    need_adjustment_kpi0 = achieved0 + increment_kpi0 > target0 and increment_kpi0 > 0
+    need_adjustment_kpi1 = achieved1 + increment_kpi1 > target1 and increment_kpi1 > 0
+
+    if need_adjustment_kpi0 or need_adjustment_kpi1:
+        if need_adjustment_kpi0:
+            max_x_kpi0 = hours * (achieved0 + increment_kpi0 - target0) / increment_kpi0
+        else:
+            max_x_kpi0 = float('inf')
+        if need_adjustment_kpi1:
+            max_x_kpi1 = hours * (achieved1 + increment_kpi1 - target1) / increment_kpi1
+        else:
+            max_x_kpi1 = float('inf')
+
+        x = int(min(max_x_kpi0, max_x_kpi1))
+        if need_adjustment_kpi0:
+            increment_kpi0 = increment_kpi0 * (1 - x / hours)
+        if need_adjustment_kpi1:
+            increment_kpi1 = increment_kpi1 * (1 - x / hours)
+
+    achieved0 += increment_kpi0
+    achieved1 += increment_kpi1
+    return achieved0, achieved1, achieved0 >= target0 and achieved1 >= target1
+
+
+def insert_by_productivity(resources: List[int], resource: int, productivity: List[float]):
+    """
+    Chèn tài nguyên vào danh sách đang sắp theo năng suất giảm dần, ngay sau các tài nguyên
+    cùng năng suất (đúng vị trí sort ổn định đặt phần tử được thêm vào cuối danh sách).
+    """
+    value = productivity[resource]
+    i = len(resources)
+    while i > 0 and productivity[resources[i - 1]] < value:
+        i -= 1
+    resources.insert(i, resource)
+
+
+class ReadyQueue:
+    def __init__(self, instance: ProblemInstance):
+        """
+        Hàng đợi công đoạn sẵn sàng theo thứ tự topo.
+        Bậc vào (số tiền nhiệm chưa hoàn thành) được giảm dần khi công đoạn hoàn thành,
+        công đoạn có bậc vào bằng 0 được chèn vào danh sách đã sắp theo độ ưu tiên.
+        Danh sách được sắp (bisect) thay vì heap vì mỗi ca cần duyệt toàn bộ công đoạn sẵn sàng theo thứ tự.
+
+        Hàng đợi cũng giữ chỉ mục cho việc phân bổ lại tài nguyên: với mỗi vị trí nhân viên và mỗi loại máy,
+        hai heap các công đoạn sẵn sàng (theo hạn chót và theo tổng KPI), cập nhật dần khi công đoạn
+        sẵn sàng hoặc hoàn thành. Công đoạn đã hoàn thành được bỏ khỏi đỉnh heap khi tra cứu (xóa lười).
+        :param instance: Bài toán đã biên dịch
+        """
+        self.instance = instance
+        n_ops = instance.num_operations
+
+        # Tiền nhiệm không tồn tại được tính vào bậc vào nên công đoạn đó không bao giờ sẵn sàng
+        self.initial_indegree = [
+            instance.pred_ptr[j + 1] - instance.pred_ptr[j] + instance.op_missing_preds[j]
+            for j in range(n_ops)
+        ]
+        self.initial_ready = [j for j in range(n_ops) if self.initial_indegree[j] == 0]
+
+        # Các thành phần tĩnh của độ ưu tiên, tính một lần cho mỗi instance
+        self.deadline_day = [
+            instance.order_deadline_day[order] if order >= 0 else None
+            for order in instance.op_order
+        ]
+        self.kpi_term = [0.2 * instance.op_target0[j] for j in range(n_ops)]
+        self.dependent_term = [0.5 * count for count in instance.critical_path.dependent_count]
+
+        # Thứ tự ưu tiên khi phân bổ lại tài nguyên: hạn chót công đoạn rồi tổng KPI giảm dần (realloc_rank),
+        # và tổng KPI giảm dần rồi realloc_rank (kpi_rank). Heap lưu thứ hạng, tra ngược ra công đoạn.
+        kpi_sum = [
+            -sum(kpi["value"] for kpi in op.assigned_kpis) if op.assigned_kpis else 0
+            for op in instance.operations
+        ]
+        end_day = [
+            instance.day_of(op.end_date) if op.end_date else float("inf")
+            for op in instance.operations
+        ]
+        self.operation_by_realloc_rank = sorted(range(n_ops), key=lambda j: (end_day[j], kpi_sum[j]))
+        self.realloc_rank = [0] * n_ops
+        for rank, j in enumerate(self.operation_by_realloc_rank):
+            self.realloc_rank[j] = rank
+        self.operation_by_kpi_rank = sorted(range(n_ops), key=lambda j: (kpi_sum[j], self.realloc_rank[j]))
+        self.kpi_rank = [0] * n_ops
+        for rank, j in enumerate(self.operation_by_kpi_rank):
+            self.kpi_rank[j] = rank
+
+        self.indegree = []
+        self.entries = []
+        self.day = 0
+        self.is_ready = bytearray(n_ops)
+        self.position_heaps = []      # Theo vị trí: (heap realloc_rank, heap kpi_rank)
+        self.machine_type_heaps = []  # Theo loại máy: (heap realloc_rank, heap kpi_rank)
+
+    def _build_index(self):
+        """Dựng lại chỉ mục phân bổ lại từ các công đoạn đang sẵn sàng."""
+        inst = self.instance
+        self.is_ready = bytearray(inst.num_operations)
+        self.position_heaps = [([], []) for _ in inst.positions]
+        self.machine_type_heaps = [([], []) for _ in inst.machine_types]
+        for _, j in self.entries:
+            self._add_to_index(j)
+        for heaps in self.position_heaps + self.machine_type_heaps:
+            heapq.heapify(heaps[0])
+            heapq.heapify(heaps[1])
+
+    def _add_to_index(self, j: int, push: bool = False):
+        inst = self.instance
+        self.is_ready[j] = 1
+        add = heapq.heappush if push else list.append
+        for heaps in (self.position_heaps[inst.op_position[j]], self.machine_type_heaps[inst.op_machine_type[j]]):
+            add(heaps[0], self.realloc_rank[j])
+            add(heaps[1], self.kpi_rank[j])
+
+    def _top(self, heap: List[int], operation_by_rank: List[int]):
+        is_ready = self.is_ready
+        while heap and not is_ready[operation_by_rank[heap[0]]]:
+            heapq.heappop(heap)
+        return operation_by_rank[heap[0]] if heap else None
+
+    def _targets(self, heaps: tuple):
+        head = self._top(heaps[0], self.operation_by_realloc_rank)
+        if head is None:
+            return None
+        return head, self._top(heaps[1], self.operation_by_kpi_rank)
+
+    def position_targets(self, position: int):
+        """
+        Công đoạn nhận nhân viên vị trí `position` khi phân bổ lại.
+        :return: Tuple (công đoạn sẵn sàng đứng đầu theo hạn chót, công đoạn có tổng KPI lớn nhất),
+            hoặc None nếu không có công đoạn sẵn sàng nào cần vị trí này
+        """
+        return self._targets(self.position_heaps[position])
+
+    def machine_type_targets(self, machine_type: int):
+        """Như position_targets, cho máy thuộc loại `machine_type`."""
+        return self._targets(self.machine_type_heaps[machine_type])
+
+    def priority(self, j: int, day: int) -> float:
+        """
+        Độ ưu tiên của công đoạn j tại ngày `day` (nhỏ hơn được xếp trước):
+        gần hạn chót, KPI lớn, nhiều công đoạn phụ thuộc được ưu tiên.
+        """
+        deadline = self.deadline_day[j]
+        days_to_deadline = deadline - day if deadline is not None else 0
+        return days_to_deadline - self.kpi_term[j] - self.dependent_term[j]
+
+    def reset(self, day: int = 0):
+        """Khởi tạo lại hàng đợi cho một lần mô phỏng mới."""
+        self.indegree = list(self.initial_indegree)
+        self.day = day
+        self.entries = sorted((self.priority(j, day), j) for j in self.initial_ready)
+        self._build_index()
+
+    def advance_to(self, day: int):
+        """Tính lại độ ưu tiên khi sang ngày mới (công đoạn không thuộc lệnh nào có độ ưu tiên không đổi)."""
+        if day != self.day:
+            self.day = day
+            self.entries = sorted((self.priority(j, day), j) for _, j in self.entries)
+
+    def complete(self, done: List[int]):
+        """
+        Loại các công đoạn vừa hoàn thành khỏi hàng đợi, giảm bậc vào của các công đoạn kế nhiệm
+        và chèn công đoạn kế nhiệm vừa sẵn sàng vào đúng vị trí.
+        :param done: Các công đoạn hoàn thành trong ca
+        """
+        inst = self.instance
+        done_set = set(done)
+        self.entries = [entry for entry in self.entries if entry[1] not in done_set]
+        for j in done:
+            self.is_ready[j] = 0
+        indegree = self.indegree
+        for j in done:
+            for k in range(inst.succ_ptr[j], inst.succ_ptr[j + 1]):
+                succ = inst.succ_idx[k]
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    bisect.insort(self.entries, (self.priority(succ, self.day), succ))
+                    self._add_to_index(succ, push=True)
+
+    def operations(self) -> List[int]:
+        """Công đoạn sẵn sàng theo độ ưu tiên tăng dần."""
+        return [j for _, j in self.entries]
+
+    def snapshot(self) -> tuple:
+        """Bản sao trạng thái hàng đợi (dùng cho điểm lưu của bộ mô phỏng)."""
+        return list(self.entries), list(self.indegree), self.day
+
+    def restore(self, state: tuple):
+        """Khôi phục trạng thái từ snapshot()."""
+        entries, indegree, day = state
+        self.entries = list(entries)
+        self.indegree = list(indegree)
+        self.day = day
+        self._build_index()
+
+
+class ShiftSimulator:
+    def __init__(self, instance: ProblemInstance, max_days: int = 59, check_constraints: bool = False):
+        """
+        Bộ mô phỏng theo ca dùng chung cho các biến thể Harmony Search.
+        Làm việc hoàn toàn trên chỉ số nguyên của ProblemInstance.
+        :param instance: Bài toán đã biên dịch
+        :param max_days: Số ngày tối đa được mô phỏng (ngày 0..max_days)
+        :param check_constraints: Chế độ gỡ lỗi: kiểm tra từng lần phân công bằng ConstraintMonitor và ghi
+            báo cáo vi phạm vào progress.violations (luôn mô phỏng lại từ đầu, bỏ qua điểm lưu của parent).
+            Tắt (mặc định) thì vòng mô phỏng không làm thêm việc gì ngoài một phép so sánh với None.
+        """
+        self.instance = instance
+        self.max_days = max_days
+        self.monitor = ConstraintMonitor(instance, max_days) if check_constraints else None
+        spd = instance.shifts_per_day
+
+        self.ready_queue = ReadyQueue(instance)
+
+        # Lịch làm việc theo ca: available_by_slot[slot][i] với slot = ngày * số ca + ca.
+        # Được đệm thêm để mọi ca trong giới hạn mô phỏng đều tra được.
+        days = min(instance.num_days, max_days + 1)
+        by_slot = np.zeros((max_days + 1, spd, instance.num_workers), dtype=bool)
+        by_slot[:days] = instance.availability[:, :days, :].transpose(1, 2, 0)
+        by_slot = by_slot.reshape(-1, instance.num_workers)
+        self.available_by_slot = by_slot.tolist()
+
+        # Ca rảnh kế tiếp của từng nhân viên: next_available_slot[slot][i] là ca nhỏ nhất >= slot
+        # mà nhân viên i đi làm (bằng num_slots nếu không còn ca nào), dùng để nhảy qua các ca trống.
+        self.num_slots = by_slot.shape[0]
+        next_slot = np.full((self.num_slots + 1, instance.num_workers), self.num_slots, dtype=np.int64)
+        for slot in range(self.num_slots - 1, -1, -1):
+            next_slot[slot] = np.where(by_slot[slot], slot, next_slot[slot + 1])
+        self.next_available_slot = next_slot.tolist()
+
+        # Nhãn ngày cho lịch chi tiết
+        self.day_labels = instance.calendar.labels(max_days + 1)
+
+    def _next_event_slot(self, ready: List[int], workers_of, machines_of, slot: int) -> int:
+        """
+        Ca sớm nhất (>= slot) mà một công đoạn sẵn sàng có ít nhất một nhân viên được giao đi làm
+        và có máy, tức là ca tiếp theo mà trạng thái mô phỏng có thể thay đổi.
+        :return: Chỉ số ca, hoặc num_slots nếu không còn sự kiện nào trong giới hạn mô phỏng
+        """
+        next_available = self.next_available_slot[slot]
+        event = self.num_slots
+        for j in ready:
+            if machines_of[j] and workers_of[j]:
+                event = min(event, min(next_available[w] for w in workers_of[j]))
+                if event == slot:
+                    break
+        return event
+
+    def _find_checkpoint(self, allocation: List[tuple], parent: OperationProgress, cutoff: tuple = None) -> int:
+        """
+        Chọn điểm lưu muộn nhất của parent mà từ đó có thể mô phỏng tiếp cho `allocation`.
+        Phân bổ của công đoạn j chỉ ảnh hưởng tới mô phỏng từ ca đầu tiên j được xét
+        (tài nguyên có thể được phân bổ thêm cho j ngay ở cuối ca trước đó), nên mọi ca trước
+        ca ảnh hưởng sớm nhất của các công đoạn thay đổi đều giống hệt parent.
+        :return: Chỉ số trong parent.checkpoints, hoặc -1 nếu phải mô phỏng lại từ đầu
+        """
+        if parent.checkpoints is None or parent.allocation is None:
+            return -1
+        first_slot = parent.first_slot
+        affected = parent.end_slot
+        for j, resources in enumerate(allocation):
+            if resources != parent.allocation[j]:
+                slot = first_slot[j] if first_slot[j] >= 0 else parent.end_slot
+                affected = min(affected, max(slot - 1, 0))
+                if affected == 0:
+                    return 0
+
+        slots = [checkpoint[0] for checkpoint in parent.checkpoints]
+        index = bisect.bisect_right(slots, affected) - 1
+        if cutoff is not None:
+            # Nếu trạng thái tại điểm lưu đã thỏa điều kiện dừng sớm thì lần chạy đầy đủ đã dừng sớm hơn,
+            # lùi về điểm lưu trước đó để kết quả giống hệt chạy từ đầu
+            cutoff_completed_orders, cutoff_shifts = cutoff[0], cutoff[1]
+            while index > 0:
+                _, total_shift, _, _, max_possible_completed_orders = parent.checkpoints[index][10]
+                if max_possible_completed_orders < cutoff_completed_orders or (
+                    max_possible_completed_orders <= cutoff_completed_orders and total_shift > cutoff_shifts
+                ):
+                    index -= 1
+                else:
+                    break
+        return index
+
+    def _reallocate(self, workers_of, machines_of, pool_workers, pool_machines):
+        """
+        Phân bổ lại nhân viên và máy của các công đoạn đã hoàn thành cho
+        công đoạn sẵn sàng có độ ưu tiên cao nhất cùng vị trí/loại máy.
+        Kho chung được nhóm theo vị trí/loại máy và công đoạn nhận được tra trong chỉ mục của ReadyQueue,
+        nên tài nguyên chưa có công đoạn nhận không phải duyệt lại. Mỗi công đoạn chỉ nhận một vị trí
+        (loại máy) nên duyệt theo từng nhóm giữ nguyên thứ tự thêm vào từng danh sách.
+        """
+        inst = self.instance
+        ready_queue = self.ready_queue
+
+        for position, pooled in pool_workers.items():
+            if not pooled:
+                continue
+            targets = ready_queue.position_targets(position)
+            if targets is None:
+                continue
+            for w in sorted(pooled):
+                insert_by_productivity(
+                    workers_of[targets[1] if inst.worker_quality[w] > 0.8 else targets[0]],
+                    w, inst.worker_productivity,
+                )
+            pooled.clear()
+
+        for machine_type, pooled in pool_machines.items():
+            if not pooled:
+                continue
+            targets = ready_queue.machine_type_targets(machine_type)
+            if targets is None:
+                continue
+            for m in sorted(pooled):
+                insert_by_productivity(
+                    machines_of[targets[1] if inst.asset_productivity[m] > 0.8 else targets[0]],
+                    m, inst.asset_productivity,
+                )
+            pooled.clear()
+
+    def run(
+        self,
+        allocation: List[tuple],
+        progress: OperationProgress = None,
+        record: bool = False,
+        cutoff: tuple = None,
+        checkpoint: bool = False,
+    ) -> Fitness:
+        """
+        Mô phỏng lịch sản xuất cho một phân bổ.
+        :param allocation: Danh sách (chỉ số nhân viên, chỉ số máy) theo thứ tự công đoạn
+            (xem ProblemInstance.encode_solution).
+        :param progress: Nơi ghi KPI đạt được và trạng thái hoàn thành của từng công đoạn;
+            None nếu chỉ cần fitness.
+        :param record: Ghi thêm lịch chi tiết (công đoạn, ngày, ca, nhân viên, máy) vào progress.schedule (ScheduleLog).
+        :param cutoff: Fitness ngưỡng (thường là giải pháp tệ nhất trong Harmony Memory). Dừng sớm khi
+            giải pháp chắc chắn không vượt được: số lệnh còn có thể xong đúng hạn nhỏ hơn cutoff[0],
+            hoặc không lớn hơn cutoff[0] trong khi số ca đã vượt cutoff[1].
+        :param checkpoint: Lưu trạng thái mô phỏng ở đầu mỗi ngày vào progress để các giải pháp lân cận
+            (OperationProgress có parent là progress này) chỉ cần mô phỏng lại từ ngày bị ảnh hưởng.
+        :return: Fitness (số lệnh hoàn thành đúng hạn, tổng số ca, tổng chi phí);
+            Fitness.aborted cho biết mô phỏng đã dừng sớm theo cutoff.
+        """
+        inst = self.instance
+        n_ops = inst.num_operations
+        spd = inst.shifts_per_day
+        hours = inst.hours_per_shift
+        available_by_slot = self.available_by_slot
+        w_prod = inst.worker_productivity
+        w_quality = inst.worker_quality
+        w_salary = inst.worker_salary
+        m_prod = inst.asset_productivity
+        m_cost = inst.asset_cost
+        target0 = inst.op_target0
+        target1 = inst.op_target1
+        op_order = inst.op_order
+        deadline_day = inst.order_deadline_day
+        order_operation_count = inst.order_operation_count
+
+        parent = None
+        if progress is None:
+            progress = OperationProgress(n_ops)
+        else:
+            parent = progress.parent
+            progress.parent = None
+            progress.reset(record)
+
+        monitor = self.monitor
+        if monitor is not None:
+            monitor.reset()
+
+        resume = -1
+        if parent is not None and not record and monitor is None:
+            resume = self._find_checkpoint(allocation, parent, cutoff)
+        checkpoints = None
+        if checkpoint and not record:
+            # Điểm lưu trước điểm tiếp tục giống hệt của parent nên được dùng chung
+            checkpoints = parent.checkpoints[:resume] if resume >= 0 else []
+
+        # Danh sách nhân viên/máy của mỗi công đoạn luôn được giữ theo năng suất giảm dần
+        # (sắp một lần theo thứ hạng, chèn đúng chỗ khi phân bổ lại) nên không cần sắp lại mỗi ca
+        worker_rank = inst.worker_productivity_rank.__getitem__
+        asset_rank = inst.asset_productivity_rank.__getitem__
+        ready_queue = self.ready_queue
+        if resume < 0:
+            slot = 0
+            workers_of = [sorted(ws, key=worker_rank) for ws, _ in allocation]
+            machines_of = [sorted(ms, key=asset_rank) for _, ms in allocation]
+            num_completed = 0
+            completed_by_order = [0] * inst.num_orders
+            total_shift = 0
+            total_cost = 0
+            completed_orders_on_time = 0
+            max_possible_completed_orders = inst.num_orders
+            pool_workers = {}   # Vị trí -> nhân viên trong kho chung
+            pool_machines = {}  # Loại máy -> máy trong kho chung
+            workers_in_last_shift = set()
+            ready_queue.reset()
+        else:
+            (
+                slot, base_allocation, workers_snapshot, machines_snapshot,
+                achieved0, achieved1, visited, completed, first_slot, completed_by_order,
+                counters, pool_workers, pool_machines, workers_in_last_shift, ready_state,
+            ) = parent.checkpoints[resume]
+            workers_of = [list(ws) for ws in workers_snapshot]
+            machines_of = [list(ms) for ms in machines_snapshot]
+            # Công đoạn có phân bổ khác điểm lưu chưa được xét trước ca này nên chỉ cần thay phân bổ
+            for j, resources in enumerate(allocation):
+                if resources != base_allocation[j]:
+                    workers_of[j] = sorted(resources[0], key=worker_rank)
+                    machines_of[j] = sorted(resources[1], key=asset_rank)
+            progress.achieved_kpi0 = list(achieved0)
+            progress.achieved_kpi1 = list(achieved1)
+            progress.started = bytearray(visited)
+            progress.completed = bytearray(completed)
+            progress.first_slot = list(first_slot)
+            completed_by_order = list(completed_by_order)
+            (
+                num_completed, total_shift, total_cost,
+                completed_orders_on_time, max_possible_completed_orders,
+            ) = counters
+            pool_workers = {key: set(pooled) for key, pooled in pool_workers.items()}
+            pool_machines = {key: set(pooled) for key, pooled in pool_machines.items()}
+            workers_in_last_shift = set(workers_in_last_shift)
+            ready_queue.restore(ready_state)
+
+        achieved0 = progress.achieved_kpi0
+        achieved1 = progress.achieved_kpi1
+        visited = progress.started
+        completed = progress.completed
+        first_slot = progress.first_slot
+        schedule = progress.schedule
+
+        if cutoff is not None:
+            cutoff_completed_orders, cutoff_shifts = cutoff[0], cutoff[1]
+        aborted = False
+        num_slots = self.num_slots
+
+        # Mô phỏng hướng sự kiện: xử lý từng ca như trước, nhưng sau một ca không có công đoạn nào
+        # làm việc thì nhảy thẳng tới ca sớm nhất mà một công đoạn sẵn sàng có nhân viên đi làm và có máy.
+        ready_day = -1
+        while slot < num_slots:
+            day, shift = divmod(slot, spd)
+            if day != ready_day:
+                if checkpoints is not None:
+                    checkpoints.append((
+                        slot, allocation, [list(ws) for ws in workers_of], [list(ms) for ms in machines_of],
+                        list(achieved0), list(achieved1), bytes(visited), bytes(completed), list(first_slot),
+                        list(completed_by_order),
+                        (num_completed, total_shift, total_cost, completed_orders_on_time,
+                         max_possible_completed_orders),
+                        {key: set(pooled) for key, pooled in pool_workers.items()},
+                        {key: set(pooled) for key, pooled in pool_machines.items()},
+                        set(workers_in_last_shift),
+                        ready_queue.snapshot(),
+                    ))
+                ready_queue.advance_to(day)
+                ready = ready_queue.operations()
+                ready_day = day
+
+            available = available_by_slot[slot]
+            completed_in_shift = []
+            workers_in_current_shift = set()
+            machines_in_current_shift = set()
+
+            for j in ready:
+                if completed[j]:
+                    continue
+
+                available_workers = [
+                    w for w in workers_of[j]
+                    if w not in workers_in_last_shift
+                    and available[w]
+                    and w not in workers_in_current_shift
+                ]
+                available_machines = machines_of[j]
+
+                total_output_kpi0 = 0
+                total_output_kpi1 = 0
+                min_length = min(len(available_workers), len(available_machines))
+
+                # Chỉ dùng số cặp cần thiết để đạt phần KPI còn lại
+                remaining_kpi = target0[j] - achieved0[j]
+                estimated_workers_needed = 1
+                if min_length > 0:
+                    avg_worker_productivity = sum(w_prod[w] for w in available_workers[:min_length]) / min_length
+                    avg_machine_productivity = sum(m_prod[m] for m in available_machines[:min_length]) / min_length
+                    avg_pair_output = hours * (avg_worker_productivity * avg_machine_productivity)
+                    if avg_pair_output > 0:
+                        estimated_workers_needed = min(min_length, max(1, math.ceil(remaining_kpi / avg_pair_output)))
+
+                used_worker_ids = set()
+                available_machines_filtered = [
+                    m for m in available_machines if m not in machines_in_current_shift
+                ]
+                min_length_filtered = min(len(available_workers), len(available_machines_filtered))
+                estimated_workers_needed = min(estimated_workers_needed, min_length_filtered)
+
+                for i in range(min(min_length_filtered, estimated_workers_needed)):
+                    w = available_workers[i]
+                    m = available_machines_filtered[i]
+                    if w in workers_in_current_shift or w in used_worker_ids:
+                        continue
+                    if m in machines_in_current_shift:
+                        continue
+
+                    total_output_kpi0 += hours * (w_prod[w] * m_prod[m])
+                    total_output_kpi1 += hours * w_prod[w] * m_prod[m] * w_quality[w]
+                    total_cost += hours * (w_salary[w] + m_cost[m])
+                    if schedule is not None:
+                        schedule.append(j, day, shift, w, m)
+                    if monitor is not None:
+                        monitor.book(j, slot, w, m)
+
+                    workers_in_current_shift.add(w)
+                    used_worker_ids.add(w)
+                    machines_in_current_shift.add(m)
+
+                if not visited[j]:
+                    first_slot[j] = slot
+                visited[j] = 1
+                achieved0[j], achieved1[j], is_completed = apply_kpi_increment(
+                    achieved0[j], achieved1[j], target0[j], target1[j],
+                    total_output_kpi0, total_output_kpi1, hours,
+                )
+
+                if is_completed:
+                    completed_in_shift.append(j)
+                    order = op_order[j]
+                    if order >= 0:
+                        completed_by_order[order] += 1
+                    if order >= 0 and completed_by_order[order] == order_operation_count[order]:
+                        if day <= deadline_day[order]:
+                            completed_orders_on_time += 1
+                        else:
+                            # Lệnh hoàn thành trễ hạn. Luôn cập nhật (kể cả khi không có cutoff) vì giá trị này
+                            # nằm trong điểm lưu mà lần chạy có cutoff có thể tiếp tục từ đó
+                            max_possible_completed_orders -= 1
+                            # Nhánh cận (trừ khi đây là công đoạn cuối cùng: kết quả đã đầy đủ)
+                            if (
+                                cutoff is not None
+                                and max_possible_completed_orders < cutoff_completed_orders
+                                and num_completed + len(completed_in_shift) < n_ops
+                            ):
+                                aborted = True
+                                break
+            if aborted:
+                break
+
+            workers_in_last_shift = workers_in_current_shift
+            for j in completed_in_shift:
+                completed[j] = 1
+            if monitor is not None:
+                for j in completed_in_shift:
+                    monitor.complete(j, slot)
+            num_completed += len(completed_in_shift)
+            total_shift += 1
+
+            # Mọi công đoạn đã xong: kết quả đầy đủ, không dừng sớm theo cutoff
+            if num_completed == n_ops:
+                break
+
+            if cutoff is not None and (
+                max_possible_completed_orders < cutoff_completed_orders
+                or (max_possible_completed_orders <= cutoff_completed_orders
+                    and total_shift > cutoff_shifts)
+            ):
+                aborted = True
+                break
+
+            if completed_in_shift:
+                ready_queue.complete(completed_in_shift)
+                ready = ready_queue.operations()
+
+            # Trả tài nguyên của công đoạn đã xong về kho chung rồi phân bổ lại
+            for j in completed_in_shift:
+                for w in workers_of[j]:
+                    pool_workers.setdefault(inst.worker_position[w], set()).add(w)
+                for m in machines_of[j]:
+                    pool_machines.setdefault(inst.asset_type[m], set()).add(m)
+                workers_of[j] = []
+                machines_of[j] = []
+            self._reallocate(workers_of, machines_of, pool_workers, pool_machines)
+
+            next_slot = slot + 1
+            if not workers_in_current_shift and not completed_in_shift:
+                # Ca trống: trạng thái không đổi cho tới khi có công đoạn làm việc trở lại
+                next_slot = self._next_event_slot(ready, workers_of, machines_of, slot + 1)
+                skipped = next_slot - slot - 1
+                if (
+                    cutoff is not None
+                    and max_possible_completed_orders <= cutoff_completed_orders
+                    and total_shift + skipped > cutoff_shifts
+                ):
+                    total_shift = cutoff_shifts + 1
+                    aborted = True
+                    break
+                total_shift += skipped
+            slot = next_slot
+
+        progress.allocation = allocation
+        progress.checkpoints = checkpoints
+        progress.end_slot = slot
+        if monitor is not None:
+            progress.violations = monitor.report()
+
+        return Fitness(completed_orders_on_time, total_shift, total_cost, aborted)
+
+    def export_operations(self, progress: OperationProgress) -> List:
+        """
+        Tạo bản sao các công đoạn mang KPI đạt được và lịch chi tiết từ progress
+        (dùng khi xuất kết quả, không dùng trong vòng tìm kiếm).
+        :param progress: Kết quả của run(..., record=True)
+        :return: Danh sách Operation theo thứ tự của instance
+        """
+        inst = self.instance
+        log = progress.schedule
+        if log is not None:
+            columns = log.columns()
+            days = columns["day"].tolist()
+            shifts = columns["shift"].tolist()
+            workers = columns["worker"].tolist()
+            assets = columns["asset"].tolist()
+        operations = []
+        for j, op in enumerate(inst.operations):
+            operation = copy.copy(op)
+            operation.achieved_kpis = (
+                [progress.achieved_kpi0[j], progress.achieved_kpi1[j]]
+                if progress.started[j] else list(op.achieved_kpis)
+            )
+            operation.detailed_schedule = list(op.detailed_schedule)
+            if log is not None:
+                rows = log.operation_rows(j)
+                for d, shift, w, m in zip(days[rows], shifts[rows], workers[rows], assets[rows]):
+                    operation.update_detailed_schedule(
+                        day=self.day_labels[d],
+                        shift=shift + 1,
+                        worker_id=inst.worker_ids[w],
+                        asset_id=inst.asset_ids[m],
+                    )
+            operations.append(operation)
+        return operations
@@ -0,0 +1,203 @@
+import math
+from typing import List
+
+import numpy as np
+
+from models import Fitness, ProblemInstance
+
+
+class SurrogateModel:
+    def __init__(
+        self,
+        instance: ProblemInstance,
+        ridge: float = 1.0,
+        retrain_interval: int = 64,
+        min_samples: int = 64,
+        max_samples: int = 4096,
+        max_days: int = 59,
+    ):
+        """
+        Mô hình thay thế (surrogate) dự đoán điểm fitness của một phân bổ bằng hồi quy ridge (NumPy),
+        học trực tuyến từ các cặp (phân bổ, fitness) đã được đánh giá chính xác trong lúc tìm kiếm.
+        Đặc trưng rẻ của một phân bổ (xem features):
+        - năng lực một ca của các cặp nhân viên - máy so với chỉ tiêu KPI của công đoạn
+        - độ trễ cho phép của từng lệnh so với hạn chót (đường găng với số ca ước lượng của từng công đoạn)
+        - chi phí mỗi giờ của một cặp nhân viên - máy
+        :param instance: Bài toán đã biên dịch
+        :param ridge: Hệ số phạt ridge (trên đặc trưng đã chuẩn hóa)
+        :param retrain_interval: Số mẫu mới giữa hai lần huấn luyện lại
+        :param min_samples: Số mẫu tối thiểu trước lần huấn luyện đầu tiên
+        :param max_samples: Số mẫu gần nhất được giữ để huấn luyện
+        :param max_days: Số ngày tối đa của bộ lập lịch (để chuẩn hóa số ca)
+        """
+        self.instance = instance
+        self.ridge = ridge
+        self.retrain_interval = retrain_interval
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.num_slots = (max_days + 1) * instance.shifts_per_day
+
+        self.num_features = 3 * instance.num_orders + 3
+        self.w_prod = instance.worker_productivity
+        self.w_cost = instance.worker_salary
+        self.m_prod = instance.asset_productivity
+        self.m_cost = instance.asset_cost
+        # Ca đầu tiên sau hạn chót của từng lệnh
+        self.deadline_end = [(day + 1) * instance.shifts_per_day for day in instance.order_deadline_day]
+
+        self.samples = []   # Vector đặc trưng của các mẫu
+        self.scores = []    # Điểm fitness tương ứng (xem score)
+        self.new_samples = 0  # Số mẫu thêm vào từ lần huấn luyện gần nhất
+        self.weights = None   # Hệ số hồi quy (None khi chưa huấn luyện)
+        self.mean = None
+        self.scale = None
+        self.rank_correlations = []  # Tương quan hạng dự đoán - thực tế trên mẫu mới ở mỗi lần huấn luyện
+
+    @property
+    def trained(self) -> bool:
+        return self.weights is not None
+
+    def score(self, fitness: Fitness) -> float:
+        """
+        Điểm vô hướng giữ thứ tự của fitness (lớn hơn là tốt hơn): số lệnh đúng hạn là tiêu chí chính,
+        số ca (chia cho số ca tối đa) là tiêu chí phụ; chi phí không được tính.
+        """
+        return fitness[0] - fitness[1] / (self.num_slots + 1)
+
+    def features(self, allocation: List[tuple]) -> np.ndarray:
+        """
+        Vector đặc trưng của một phân bổ (xem ProblemInstance.encode_solution), gộp theo lệnh sản xuất
+        để số đặc trưng nhỏ so với số mẫu: với mỗi lệnh, độ trễ cho phép so với hạn chót, log năng lực / chỉ tiêu
+        nhỏ nhất trong các công đoạn và chi phí mỗi giờ-cặp trung bình; thêm số lệnh có độ trễ không âm,
+        số ca của đường găng dài nhất và chi phí ước lượng. Năng lực một ca của công đoạn là số cặp ghép được
+        nhân năng suất trung bình của nhân viên và máy.
+        """
+        inst = self.instance
+        hours = inst.hours_per_shift
+        num_slots = self.num_slots
+        w_prod, w_cost = self.w_prod, self.w_cost
+        m_prod, m_cost = self.m_prod, self.m_cost
+        target0 = inst.op_target0
+        pred_ptr, pred_idx = inst.pred_ptr, inst.pred_idx
+
+        log_ratio = [0.0] * inst.num_operations
+        pair_cost = [0.0] * inst.num_operations
+        shifts = [0] * inst.num_operations
+        total_cost = 0.0
+        for j, (workers, machines) in enumerate(allocation):
+            pairs = min(len(workers), len(machines))
+            if pairs:
+                capacity = hours * pairs * (
+                    sum(w_prod[w] for w in workers) / len(workers) * sum(m_prod[m] for m in machines) / len(machines)
+                )
+                pair_cost[j] = sum(w_cost[w] for w in workers) / len(workers) + sum(m_cost[m] for m in machines) / len(machines)
+            else:
+                capacity = 0.0
+            if target0[j] > 0:
+                log_ratio[j] = math.log1p(capacity / target0[j])
+                shifts[j] = min(math.ceil(target0[j] / capacity), num_slots) if capacity > 0 else num_slots
+                total_cost += shifts[j] * pairs * hours * pair_cost[j]
+
+        # Đường găng theo thứ tự topo với số ca ước lượng của từng công đoạn
+        finish = [0] * inst.num_operations
+        for j in inst.critical_path.topological_order:
+            start = max((finish[p] for p in pred_idx[pred_ptr[j]:pred_ptr[j + 1]]), default=0)
+            finish[j] = start + shifts[j]
+
+        order_finish = [0] * inst.num_orders
+        order_ratio = [math.inf] * inst.num_orders
+        order_cost = [0.0] * inst.num_orders
+        for order, operations in enumerate(inst.critical_path.order_operations):
+            for j in operations:
+                order_finish[order] = max(order_finish[order], finish[j])
+                order_ratio[order] = min(order_ratio[order], log_ratio[j])
+                order_cost[order] += pair_cost[j]
+            if operations:
+                order_cost[order] /= len(operations)
+            else:
+                order_ratio[order] = 0.0
+        slack = [
+            max(-1.0, min(1.0, (deadline_end - finished) / num_slots))
+            for deadline_end, finished in zip(self.deadline_end, order_finish)
+        ]
+        summary = [
+            sum(1 for value in slack if value >= 0),
+            min(max(finish, default=0), num_slots) / num_slots,
+            math.log1p(total_cost),
+        ]
+        return np.array(slack + order_ratio + order_cost + summary)
+
+    def observe(self, allocation: List[tuple], fitness: Fitness):
+        """
+        Thêm một mẫu đã đánh giá chính xác (bỏ qua đánh giá dừng sớm vì fitness chưa đầy đủ)
+        và huấn luyện lại khi đủ retrain_interval mẫu mới.
+        :return: Tương quan hạng trên các mẫu mới nếu vừa huấn luyện lại (None nếu chưa có mô hình cũ),
+            False nếu không huấn luyện lại
+        """
+        if fitness.aborted:
+            return False
+        self.samples.append(self.features(allocation))
+        self.scores.append(self.score(fitness))
+        if len(self.samples) > self.max_samples:
+            del self.samples[0]
+            del self.scores[0]
+        self.new_samples += 1
+        if self.new_samples >= self.retrain_interval and len(self.samples) >= self.min_samples:
+            return self.retrain()
+        return False
+
+    def retrain(self):
+        """
+        Huấn luyện lại hồi quy ridge trên các mẫu đang giữ. Trước đó, mô hình cũ (nếu có) được đánh giá
+        trên các mẫu mới chưa dùng để huấn luyện: tương quan hạng Spearman được lưu vào rank_correlations.
+        :return: Tương quan hạng đó, hoặc None nếu chưa có mô hình cũ
+        """
+        X = np.array(self.samples)
+        y = np.array(self.scores)
+        correlation = None
+        if self.trained and self.new_samples > 1:
+            new = slice(len(y) - min(self.new_samples, len(y)), len(y))
+            correlation = self.rank_correlation(self._predict(X[new]), y[new])
+            self.rank_correlations.append(correlation)
+        self.new_samples = 0
+
+        self.mean = X.mean(axis=0)
+        self.scale = X.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        Z = (X - self.mean) / self.scale
+        intercept = y.mean()
+        gram = Z.T @ Z + self.ridge * np.eye(self.num_features)
+        self.weights = (np.linalg.solve(gram, Z.T @ (y - intercept)), intercept)
+        return correlation
+
+    def _predict(self, X: np.ndarray) -> np.ndarray:
+        coefficients, intercept = self.weights
+        return ((X - self.mean) / self.scale) @ coefficients + intercept
+
+    def predict(self, allocations: List[List[tuple]]) -> np.ndarray:
+        """Điểm dự đoán (xem score) cho từng phân bổ; mô hình phải đã được huấn luyện."""
+        return self._predict(np.array([self.features(allocation) for allocation in allocations]))
+
+    @staticmethod
+    def rank_correlation(predicted: np.ndarray, actual: np.ndarray) -> float:
+        """Tương quan hạng Spearman (hạng bằng nhau được lấy trung bình)."""
+        def ranks(values):
+            order = np.argsort(values, kind="stable")
+            sorted_values = values[order]
+            result = np.empty(len(values))
+            start = 0
+            for end in range(1, len(values) + 1):
+                if end == len(values) or sorted_values[end] != sorted_values[start]:
+                    result[order[start:end]] = (start + end - 1) / 2
+                    start = end
+            return result
+
+        rank_predicted = ranks(predicted)
+        rank_actual = ranks(actual)
+        if rank_predicted.std() == 0 or rank_actual.std() == 0:
+            return 0.0
+        return float(np.corrcoef(rank_predicted, rank_actual)[0, 1])
+
+    def __repr__(self):
+        last = f"{self.rank_correlations[-1]:.2f}" if self.rank_correlations else None
+        return f"SurrogateModel(samples={len(self.samples)}, trained={self.trained}, rank_correlation={last})"
@@ -0,0 +1,141 @@
+import functools
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from encoder import (  # noqa: E402
+    build_problem_instance,
+    load_json,
+    parse_assets,
+    parse_operations,
+    parse_production_orders,
+    parse_workers,
+)
+
+DATA_DIR = os.path.join(ROOT, "data-2")
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SCHEDULE_PATH = os.path.join(DATA_DIR, "monthly_schedule_t45.json")
+INPUTS = ["input3_2", "input9", "input18"]
+
+
+@functools.lru_cache(maxsize=None)
+def load_problem(name: str):
+    """
+    Đọc và biên dịch một file đầu vào trong data-2 (dùng chung cho mọi test).
+    :return: Tuple (ProblemInstance, workers, assets, operations, production_orders)
+    """
+    input_data = load_json(os.path.join(DATA_DIR, f"{name}.json"))
+    schedule_data = load_json(SCHEDULE_PATH)
+    workers, availability = parse_workers(input_data, schedule_data, as_array=True)
+    operations = parse_operations(input_data)
+    production_orders = parse_production_orders(input_data, operations)
+    assets = parse_assets(input_data)
+    instance = build_problem_instance(
+        workers, assets, operations, production_orders, schedule_data, availability
+    )
+    return instance, workers, assets, operations, production_orders
+
+
+@functools.lru_cache(maxsize=None)
+def load_merged_problem():
+    """
+    Bài toán ghép input9 và input5 (mã của input5 được thêm tiền tố nên không dùng chung vị trí,
+    loại máy hay nhân viên với input9): có hai thành phần độc lập về tài nguyên.
+    """
+    first = load_json(os.path.join(DATA_DIR, "input9.json"))
+    second = load_json(os.path.join(DATA_DIR, "input5.json"))
+    schedule_data = load_json(SCHEDULE_PATH)
+    prefix = "B-"
+    for order in second["productionOrders"]:
+        order["id"] = prefix + order["id"]
+    for op in second["operations"]:
+        op["id"] = prefix + op["id"]
+        op["productionOrderId"] = prefix + op["productionOrderId"]
+        op["prevOperation"] = [prefix + p for p in op.get("prevOperation") or []]
+        op["requiredMachineType"] = prefix + op["requiredMachineType"]
+        op["requiredPosition"] = prefix + op["requiredPosition"]
+    for asset in second["assets"]:
+        asset["id"] = prefix + asset["id"]
+        asset["machineType"] = prefix + asset["machineType"]
+    for worker in second["workers"]:
+        worker["id"] = prefix + worker["id"]
+        worker["position"] = prefix + worker["position"]
+    for day in schedule_data:
+        day["schedule"].update({prefix + k: v for k, v in list(day["schedule"].items())})
+    input_data = {key: first[key] + second[key] for key in first}
+
+    workers, availability = parse_workers(input_data, schedule_data, as_array=True)
+    operations = parse_operations(input_data)
+    production_orders = parse_production_orders(input_data, operations)
+    assets = parse_assets(input_data)
+    return build_problem_instance(
+        workers, assets, operations, production_orders, schedule_data, availability
+    )
+
+
+def load_golden(name: str) -> dict:
+    """Kết quả của mã gốc cho file đầu vào `name` (xem tests/data/golden_*.json)."""
+    with open(os.path.join(GOLDEN_DIR, f"golden_{name}.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def encode_ids(instance, solution: dict) -> list:
+    """Phân bổ đã mã hóa của giải pháp dạng {operation_id: [[worker_id, ...], [asset_id, ...]]}."""
+    encoded = []
+    for op_id in instance.operation_ids:
+        worker_ids, asset_ids = solution.get(op_id, ([], []))
+        encoded.append((
+            tuple(sorted(instance.worker_index[w] for w in worker_ids)),
+            tuple(sorted(instance.asset_index[m] for m in asset_ids)),
+        ))
+    return encoded
+
+
+def random_allocation(instance, rng: random.Random) -> list:
+    """Phân bổ ngẫu nhiên: mỗi nhân viên/máy được giao cho một công đoạn cùng vị trí/loại máy."""
+    operations_by_position = {}
+    operations_by_type = {}
+    for j in range(instance.num_operations):
+        operations_by_position.setdefault(instance.op_position[j], []).append(j)
+        operations_by_type.setdefault(instance.op_machine_type[j], []).append(j)
+    workers = [[] for _ in range(instance.num_operations)]
+    machines = [[] for _ in range(instance.num_operations)]
+    for w in range(instance.num_workers):
+        candidates = operations_by_position.get(instance.worker_position[w])
+        if candidates:
+            workers[rng.choice(candidates)].append(w)
+    for m in range(instance.num_assets):
+        candidates = operations_by_type.get(instance.asset_type[m])
+        if candidates:
+            machines[rng.choice(candidates)].append(m)
+    return [(tuple(ws), tuple(ms)) for ws, ms in zip(workers, machines)]
+
+
+def neighbour(allocation: list, other: list, rng: random.Random) -> list:
+    """Lân cận của `allocation`: một công đoạn ngẫu nhiên nhận phân bổ của công đoạn đó trong `other`."""
+    j = rng.randrange(len(allocation))
+    result = list(allocation)
+    result[j] = other[j]
+    return result
+
+
+def progress_state(progress) -> tuple:
+    """Trạng thái so sánh được của một OperationProgress."""
+    return (
+        progress.achieved_kpi0,
+        progress.achieved_kpi1,
+        bytes(progress.started),
+        bytes(progress.completed),
+        progress.first_slot,
+    )
+
+
+@pytest.fixture(params=INPUTS)
+def problem_name(request):
+    return request.param
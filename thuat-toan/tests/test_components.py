@@ -0,0 +1,23 @@
+from conftest import load_merged_problem, load_problem
+
+
+def test_bundled_input_is_a_single_component(problem_name):
+    components = load_problem(problem_name)[0].components
+    assert components.num_components == 1
+
+
+def test_merged_problem_splits_into_disjoint_components():
+    instance = load_merged_problem()
+    components = instance.components
+    assert components.num_components >= 2
+    assert sum(components.sizes()) == instance.num_operations
+    for c, operations in enumerate(components.operations):
+        for j in operations:
+            assert components.component_of[j] == c
+            for p in instance.predecessors(j):
+                assert components.component_of[p] == c
+    # Hai thành phần không dùng chung vị trí hay loại máy
+    for a in range(components.num_components):
+        for b in range(a + 1, components.num_components):
+            assert not set(components.positions[a]) & set(components.positions[b])
+            assert not set(components.machine_types[a]) & set(components.machine_types[b])
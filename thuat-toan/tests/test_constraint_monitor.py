@@ -0,0 +1,73 @@
+import random
+
+from conftest import load_problem, random_allocation
+from constraint_monitor import ConstraintMonitor
+from models import OperationProgress
+from simulator import ShiftSimulator
+
+
+def test_each_violation_type_is_reported():
+    instance = load_problem("input9")[0]
+    j = next(
+        j for j in range(instance.num_operations)
+        if instance.predecessors(j) and not instance.op_missing_preds[j]
+    )
+    w = next(
+        w for w in instance.workers_by_position[instance.op_position[j]]
+        if instance.availability[w, 0, 0] and instance.availability[w, 0, 1]
+    )
+    m = instance.assets_by_type[instance.op_machine_type[j]][0]
+    other_worker = next(x for x in range(instance.num_workers) if instance.worker_position[x] != instance.op_position[j])
+    other_machine = next(x for x in range(instance.num_assets) if instance.asset_type[x] != instance.op_machine_type[j])
+    unavailable = next(
+        x for x in instance.workers_by_position[instance.op_position[j]] if not instance.availability[x, 0, 2]
+    )
+
+    monitor = ConstraintMonitor(instance)
+    for p in instance.predecessors(j):
+        monitor.complete(p, 0)
+    monitor.book(j, 1, w, m)
+    assert monitor.violations == []  # Tiền nhiệm xong ở ca 0, làm từ ca 1 là hợp lệ
+
+    monitor.book(j, 1, w, m)
+    monitor.book(j, 2, unavailable, other_machine)
+    monitor.book(j, 3, other_worker, m)
+    kinds = {kind for kind, *_ in monitor.violations}
+    assert kinds >= {
+        "worker_double_booked", "machine_double_booked", "worker_unavailable",
+        "wrong_position", "wrong_machine_type",
+    }
+
+    monitor.reset()
+    monitor.book(j, 0, w, m)
+    monitor.book(j, 1, w, m)
+    report = monitor.report()
+    assert report["by_type"]["precedence"] == 2
+    assert report["by_type"]["consecutive_shift"] == 1
+    assert report["total"] == len(report["violations"]) == 3
+    entry = report["violations"][0]
+    assert entry["operation_id"] == instance.operation_ids[j]
+    assert entry["worker_id"] == instance.worker_ids[w]
+    assert entry["day"] == instance.calendar.labels(1)[0] and entry["shift"] == 1
+
+
+def test_simulator_reports_no_violations_and_detects_injected_fault():
+    instance = load_problem("input3_2")[0]
+    allocation = random_allocation(instance, random.Random(0))
+    simulator = ShiftSimulator(instance, check_constraints=True)
+    progress = OperationProgress(instance.num_operations)
+    simulator.run(allocation, progress)
+    assert progress.violations["total"] == 0
+
+    # Bộ mô phỏng bị làm sai: coi mọi nhân viên đều đi làm mọi ca
+    simulator.available_by_slot = [[True] * instance.num_workers for _ in simulator.available_by_slot]
+    simulator.run(allocation, progress)
+    assert progress.violations["by_type"]["worker_unavailable"] > 0
+
+
+def test_monitor_is_off_by_default():
+    instance = load_problem("input3_2")[0]
+    simulator = ShiftSimulator(instance)
+    progress = OperationProgress(instance.num_operations)
+    simulator.run(random_allocation(instance, random.Random(0)), progress)
+    assert simulator.monitor is None and progress.violations is None
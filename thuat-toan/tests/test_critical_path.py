@@ -0,0 +1,41 @@
+import copy
+import math
+import random
+
+import pytest
+
+from conftest import DATA_DIR, SCHEDULE_PATH, load_problem, random_allocation
+from encoder import compile_problem_instance, load_json
+from evaluators import create_evaluator
+
+
+def test_urgency_rank_orders_by_slack_then_remaining_work(problem_name):
+    critical_path = load_problem(problem_name)[0].critical_path
+    n_ops = len(critical_path.urgency_rank)
+    assert sorted(critical_path.urgency_rank) == list(range(n_ops))
+    by_rank = sorted(range(n_ops), key=lambda j: critical_path.urgency_rank[j])
+    keys = [
+        (math.inf if critical_path.slack[j] is None else critical_path.slack[j], -critical_path.tail_shifts[j])
+        for j in by_rank
+    ]
+    assert keys == sorted(keys)
+
+
+@pytest.mark.parametrize("prev_operation", [["NONEXISTENT"], ["OP002"]])  # Tiền nhiệm không tồn tại, chu trình
+def test_operations_that_never_become_ready_are_accepted(prev_operation):
+    input_data = copy.deepcopy(load_json(f"{DATA_DIR}/input9.json"))
+    target = 1 if prev_operation == ["NONEXISTENT"] else 0
+    input_data["operations"][target]["prevOperation"] = prev_operation
+    instance = compile_problem_instance(input_data, load_json(SCHEDULE_PATH))
+    critical_path = instance.critical_path
+
+    blocked = [j for j in range(instance.num_operations) if critical_path.slack[j] is None]
+    assert instance.operation_index[input_data["operations"][target]["id"]] in blocked
+    order = instance.op_order[blocked[0]]
+    reachable = [critical_path.slack[j] for j in critical_path.order_operations[order] if j not in blocked]
+    assert critical_path.order_slack[order] == min(reachable, default=None)
+
+    allocation = random_allocation(instance, random.Random(31))
+    fitness = create_evaluator("reference", instance).evaluate(allocation)
+    assert not fitness.aborted
+    assert create_evaluator("optimized", instance).evaluate(allocation) is not None
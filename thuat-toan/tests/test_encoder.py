@@ -0,0 +1,25 @@
+import copy
+
+import pytest
+
+from conftest import DATA_DIR, SCHEDULE_PATH
+from encoder import compile_problem_instance, load_json
+
+
+@pytest.mark.parametrize("start_date", ["2025-04-10", "2025-03-20"])
+def test_calendar_starts_on_first_schedule_date(start_date):
+    input_data = copy.deepcopy(load_json(f"{DATA_DIR}/input9.json"))
+    schedule_data = copy.deepcopy(load_json(SCHEDULE_PATH))
+    for order in input_data["productionOrders"]:
+        order["startDate"] = start_date
+    # Nhân viên vắng mặt trong lịch của ngày đầu vẫn phải có lịch ở các ngày sau
+    absent = next(w["id"] for w in input_data["workers"] if w["id"] in schedule_data[1]["schedule"])
+    del schedule_data[0]["schedule"][absent]
+
+    instance = compile_problem_instance(input_data, schedule_data)
+
+    assert instance.dates[0] == schedule_data[0]["date"]
+    assert instance.num_days == len(schedule_data)
+    w = instance.worker_index[absent]
+    assert not instance.availability[w, 0].any()
+    assert instance.availability[w, 1].tolist() == [s == 1 for s in schedule_data[1]["schedule"][absent]]
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import random
+
+import pytest
+
+from conftest import (
+    encode_ids,
+    load_golden,
+    load_merged_problem,
+    load_problem,
+    neighbour,
+    progress_state,
+    random_allocation,
+)
+from evaluators import available_evaluators, create_evaluator
+from models import OperationProgress
+
+
+def schedule_digest(operations) -> str:
+    """md5 của KPI đạt được và lịch chi tiết, cùng định dạng với tests/data/golden_*.json."""
+    detail = json.dumps([[op.achieved_kpis, op.detailed_schedule] for op in operations], sort_keys=True)
+    return hashlib.md5(detail.encode()).hexdigest()
+
+
+def test_registry_lists_builtin_evaluators():
+    names = available_evaluators()
+    for name in ("reference", "vectorized", "decomposed", "optimized", "coarse", "checked"):
+        assert name in names
+
+
+def test_create_evaluator_rejects_unknown_name_and_other_instance():
+    instance = load_problem("input3_2")[0]
+    with pytest.raises(ValueError):
+        create_evaluator("khong-ton-tai", instance)
+    evaluator = create_evaluator("reference", instance)
+    assert create_evaluator(evaluator, instance) is evaluator
+    with pytest.raises(ValueError):
+        create_evaluator(evaluator, load_problem("input9")[0])
+
+
+@pytest.mark.parametrize("evaluator_name", ["reference", "optimized"])
+def test_evaluator_matches_baseline(problem_name, evaluator_name):
+    instance = load_problem(problem_name)[0]
+    golden = load_golden(problem_name)
+    evaluator = create_evaluator(evaluator_name, instance)
+    for solution, expected in zip(golden["solutions"], golden[evaluator_name]):
+        progress = OperationProgress(instance.num_operations)
+        fitness = evaluator.evaluate(encode_ids(instance, solution), progress, record=True)
+        assert list(fitness) == expected["fitness"]
+        assert schedule_digest(evaluator.export_operations(progress)) == expected["schedule_md5"]
+        # Không ghi lịch chi tiết thì fitness vẫn giống hệt
+        assert evaluator.evaluate(encode_ids(instance, solution)) == fitness
+
+
+def test_vectorized_matches_reference(problem_name):
+    instance = load_problem(problem_name)[0]
+    rng = random.Random(3)
+    allocations = [encode_ids(instance, solution) for solution in load_golden(problem_name)["solutions"]]
+    allocations += [random_allocation(instance, rng) for _ in range(6)]
+    reference = create_evaluator("reference", instance)
+    vectorized = create_evaluator("vectorized", instance)
+    vectorized.batch_simulator.min_batch_size = 1  # Luôn dùng đường vector hóa
+
+    expected = []
+    for allocation in allocations:
+        progress = OperationProgress(instance.num_operations)
+        expected.append((reference.evaluate(allocation, progress), progress_state(progress)))
+    progresses = [OperationProgress(instance.num_operations) for _ in allocations]
+    fitnesses = vectorized.evaluate_batch(allocations, progresses)
+    for (fitness, state), actual, progress in zip(expected, fitnesses, progresses):
+        assert actual == fitness
+        assert progress_state(progress) == state
+
+
+def test_decomposed_matches_reference():
+    instance = load_merged_problem()
+    assert instance.components.num_components > 1
+    rng = random.Random(5)
+    allocations = [random_allocation(instance, rng) for _ in range(8)]
+    allocations += [neighbour(rng.choice(allocations), rng.choice(allocations), rng) for _ in range(8)]
+    reference = create_evaluator("reference", instance)
+    decomposed = create_evaluator("decomposed", instance)
+    for _ in range(2):  # Lần thứ hai lấy kết quả từ bộ nhớ đệm của các thành phần
+        for allocation in allocations:
+            expected = OperationProgress(instance.num_operations)
+            actual = OperationProgress(instance.num_operations)
+            assert decomposed.evaluate(allocation, actual) == reference.evaluate(allocation, expected)
+            assert progress_state(actual) == progress_state(expected)
+    assert sum(stats["hits"] for stats in decomposed.cache_stats()) >= len(allocations)
+
+
+def test_decomposed_single_component_falls_back_to_reference():
+    instance = load_problem("input9")[0]
+    rng = random.Random(7)
+    reference = create_evaluator("reference", instance)
+    decomposed = create_evaluator("decomposed", instance)
+    for _ in range(3):
+        allocation = random_allocation(instance, rng)
+        assert decomposed.evaluate(allocation) == reference.evaluate(allocation)
+
+
+def test_checked_matches_reference_without_violations(problem_name):
+    instance = load_problem(problem_name)[0]
+    reference = create_evaluator("reference", instance)
+    checked = create_evaluator("checked", instance)
+    for solution in load_golden(problem_name)["solutions"]:
+        allocation = encode_ids(instance, solution)
+        progress = OperationProgress(instance.num_operations)
+        assert checked.evaluate(allocation, progress) == reference.evaluate(allocation)
+        assert progress.violations["total"] == 0
+    assert checked.evaluations_with_violations == 0
+
+
+def test_evaluate_batch_matches_evaluate():
+    instance = load_problem("input9")[0]
+    rng = random.Random(11)
+    allocations = [random_allocation(instance, rng) for _ in range(4)]
+    for name in ("reference", "optimized", "coarse"):
+        evaluator = create_evaluator(name, instance)
+        assert evaluator.evaluate_batch(allocations) == [evaluator.evaluate(a) for a in allocations]
@@ -0,0 +1,44 @@
+from fitness_cache import FitnessCache
+from models import Fitness, OperationProgress
+
+
+def test_key_ignores_resource_order():
+    assert FitnessCache.make_key([((3, 1), (2, 0))]) == FitnessCache.make_key([((1, 3), (0, 2))])
+    assert FitnessCache.make_key([((1,), ())]) != FitnessCache.make_key([((2,), ())])
+
+
+def test_get_copies_stored_progress():
+    cache = FitnessCache()
+    progress = OperationProgress(2)
+    progress.achieved_kpi0[0] = 5.0
+    progress.completed[1] = 1
+    cache.put(("a",), Fitness(1, 2, 3.0), progress)
+    progress.achieved_kpi0[0] = 99.0  # Thay đổi sau khi lưu không ảnh hưởng bản đã lưu
+
+    restored = OperationProgress(2)
+    assert cache.get(("a",), restored) == (1, 2, 3.0)
+    assert restored.achieved_kpi0 == [5.0, 0.0]
+    assert restored.completed == bytearray([0, 1])
+    assert cache.get(("b",)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FitnessCache(max_size=2)
+    progress = OperationProgress(1)
+    cache.put(("a",), Fitness(1, 1, 1.0), progress)
+    cache.put(("b",), Fitness(2, 2, 2.0), progress)
+    cache.get(("a",))
+    cache.put(("c",), Fitness(3, 3, 3.0), progress)
+    assert len(cache) == 2
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == (1, 1, 1.0)
+    assert cache.get(("c",)) == (3, 3, 3.0)
+
+
+def test_zero_size_disables_cache():
+    cache = FitnessCache(max_size=0)
+    cache.put(("a",), Fitness(1, 1, 1.0), OperationProgress(1))
+    assert not cache.enabled and len(cache) == 0
+    assert cache.get(("a",)) is None
+    assert (cache.hits, cache.misses) == (0, 0)
@@ -0,0 +1,124 @@
+import contextlib
+import importlib
+import io
+import os
+
+import pytest
+
+from benchmark import load_harmony_search
+from conftest import DATA_DIR, SCHEDULE_PATH, progress_state
+from harmony_search_base import HarmonySearchBase
+from models import Fitness, OperationProgress
+
+MODULES = ["harmony_search", "harmony_search_cai_thien1", "harmony_search_nhanh_can_trong_so", "hs_cai_tien"]
+
+
+def optimize(module_name: str, **kwargs):
+    hs = load_harmony_search(module_name, os.path.join(DATA_DIR, "input3_2.json"), SCHEDULE_PATH, **kwargs)
+    hs.max_iterations = 15
+    with contextlib.redirect_stdout(io.StringIO()):
+        solution, fitness, progress = hs.optimize()
+    hs.parallel_evaluator.shutdown()
+    return hs, solution, fitness, progress
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_seeded_runs_are_reproducible(module_name):
+    _, first_solution, first_fitness, _ = optimize(module_name, seed=5)
+    _, second_solution, second_fitness, _ = optimize(module_name, seed=5)
+    assert first_fitness == second_fitness
+    assert first_solution.keys() == second_solution.keys()
+    for op_id, allocation in first_solution.items():
+        assert [w.id for w in allocation["workers"]] == [w.id for w in second_solution[op_id]["workers"]]
+        assert [m.asset_id for m in allocation["machines"]] == [
+            m.asset_id for m in second_solution[op_id]["machines"]
+        ]
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_best_fitness_matches_reevaluation(module_name):
+    hs, solution, fitness, _ = optimize(module_name, seed=3)
+    allocation = hs.instance.encode_solution(solution)
+    assert tuple(hs.evaluator.evaluate(allocation)) == tuple(fitness)
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_pooled_results_do_not_cache_empty_progress(module_name):
+    # Với n_jobs > 1, progress của kết quả từ pool tiến trình còn rỗng: không được lưu vào bộ nhớ đệm,
+    # lần đánh giá sau phải mô phỏng lại và lưu KPI đầy đủ
+    hs = load_harmony_search(
+        module_name, os.path.join(DATA_DIR, "input3_2.json"), SCHEDULE_PATH, seed=7, n_jobs=2,
+        fitness_cache_size=64,
+    )
+    solutions = [hs.generate_random_solution() for _ in range(4)]
+    try:
+        pooled = hs.parallel_evaluate_solutions([(solution, None) for solution, _ in solutions])
+    finally:
+        hs.parallel_evaluator.shutdown()
+    assert len(hs.fitness_cache) == 0
+
+    hs.parallel_evaluator.n_jobs = 1
+    for (solution, fitness, _), (_, in_process_fitness, progress) in zip(
+        pooled, hs.parallel_evaluate_solutions([(solution, None) for solution, _ in solutions])
+    ):
+        expected = OperationProgress(len(hs.operations))
+        assert tuple(hs.evaluator.evaluate(hs.instance.encode_solution(solution), expected)) == tuple(fitness)
+        assert tuple(in_process_fitness) == tuple(fitness)
+        assert progress_state(progress) == progress_state(expected)
+        assert hs.evaluate_solution(solution) == fitness  # Trúng bộ nhớ đệm
+    assert hs.fitness_cache.hits == len(solutions)
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_fitness_cache_is_off_by_default(module_name):
+    hs, _, _, _ = optimize(module_name, seed=5)
+    assert not hs.fitness_cache.enabled
+    assert (len(hs.fitness_cache), hs.fitness_cache.hits, hs.fitness_cache.misses) == (0, 0, 0)
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_harmony_memory_keeps_fitness_objects(module_name):
+    # Mọi vị trí ghi vào Harmony Memory (kể cả thay thế giải pháp tệ nhất) lưu chính Fitness
+    hs, _, _, _ = optimize(module_name, seed=11)
+    assert all(type(fitness) is Fitness and not fitness.aborted for _, fitness, _ in hs.harmony_memory)
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_pooled_checked_evaluation_reports_violations(module_name):
+    # evaluator="checked" với n_jobs > 1: tiến trình con gửi về báo cáo vi phạm, đường đánh giá theo lô
+    # kiểm tra từng kết quả (kể cả khi bộ mô phỏng bị làm sai trước khi pool khởi động)
+    hs = load_harmony_search(
+        module_name, os.path.join(DATA_DIR, "input3_2.json"), SCHEDULE_PATH,
+        evaluator="checked", seed=13, n_jobs=2,
+    )
+    solutions = [(solution, None) for solution, _ in (hs.generate_random_solution() for _ in range(4))]
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            results = hs.parallel_evaluate_solutions(solutions)
+        assert all(progress.violations["total"] == 0 for _, _, progress in results)
+        assert "VI PHẠM RÀNG BUỘC" not in output.getvalue()
+        hs.parallel_evaluator.shutdown()
+
+        # Bộ mô phỏng bị làm sai: coi mọi nhân viên đều đi làm mọi ca
+        simulator = hs.evaluator.simulator
+        simulator.available_by_slot = [[True] * hs.instance.num_workers for _ in simulator.available_by_slot]
+        hs.fitness_cache.entries.clear()
+        with contextlib.redirect_stdout(output):
+            results = hs.parallel_evaluate_solutions(solutions)
+    finally:
+        hs.parallel_evaluator.shutdown()
+    assert any(progress.violations["by_type"]["worker_unavailable"] for _, _, progress in results)
+    assert "VI PHẠM RÀNG BUỘC" in output.getvalue()
+
+
+@pytest.mark.parametrize("module_name", MODULES)
+def test_variants_share_base_helpers(module_name):
+    # Các hàm dùng chung chỉ có một bản trong HarmonySearchBase, không bị chép lại trong từng biến thể
+    cls = importlib.import_module(module_name).HarmonySearch
+    shared = [
+        name for name, value in vars(HarmonySearchBase).items()
+        if callable(value) and not name.startswith("__")
+    ]
+    assert issubclass(cls, HarmonySearchBase) and "parallel_evaluate_solutions" in shared
+    assert [name for name in shared if name in vars(cls)] == []
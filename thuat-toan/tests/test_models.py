@@ -0,0 +1,34 @@
+import itertools
+import math
+import pickle
+
+from models import Fitness, fitness_key, pack_fitness, rank_descending
+
+
+def test_pack_fitness_orders_like_tuple_comparison():
+    values = [
+        (on_time, shifts, cost)
+        for on_time in (0, 1, 7)
+        for shifts in (0, 3, 240)
+        for cost in (-2.5, -0.0, 0.0, 1e-9, 39451.5, 3.5e8)
+    ]
+    for a, b in itertools.product(values, repeat=2):
+        better = (-a[0], a[1], a[2]) < (-b[0], b[1], b[2])
+        assert (pack_fitness(*a) < pack_fitness(*b)) == better
+
+
+def test_pack_fitness_non_finite_values():
+    assert pack_fitness(-math.inf, math.inf, math.inf) == math.inf
+    assert pack_fitness(1, 2, 3.0) < math.inf
+    assert fitness_key((-math.inf, math.inf, math.inf)) == math.inf
+
+
+def test_fitness_key_is_computed_once_and_survives_pickle():
+    fitness = Fitness(3, 10, 41228.0, aborted=True)
+    assert fitness.key == pack_fitness(3, 10, 41228.0) == fitness_key((3, 10, 41228.0))
+    restored = pickle.loads(pickle.dumps(fitness))
+    assert restored == fitness and restored.aborted and restored.key == fitness.key
+
+
+def test_rank_descending_breaks_ties_by_index():
+    assert rank_descending([0.5, 0.9, 0.5, 1.0]) == [2, 1, 3, 0]
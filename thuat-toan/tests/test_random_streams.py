@@ -0,0 +1,24 @@
+import random
+
+import numpy as np
+
+from random_streams import make_random, spawn_seeds
+
+
+def test_unseeded_stream_is_the_random_module():
+    assert make_random() is random
+
+
+def test_same_seed_gives_same_sequence():
+    first = make_random(42)
+    second = make_random(42)
+    assert [first.random() for _ in range(5)] == [second.random() for _ in range(5)]
+    assert make_random(42).random() != make_random(43).random()
+
+
+def test_spawned_seeds_are_reproducible_and_independent():
+    children = spawn_seeds(7, 3)
+    again = spawn_seeds(np.random.SeedSequence(7), 3)
+    values = [make_random(child).random() for child in children]
+    assert values == [make_random(child).random() for child in again]
+    assert len(set(values)) == 3
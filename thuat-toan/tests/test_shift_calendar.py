@@ -0,0 +1,32 @@
+from shift_calendar import Calendar, ReservationCalendar, date_range, shift_date
+
+
+def test_calendar_days_slots_and_labels():
+    calendar = Calendar(date_range("2025-04-29", "2025-05-02"), shifts_per_day=4)
+    assert calendar.num_days == 4
+    assert calendar.day_of("2025-05-01") == 2
+    assert calendar.day_of("2025-05-10") == 11  # Ngoài lịch: tính theo khoảng cách ngày
+    assert calendar.day_of("2025-04-28") == -1
+    assert calendar.slot(2, 3) == 11
+    assert calendar.split(11) == (2, 3)
+    assert calendar.labels(6) == [
+        "2025-04-29", "2025-04-30", "2025-05-01", "2025-05-02", "2025-05-03", "2025-05-04",
+    ]
+    assert shift_date("2025-04-30", 1) == "2025-05-01"
+
+
+def test_reservation_calendar_bitsets():
+    calendar = ReservationCalendar(3)
+    calendar.book(0, 5)
+    calendar.book(1, 5)
+    calendar.book(1, 6)
+    assert not calendar.is_free(0, 5) and calendar.is_free(0, 4)
+    assert calendar.is_adjacent(0, 4) and calendar.is_adjacent(0, 6) and not calendar.is_adjacent(0, 5)
+    assert calendar.is_blocked(0, 4) and not calendar.is_blocked(0, 3)
+    assert calendar.free([0, 1, 2], 5) == [2]
+    assert calendar.unblocked([0, 1, 2], 6) == [2]
+    assert calendar.first_free(1, 5) == 7
+    assert calendar.first_unblocked(0, 4) == 7
+    assert calendar.first_unblocked(0, 0) == 0
+    assert calendar.earliest_free([0, 1], 5) == 6
+    assert calendar.earliest_unblocked([0, 1], 4) == 7
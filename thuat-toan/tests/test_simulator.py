@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from batch_simulator import BatchSimulator
+from conftest import load_problem, neighbour, progress_state, random_allocation
+from models import OperationProgress, fitness_key
+from simulator import ShiftSimulator
+
+
+def full_run(simulator, allocation, cutoff=None):
+    progress = OperationProgress(simulator.instance.num_operations)
+    return simulator.run(allocation, progress, cutoff=cutoff), progress
+
+
+def test_checkpoint_resume_matches_full_run():
+    instance = load_problem("input9")[0]
+    simulator = ShiftSimulator(instance)
+    rng = random.Random(13)
+    resumed_runs = 0
+    for _ in range(4):
+        base = random_allocation(instance, rng)
+        other = random_allocation(instance, rng)
+        parent = OperationProgress(instance.num_operations)
+        simulator.run(base, parent, checkpoint=True)
+        for _ in range(4):
+            allocation = neighbour(base, other, rng)
+            resumed_runs += simulator._find_checkpoint(allocation, parent) > 0
+            child = OperationProgress(instance.num_operations, parent=parent)
+            fitness = simulator.run(allocation, child, checkpoint=True)
+            expected, expected_progress = full_run(simulator, allocation)
+            assert fitness == expected and not fitness.aborted
+            assert progress_state(child) == progress_state(expected_progress)
+    assert resumed_runs > 0
+
+
+def test_cutoff_abort_is_sound():
+    instance = load_problem("input9")[0]
+    simulator = ShiftSimulator(instance)
+    rng = random.Random(17)
+    allocations = [random_allocation(instance, rng) for _ in range(8)]
+    full = [full_run(simulator, allocation)[0] for allocation in allocations]
+    for allocation, expected in zip(allocations, full):
+        for cutoff in full:
+            fitness = simulator.run(allocation, cutoff=cutoff)
+            if fitness.aborted:
+                # Chỉ dừng sớm khi giải pháp chắc chắn không tốt hơn ngưỡng cắt
+                assert fitness_key(expected) >= fitness_key(cutoff)
+            else:
+                assert fitness == expected
+
+
+def test_record_does_not_change_fitness(problem_name):
+    instance = load_problem(problem_name)[0]
+    simulator = ShiftSimulator(instance)
+    allocation = random_allocation(instance, random.Random(19))
+    progress = OperationProgress(instance.num_operations, record=True)
+    fitness = simulator.run(allocation, progress, record=True)
+    assert fitness == simulator.run(allocation)
+    assert len(progress.schedule) > 0
+    assert progress.schedule.count_conflicts(instance.shifts_per_day) == 0
+
+
+def test_resume_with_cutoff_from_checkpoints_built_without_cutoff():
+    # Điểm lưu của parent được tạo khi không có ngưỡng cắt; giải pháp lân cận tiếp tục từ đó với ngưỡng cắt
+    # phải cho kết quả (kể cả aborted) giống hệt mô phỏng lại từ đầu với cùng ngưỡng cắt.
+    instance = load_problem("input9")[0]
+    simulator = ShiftSimulator(instance)
+    rng = random.Random(23)
+    allocations = [random_allocation(instance, rng) for _ in range(6)]
+    cutoffs = [full_run(simulator, allocation)[0] for allocation in allocations]
+    cutoffs += [(0, cutoff[1] - 36, cutoff[2]) for cutoff in cutoffs]
+    for base in allocations:
+        parent = OperationProgress(instance.num_operations)
+        simulator.run(base, parent, checkpoint=True)
+        for _ in range(3):
+            allocation = neighbour(base, rng.choice(allocations), rng)
+            for cutoff in cutoffs:
+                child = OperationProgress(instance.num_operations, parent=parent)
+                fitness = simulator.run(allocation, child, cutoff=cutoff, checkpoint=True)
+                expected = simulator.run(allocation, cutoff=cutoff)
+                assert (fitness, fitness.aborted) == (expected, expected.aborted)
+
+
+@pytest.mark.parametrize("problem_name", ["input3_2", "input9"])  # input18: phân bổ ngẫu nhiên không xong hết
+def test_run_that_completes_every_operation_is_not_aborted(problem_name):
+    # Ngưỡng cắt chỉ bị vượt ở đúng ca cuối cùng, khi mọi công đoạn vừa hoàn thành:
+    # kết quả đã đầy đủ nên không được đánh dấu dừng sớm (cả mô phỏng tuần tự lẫn theo lô)
+    instance = load_problem(problem_name)[0]
+    simulator = ShiftSimulator(instance)
+    batch_simulator = BatchSimulator(simulator, min_batch_size=1)
+    rng = random.Random(29)
+    checked = 0
+    for _ in range(6):
+        allocation = random_allocation(instance, rng)
+        expected, progress = full_run(simulator, allocation)
+        if not all(progress.completed):
+            continue
+        cutoff = (expected[0], expected[1] - 1, expected[2])
+        fitness = simulator.run(allocation, cutoff=cutoff)
+        assert (fitness, fitness.aborted) == (expected, False)
+        fitness = batch_simulator.run([allocation, allocation], cutoff=cutoff)[0]
+        assert (fitness, fitness.aborted) == (expected, False)
+        checked += 1
+    assert checked > 0